@@ -0,0 +1,383 @@
+# 端到端回測吞吐量基準測試: 以合成catalog測量1, 10及100個交易對回測的bars/s, 峰值內存及各階段耗時
+#
+# 在專案根目錄執行: python -m benchmarks.backtest_throughput [catalog路徑]
+# catalog缺少所需的合成數據時先以 data.utils.synthetic.generate_catalog 生成
+# 每次結果追加到 benchmarks/results/backtest_throughput.jsonl, 並與
+# benchmarks/baselines/backtest_throughput.json 比較, 超出容差時以退出碼1結束
+# 基線不存在時以退出碼2結束, 設置 UPDATE_BASELINE=1 以記錄或覆蓋; BACKTEST_WORKERS 設置進程數
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+import msgspec
+import pandas as pd
+from nautilus_trader.backtest.node import BacktestNode, BacktestRunConfig
+from nautilus_trader.config import ImportableStrategyConfig, StrategyConfig
+from nautilus_trader.model.data import Bar, BarType
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+from nautilus_trader.trading.strategy import Strategy
+
+from benchmarks.baseline import BASELINE_DIR, RESULTS_DIR, append_results, check_baseline
+from data.utils.synthetic.generate_catalog import (
+    generate_catalog,
+    instrument_id_for,
+)
+from src.backtest_runner import (
+    STORED_BAR_STEPS,
+    binance_venue,
+    generate_reports,
+    make_run_config,
+)
+from src.catalog_manifest import CatalogManifest, manifest_path
+
+
+# 基準測試專用的catalog, 其合成交易對的起始價格範圍與默認生成的不同
+CATALOG_PATH = "data/synthetic/benchmark_catalog"
+
+# 交易對數量 -> 固定的回測範圍, 交易對越多範圍越短以控制總耗時
+SCALES = {
+    1: ("2022-01-01", "2022-06-30"),
+    10: ("2022-01-01", "2022-03-31"),
+    100: ("2022-01-01", "2022-01-31"),
+}
+STRATEGY = "5m/1h"
+# 策略以 風險金額/止損距離 計算數量後再除以價格, 下單數量與價格的平方成反比;
+# 起始價格限制在1到100之間, 同一賬戶資金下每個交易對的下單數量都不小於最小單位
+PRICE_RANGE = (1.0, 100.0)
+STARTING_BALANCE = "1000000 USDT"
+# 合成數據比最早的回測範圍提前一個月開始, 數據缺失不會影響範圍的覆蓋
+GENERATE_START = "2021-12-01"
+# 引擎運行時間分解的範圍及每種運行的重複次數
+BREAKDOWN_RANGE = ("2022-01-01", "2022-01-31")
+BREAKDOWN_REPEATS = 2
+
+PHASES = (
+    "catalog_load",
+    "setup",
+    "dispatch",
+    "fill_simulation",
+    "aggregation",
+    "strategy",
+    "reports",
+)
+
+BASELINE_PATH = BASELINE_DIR / "backtest_throughput.json"
+RESULTS_PATH = RESULTS_DIR / "backtest_throughput.jsonl"
+
+# 指標: (越大越好, 相對容差, 絕對容差)
+TOLERANCES = {
+    "bars_per_sec": (True, 0.15, 0.0),
+    "peak_rss_mb": (False, 0.15, 32.0),
+    **{f"{phase}_s": (False, 0.25, 0.5) for phase in PHASES},
+}
+
+
+class PassiveStrategyConfig(StrategyConfig, frozen=True):
+    bar_types: list[str]
+
+
+class PassiveStrategy(Strategy):
+    """
+    只訂閱bar而不處理的策略, 用於分離引擎各階段的耗時
+    """
+
+    def on_start(self) -> None:
+        for bar_type in self.config.bar_types:
+            self.subscribe_bars(BarType.from_str(bar_type))
+
+    def on_bar(self, bar: Bar) -> None:
+        pass
+
+
+def ensure_catalog(catalog_path: str | Path = CATALOG_PATH) -> None:
+    """
+    確保catalog包含每個規模所需的合成交易對及範圍, 缺少時生成
+
+    按交易對數量從多到少檢查, 數量較少的規模只重新生成較長範圍所需的
+    前幾個交易對; 同一seed下重疊月份的數據完全相同.
+    """
+    for instruments, (start, end) in sorted(SCALES.items(), reverse=True):
+        bar_types = [
+            f"{instrument_id_for(i)}-1-MINUTE-LAST-EXTERNAL" for i in range(instruments)
+        ]
+        if manifest_path(catalog_path).exists():
+            if not CatalogManifest.load(catalog_path).missing(bar_types, start, end):
+                continue
+        days = (pd.Timestamp(end) - pd.Timestamp(GENERATE_START)).days + 31
+        generate_catalog(
+            catalog_path,
+            instruments=instruments,
+            years=days / 365,
+            start=GENERATE_START,
+            price_range=PRICE_RANGE,
+        )
+
+
+def _run_config(
+    catalog_path: str,
+    instrument_id: str,
+    start: str,
+    end: str,
+) -> BacktestRunConfig:
+    # 與夜間批次相同的策略及引擎配置 (見`backtests/*.toml`)
+    return make_run_config(
+        catalog_path,
+        instrument_id,
+        start,
+        end,
+        strategy_params={},
+        strategy=STRATEGY,
+        venue=binance_venue(STARTING_BALANCE),
+        log_level="ERROR",
+    )
+
+
+def _passive_config(
+    run_config: BacktestRunConfig,
+    bar_types: list[str],
+    bar_execution: bool,
+) -> BacktestRunConfig:
+    # 以只訂閱`bar_types`的策略替換原策略, 並設置撮合引擎是否處理bar
+    strategy = ImportableStrategyConfig(
+        strategy_path="benchmarks.backtest_throughput:PassiveStrategy",
+        config_path="benchmarks.backtest_throughput:PassiveStrategyConfig",
+        config={"bar_types": bar_types},
+    )
+    return msgspec.structs.replace(
+        run_config,
+        engine=msgspec.structs.replace(run_config.engine, strategies=[strategy]),
+        venues=[
+            msgspec.structs.replace(venue, bar_execution=bar_execution)
+            for venue in run_config.venues
+        ],
+    )
+
+
+def _run_engine(
+    run_config: BacktestRunConfig,
+    bars: list[Bar],
+    reports: bool = False,
+) -> dict:
+    # 構建節點及引擎 (交易對, 賬戶, 策略) 並加入已加載的bar, 再運行及生成報告
+    timings = {}
+    started = time.perf_counter()
+    node = BacktestNode(configs=[run_config])
+    try:
+        node.build()
+        engine = node.get_engine(run_config.id)
+        engine.add_data(bars)
+        timings["setup"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        engine.run()
+        timings["run"] = time.perf_counter() - started
+
+        if reports:
+            started = time.perf_counter()
+            generate_reports(engine)
+            timings["reports"] = time.perf_counter() - started
+            timings["orders"] = engine.get_result().total_orders
+    finally:
+        node.dispose()
+    return timings
+
+
+def _load_bars(run_config: BacktestRunConfig) -> list[Bar]:
+    # 與BacktestNode相同的catalog查詢
+    data_config = run_config.data[0]
+    return ParquetDataCatalog(data_config.catalog_path).bars(
+        bar_types=data_config.bar_types,
+        start=data_config.start_time,
+        end=data_config.end_time,
+    )
+
+
+def _benchmark_instrument(
+    catalog_path: str,
+    instrument_id: str,
+    start: str,
+    end: str,
+) -> dict:
+    """
+    在工作進程中完整運行一個交易對的回測, 返回各步驟耗時及進程峰值內存
+    """
+    run_config = _run_config(catalog_path, instrument_id, start, end)
+    started = time.perf_counter()
+    bars = _load_bars(run_config)
+    catalog_load = time.perf_counter() - started
+
+    timings = _run_engine(run_config, bars, reports=True)
+    return {
+        "bars": len(bars),
+        "orders": timings["orders"],
+        "catalog_load": catalog_load,
+        "setup": timings["setup"],
+        "run": timings["run"],
+        "reports": timings["reports"],
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def engine_breakdown(
+    catalog_path: str,
+    instrument_id: str,
+    start: str,
+    end: str,
+    repeats: int = BREAKDOWN_REPEATS,
+) -> dict:
+    """
+    以逐步增加工作的四種運行分解引擎運行時間, 返回各階段佔運行時間的比例
+
+    1. 被動策略只訂閱1分鐘bar, 撮合引擎不處理bar: 數據迭代及消息分發
+    2. 撮合引擎處理每根bar: 增加的部分為成交模擬
+    3. 被動策略同時訂閱聚合的信號及趨勢bar: 增加的部分為bar聚合
+    4. 原策略: 增加的部分為策略本身 (指標, 信號及下單)
+
+    先以原策略預熱一次 (進程中首次運行的一次性開銷不計入), 每種運行取`repeats`
+    次中最快的一次; 相鄰兩種運行的差值因計時誤差為負時記為0.
+    """
+    run_config = _run_config(catalog_path, instrument_id, start, end)
+    bars = _load_bars(run_config)
+    minute = f"{instrument_id}-1-MINUTE-LAST-EXTERNAL"
+    aggregated = [
+        f"{instrument_id}-{step}-LAST-INTERNAL@1-MINUTE-EXTERNAL"
+        for step in STORED_BAR_STEPS[STRATEGY]
+    ]
+    configs = [
+        _passive_config(run_config, [minute], bar_execution=False),
+        _passive_config(run_config, [minute], bar_execution=True),
+        _passive_config(run_config, [minute, *aggregated], bar_execution=True),
+        run_config,
+    ]
+    _run_engine(run_config, bars)
+    runs = [
+        min(_run_engine(config, bars)["run"] for _ in range(repeats)) for config in configs
+    ]
+    increments = [runs[0]] + [max(b - a, 0.0) for a, b in zip(runs, runs[1:])]
+    total = sum(increments)
+    phases = ("dispatch", "fill_simulation", "aggregation", "strategy")
+    return {phase: increment / total for phase, increment in zip(phases, increments)}
+
+
+def _spawn_pool(workers: int) -> ProcessPoolExecutor:
+    # 與`run_parallel`相同: 每次回測使用新的進程
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    )
+
+
+def benchmark_scale(
+    catalog_path: str,
+    instruments: int,
+    breakdown: dict,
+    workers: int | None = None,
+) -> dict:
+    """
+    以`run_backtest.py`的方式 (每個交易對一個進程) 回測前`instruments`個合成交易對
+
+    Returns
+    -------
+    dict
+        bar數, 訂單數, 總耗時, bars/s (按總耗時), 工作進程的最大峰值內存 (MB),
+        以及各階段在所有交易對上累計的秒數; 引擎運行時間按`breakdown`的比例分配
+    """
+    start, end = SCALES[instruments]
+    instrument_ids = [instrument_id_for(i) for i in range(instruments)]
+    workers = min(workers or os.cpu_count() or 1, instruments)
+
+    started = time.perf_counter()
+    with _spawn_pool(workers) as executor:
+        runs = list(
+            executor.map(
+                _benchmark_instrument,
+                repeat(catalog_path),
+                instrument_ids,
+                repeat(start),
+                repeat(end),
+            )
+        )
+    elapsed = time.perf_counter() - started
+
+    bars = sum(r["bars"] for r in runs)
+    run_seconds = sum(r["run"] for r in runs)
+    result = {
+        "instruments": instruments,
+        "workers": workers,
+        "bars": bars,
+        "orders": sum(r["orders"] for r in runs),
+        "wall_s": elapsed,
+        "bars_per_sec": bars / elapsed,
+        "engine_bars_per_sec": bars / run_seconds,
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+    }
+    for phase in PHASES:
+        if phase in breakdown:
+            result[f"{phase}_s"] = run_seconds * breakdown[phase]
+        else:
+            result[f"{phase}_s"] = sum(r[phase] for r in runs)
+    return result
+
+
+def run_benchmark(
+    catalog_path: str | Path = CATALOG_PATH,
+    scales: list[int] | None = None,
+    workers: int | None = None,
+) -> pd.DataFrame:
+    """
+    對每個規模運行端到端回測並測量
+
+    每個交易對的回測與夜間批次相同: 在新的進程中從catalog加載bar, 構建引擎,
+    聚合5分鐘及1小時bar並運行策略, 最後生成報告. 引擎運行時間的階段分解
+    對單一交易對測量一次 (每個回測只有一個交易對, 比例與規模無關).
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        合成catalog的路徑, 缺少數據時生成
+    scales : list[int], optional
+        要測試的交易對數量, 默認為`SCALES`中的全部
+    workers : int, optional
+        工作進程數, 默認為CPU核心數
+
+    Returns
+    -------
+    pd.DataFrame
+        每個規模一行: bar數, 訂單數, 總耗時, bars/s, 峰值內存 (MB) 及各階段秒數
+    """
+    catalog_path = str(catalog_path)
+    ensure_catalog(catalog_path)
+
+    # 分解在獨立進程中運行, 不影響之後的峰值內存
+    with _spawn_pool(1) as executor:
+        breakdown = executor.submit(
+            engine_breakdown, catalog_path, instrument_id_for(0), *BREAKDOWN_RANGE
+        ).result()
+    print("引擎運行時間分解: " + ", ".join(f"{k} {v:.0%}" for k, v in breakdown.items()))
+
+    results = []
+    for instruments in scales or list(SCALES):
+        result = benchmark_scale(catalog_path, instruments, breakdown, workers)
+        results.append(result)
+        print(
+            f"{instruments} 個交易對: {result['bars']:,} bars, {result['wall_s']:.1f}s, "
+            f"{result['bars_per_sec']:,.0f} bars/s, 峰值內存 {result['peak_rss_mb']:,.0f} MB"
+        )
+    return pd.DataFrame(results).set_index("instruments")
+
+
+if __name__ == "__main__":
+    frame = run_benchmark(
+        *sys.argv[1:2],
+        workers=int(os.getenv("BACKTEST_WORKERS", "0")) or None,
+    )
+    print(frame.to_string(float_format=lambda x: f"{x:,.1f}"))
+    append_results(frame, RESULTS_PATH)
+    print(f"結果已追加到 {RESULTS_PATH}")
+    sys.exit(check_baseline(frame, BASELINE_PATH, TOLERANCES))
@@ -0,0 +1,124 @@
+# 基準測試結果的基線記錄及退化檢查, 供各基準測試腳本共用
+import json
+import os
+import platform
+from datetime import UTC, datetime
+from importlib.metadata import version
+from pathlib import Path
+
+import pandas as pd
+
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def environment() -> dict:
+    """
+    返回運行環境: 機器, 處理器, Python及Nautilus版本
+    """
+    return {
+        "machine": platform.node(),
+        "processor": platform.processor() or platform.machine(),
+        "python": platform.python_version(),
+        "nautilus_trader": version("nautilus_trader"),
+    }
+
+
+def _record(frame: pd.DataFrame, metrics) -> dict:
+    return {
+        "recorded_at": datetime.now(UTC).isoformat(),
+        "environment": environment(),
+        "results": {
+            str(name): {metric: float(row[metric]) for metric in metrics}
+            for name, row in frame.iterrows()
+        },
+    }
+
+
+def save_baseline(frame: pd.DataFrame, path: Path, metrics) -> None:
+    """
+    將每行結果的`metrics`列及運行環境保存為基線
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(_record(frame, metrics), indent=2))
+
+
+def append_results(frame: pd.DataFrame, path: Path) -> None:
+    """
+    將全部結果列作為一行JSON追加到結果文件, 保留歷次運行的記錄
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as file:
+        file.write(json.dumps(_record(frame, frame.columns)) + "\n")
+
+
+def compare_to_baseline(
+    frame: pd.DataFrame,
+    baseline: dict,
+    tolerances: dict[str, tuple[bool, float, float]],
+) -> list[str]:
+    """
+    返回超出容差的每項退化的描述, 沒有退化時為空列表
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        本次結果, 每行一個測試項
+    baseline : dict
+        `save_baseline`保存的基線
+    tolerances : dict[str, tuple[bool, float, float]]
+        每個指標的 (越大越好, 相對容差, 絕對容差)
+    """
+    regressions = []
+    for name, row in frame.iterrows():
+        expected = baseline["results"].get(str(name))
+        if expected is None:
+            continue
+        for metric, (higher_is_better, relative, absolute) in tolerances.items():
+            if metric not in expected:
+                continue
+            base, value = expected[metric], float(row[metric])
+            if higher_is_better:
+                limit = base * (1 - relative) - absolute
+                failed = value < limit
+            else:
+                limit = base * (1 + relative) + absolute
+                failed = value > limit
+            if failed:
+                regressions.append(
+                    f"{name} {metric}: {value:,.1f} (baseline {base:,.1f}, limit {limit:,.1f})"
+                )
+    return regressions
+
+
+def check_baseline(
+    frame: pd.DataFrame,
+    path: Path,
+    tolerances: dict[str, tuple[bool, float, float]],
+) -> int:
+    """
+    與`path`的基線比較並打印退化, 返回進程退出碼
+
+    有退化時為1. 基線不存在時為2, 不會以可能已退化的本次結果作為基線;
+    設置 UPDATE_BASELINE=1 時以本次結果記錄基線並返回0.
+    """
+    if os.getenv("UPDATE_BASELINE") == "1":
+        save_baseline(frame, path, tolerances)
+        print(f"基線已保存到 {path}")
+        return 0
+    if not path.exists():
+        print(f"基線 {path} 不存在, 請在基準機器上設置 UPDATE_BASELINE=1 運行以記錄")
+        return 2
+
+    baseline = json.loads(path.read_text())
+    if baseline["environment"] != environment():
+        print(f"注意: 基線記錄於不同的環境 {baseline['environment']}")
+    regressions = compare_to_baseline(frame, baseline, tolerances)
+    if regressions:
+        print(f"相對 {baseline['recorded_at']} 的基線, {len(regressions)} 項退化:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"未發現退化 (基線記錄於 {baseline['recorded_at']})")
+    return 0
@@ -0,0 +1,177 @@
+# Catalog存儲格式基準測試: 以各編碼配置重寫catalog中的1分鐘bar, 比較寫入速度, 文件大小及讀取速度
+#
+# 在專案根目錄執行: python -m benchmarks.catalog_encoding [catalog_path]
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+
+from src.catalog_bars import (
+    ENCODING_PROFILES,
+    bar_files,
+    bar_type_dir,
+    list_bar_types,
+    read_bars,
+)
+
+
+# 默認測試的bar類型數量及範圍查詢的天數
+MAX_BAR_TYPES = 5
+RANGE_DAYS = 30
+REPEATS = 3
+
+
+def load_sample(
+    catalog_path: str | Path,
+    max_bar_types: int = MAX_BAR_TYPES,
+    bar_step: str = "1-MINUTE",
+) -> dict[str, pa.Table]:
+    """
+    讀取catalog中前`max_bar_types`個`bar_step` bar類型的原始表 (按ts_init排序)
+    """
+    bar_types = [b for b in list_bar_types(catalog_path) if f"-{bar_step}-" in b]
+    sample = {}
+    for bar_type in bar_types[:max_bar_types]:
+        tables = [pq.read_table(path) for path in bar_files(catalog_path, bar_type)]
+        table = pa.concat_tables([t.cast(tables[0].schema) for t in tables])
+        sample[bar_type] = table.sort_by("ts_init")
+    if not sample:
+        raise ValueError(f"{catalog_path} 中沒有 {bar_step} bar")
+    return sample
+
+
+def _best_of(repeats: int, func) -> float:
+    # 取多次運行中最快的一次, 減少文件系統緩存及其他進程的干擾
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def benchmark_profile(
+    name: str,
+    sample: dict[str, pa.Table],
+    root: Path,
+    range_days: int = RANGE_DAYS,
+    repeats: int = REPEATS,
+) -> dict:
+    """
+    以一個編碼配置寫入樣本並測量寫入, 全量讀取, 範圍讀取及catalog查詢
+
+    全量及範圍讀取使用`read_bars` (包含定點數解碼), 即研究的加載路徑;
+    catalog查詢以`ParquetDataCatalog.bars`生成Bar對象, 即`BacktestDataConfig`
+    的回測加載路徑.
+    """
+    profile = ENCODING_PROFILES[name]
+    catalog_path = root / name
+    rows = sum(t.num_rows for t in sample.values())
+
+    def write():
+        for bar_type, table in sample.items():
+            directory = bar_type_dir(catalog_path, bar_type)
+            directory.mkdir(parents=True, exist_ok=True)
+            ts = table.column("ts_init")
+            pq.write_table(
+                table,
+                directory / f"{bar_type}-{ts[0].as_py()}-{ts[-1].as_py()}.parquet",
+                row_group_size=profile.row_group_rows,
+                **profile.writer_options(table.schema),
+            )
+
+    write_seconds = _best_of(repeats, write)
+    size = sum(
+        path.stat().st_size for bar_type in sample for path in bar_files(catalog_path, bar_type)
+    )
+
+    def full_scan():
+        for bar_type in sample:
+            read_bars(catalog_path, bar_type)
+
+    # 範圍查詢取每個序列中間的`range_days`天
+    windows = {}
+    for bar_type, table in sample.items():
+        ts = table.column("ts_init")
+        middle = (ts[0].as_py() + ts[-1].as_py()) // 2
+        windows[bar_type] = (middle, middle + range_days * 86_400_000_000_000)
+
+    def range_scan():
+        for bar_type, (start, end) in windows.items():
+            read_bars(catalog_path, bar_type, start, end)
+
+    def catalog_query():
+        ParquetDataCatalog(catalog_path).bars(list(sample))
+
+    full_seconds = _best_of(repeats, full_scan)
+    range_seconds = _best_of(repeats, range_scan)
+    query_seconds = _best_of(repeats, catalog_query)
+    return {
+        "profile": name,
+        "size_mb": size / 2**20,
+        "bytes_per_bar": size / rows,
+        "write_rows_per_sec": rows / write_seconds,
+        "full_scan_rows_per_sec": rows / full_seconds,
+        "range_scan_ms": range_seconds / len(sample) * 1000,
+        "catalog_query_rows_per_sec": rows / query_seconds,
+    }
+
+
+def run_benchmark(
+    catalog_path: str | Path = "data/binance/catalog",
+    profiles: list[str] | None = None,
+    max_bar_types: int = MAX_BAR_TYPES,
+    range_days: int = RANGE_DAYS,
+    repeats: int = REPEATS,
+) -> pd.DataFrame:
+    """
+    以每個編碼配置重寫catalog中的1分鐘bar樣本並測量
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        樣本來源catalog的路徑
+    profiles : list[str], optional
+        要測試的配置名稱, 默認為`ENCODING_PROFILES`中的全部
+    max_bar_types : int
+        樣本中的bar類型數量
+    range_days : int
+        範圍查詢的天數
+    repeats : int
+        每項測量的重複次數, 取最快的一次
+
+    Returns
+    -------
+    pd.DataFrame
+        每個配置一行: 大小 (MB及每bar字節數, 以及相對default的比例),
+        寫入, 全量讀取及catalog查詢的rows/s, 每個序列範圍查詢的毫秒數
+    """
+    sample = load_sample(catalog_path, max_bar_types)
+    rows = sum(t.num_rows for t in sample.values())
+    print(f"樣本: {len(sample)} 個bar類型, {rows:,} bars")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in profiles or list(ENCODING_PROFILES):
+            result = benchmark_profile(name, sample, Path(tmp), range_days, repeats)
+            results.append(result)
+            print(
+                f"{name}: {result['size_mb']:.1f} MB, "
+                f"寫入 {result['write_rows_per_sec']:,.0f} rows/s, "
+                f"讀取 {result['full_scan_rows_per_sec']:,.0f} rows/s, "
+                f"catalog查詢 {result['catalog_query_rows_per_sec']:,.0f} rows/s"
+            )
+
+    frame = pd.DataFrame(results).set_index("profile")
+    if "default" in frame.index:
+        frame.insert(1, "size_vs_default", frame["size_mb"] / frame.loc["default", "size_mb"])
+    return frame
+
+
+if __name__ == "__main__":
+    print(run_benchmark(*sys.argv[1:2]).to_string(float_format=lambda x: f"{x:,.2f}"))
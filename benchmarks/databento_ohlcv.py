@@ -0,0 +1,118 @@
+# Databento OHLCV轉換基準測試: 比較逐行pd.concat與列式解碼的每秒處理行數
+#
+# 在專案根目錄執行: python -m benchmarks.databento_ohlcv
+import tempfile
+import time
+from pathlib import Path
+
+import databento as db
+import numpy as np
+import pandas as pd
+from databento_dbn import FIXED_PRICE_SCALE, RType
+
+from data.utils.databento.ohlcv import OHLCV_DTYPE, read_ohlcv_dbn, write_dbn
+
+
+# 測試的時間範圍 (交易日數), 每日390根常規交易時段1分鐘bar
+PERIODS = {"1 month": 21, "1 year": 252, "5 years": 1260}
+SESSION_MINUTES = 390
+
+# 逐行轉換為平方複雜度, 超過此行數時跳過
+LEGACY_MAX_ROWS = 10_000
+
+
+def synthetic_ohlcv_records(days: int, seed: int = 0) -> np.ndarray:
+    """
+    生成`days`個交易日的1分鐘OHLCV記錄 (隨機遊走價格)
+    """
+    rng = np.random.default_rng(seed)
+    sessions = pd.bdate_range("2020-01-02", periods=days) + pd.Timedelta(hours=14, minutes=30)
+    minutes = np.arange(SESSION_MINUTES) * 60_000_000_000
+    ts = (sessions.as_unit("ns").asi8[:, None] + minutes[None, :]).ravel()
+
+    close = 20.0 * np.exp(np.cumsum(rng.normal(0.0, 0.001, len(ts))))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0.0, 0.0005, len(ts))) * close
+
+    records = np.zeros(len(ts), dtype=OHLCV_DTYPE)
+    records["length"] = OHLCV_DTYPE.itemsize // 4
+    records["rtype"] = int(RType.OHLCV_1M)
+    records["publisher_id"] = 1
+    records["instrument_id"] = 1
+    records["ts_event"] = ts
+    for name, values in (
+        ("open", open_),
+        ("high", np.maximum(open_, close) + spread),
+        ("low", np.minimum(open_, close) - spread),
+        ("close", close),
+    ):
+        records[name] = np.round(values * 100) * (FIXED_PRICE_SCALE // 100)
+    records["volume"] = rng.integers(100, 10_000, len(ts))
+    return records
+
+
+def legacy_convert(path: Path) -> pd.DataFrame:
+    """
+    原有的轉換方式: 逐條記錄建立單行DataFrame並pd.concat
+    """
+    raw_data = pd.DataFrame()
+    for record in db.DBNStore.from_file(path):
+        data = {
+            "timestamp": pd.Timestamp(record.ts_event, unit="ns"),
+            "open": record.open / FIXED_PRICE_SCALE,
+            "high": record.high / FIXED_PRICE_SCALE,
+            "low": record.low / FIXED_PRICE_SCALE,
+            "close": record.close / FIXED_PRICE_SCALE,
+            "volume": float(record.volume),
+        }
+        raw_data = pd.concat([raw_data, pd.DataFrame([data])], ignore_index=True)
+    raw_data.set_index("timestamp", inplace=True)
+    return raw_data.sort_index()
+
+
+def _rows_per_second(convert, path: Path, rows: int) -> float:
+    started = time.perf_counter()
+    frame = convert(path)
+    elapsed = time.perf_counter() - started
+    if len(frame) != rows:
+        raise RuntimeError(f"{convert.__name__} returned {len(frame)} rows, expected {rows}")
+    return rows / elapsed
+
+
+def run_benchmark(legacy_max_rows: int = LEGACY_MAX_ROWS) -> pd.DataFrame:
+    """
+    對每個時間範圍生成DBN文件, 測量兩種轉換方式的每秒處理行數
+
+    Returns
+    -------
+    pd.DataFrame
+        每個時間範圍一行: 行數, 逐行及列式轉換的rows/s及加速比
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for period, days in PERIODS.items():
+            records = synthetic_ohlcv_records(days)
+            path = Path(tmp) / f"{days}.dbn"
+            write_dbn(path, records)
+
+            vectorized = _rows_per_second(read_ohlcv_dbn, path, len(records))
+            legacy = (
+                _rows_per_second(legacy_convert, path, len(records))
+                if len(records) <= legacy_max_rows
+                else np.nan
+            )
+            results.append(
+                {
+                    "period": period,
+                    "rows": len(records),
+                    "legacy_rows_per_sec": legacy,
+                    "vectorized_rows_per_sec": vectorized,
+                    "speedup": vectorized / legacy,
+                }
+            )
+            print(f"{period}: {len(records):,} rows, {vectorized:,.0f} rows/s")
+    return pd.DataFrame(results).set_index("period")
+
+
+if __name__ == "__main__":
+    print(run_benchmark().to_string(float_format=lambda x: f"{x:,.0f}"))
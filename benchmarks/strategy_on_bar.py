@@ -0,0 +1,352 @@
+# 策略on_bar熱路徑基準測試: 以合成bar驅動三個策略類, 測量吞吐量, 每bar延遲分位數及內存分配
+#
+# 在專案根目錄執行: python -m benchmarks.strategy_on_bar
+# 結果與 benchmarks/baselines/strategy_on_bar.json 比較, 超出容差時以退出碼1結束
+# 基線不存在時以退出碼2結束, 設置 UPDATE_BASELINE=1 以記錄或覆蓋 (應在運行夜間批次的同一台機器上記錄)
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import polars as pl
+from nautilus_trader.model.currencies import USDT
+from nautilus_trader.model.data import Bar
+from nautilus_trader.model.enums import OrderSide
+from nautilus_trader.model.identifiers import PositionId
+from nautilus_trader.model.objects import Money
+
+from benchmarks.baseline import BASELINE_DIR, check_baseline
+from data.utils.synthetic.generate_catalog import make_instrument, synthetic_bars
+from src.catalog_verify import bar_interval_nanos
+from src.vectorized import resample_bars
+from src.vwap_strategy import VWAPMultiTimeframeStrategy, VWAPStrategyConfig
+from src.vwap_strategy_15min import VWAPMultiTimeframeStrategy15M, VWAPStrategy15MConfig
+from src.vwap_strategy_multiple_instruments import (
+    VWAPMultiTimeframeStrategy as VWAPMultiInstrumentStrategy,
+    VWAPStrategyConfig as VWAPMultiInstrumentConfig,
+)
+
+
+# 合成數據的範圍, 每項測量的重複次數及多交易對策略的交易對數量
+START = "2024-01-01"
+DAYS = 60
+REPEATS = 3
+MULTI_INSTRUMENTS = 10
+ACCOUNT_BALANCE = 100_000
+
+BASELINE_PATH = BASELINE_DIR / "strategy_on_bar.json"
+
+# 指標: (越大越好, 相對容差, 絕對容差)
+TOLERANCES = {
+    "bars_per_sec": (True, 0.15, 0.0),
+    "p50_us": (False, 0.20, 1.0),
+    "p99_us": (False, 0.50, 10.0),
+    "alloc_bytes_per_bar": (False, 0.10, 64.0),
+    "retained_bytes_per_bar": (False, 0.10, 8.0),
+}
+
+
+class FakeOrder(NamedTuple):
+    instrument_id: object
+    side: OrderSide
+    quantity: object
+
+
+class FakeOrderFactory:
+    """
+    只記錄交易對, 方向及數量的訂單工廠, 不生成訂單ID及事件
+    """
+
+    def market(self, instrument_id, order_side, quantity, **kwargs) -> FakeOrder:
+        return FakeOrder(instrument_id, order_side, quantity)
+
+
+class FakePortfolio:
+    """
+    單一USDT賬戶及淨持倉的最小實現, 訂單按最新收盤價立即成交
+    """
+
+    def __init__(self, balance: float = ACCOUNT_BALANCE):
+        self._account = SimpleNamespace(balance_total=lambda: Money(balance, USDT))
+        self._positions: dict = {}  # instrument_id -> [淨數量, 開倉價]
+        self.last_close: dict = {}
+        self.fills = 0
+
+    def account(self, venue):
+        return self._account
+
+    def net_position(self, instrument_id) -> Decimal:
+        position = self._positions.get(instrument_id)
+        return position[0] if position else Decimal(0)
+
+    def fill(self, order: FakeOrder) -> tuple[Decimal, Decimal, float]:
+        """
+        成交訂單, 返回 (成交前淨數量, 成交後淨數量, 已實現盈虧)
+        """
+        price = self.last_close[order.instrument_id]
+        quantity = order.quantity.as_decimal()
+        before, entry_price = self._positions.get(order.instrument_id, (Decimal(0), price))
+        after = before + (quantity if order.side == OrderSide.BUY else -quantity)
+        realized = float(before) * (price - entry_price) if after == 0 else 0.0
+        self._positions[order.instrument_id] = [after, entry_price if before else price]
+        self.fills += 1
+        return before, after, realized
+
+
+class _FakeEnvironment:
+    # 置於策略類之前, 以Python屬性覆蓋Strategy的只讀組件, 策略不需註冊到引擎即可運行;
+    # 訂閱被忽略, 註冊的指標由`handle_bar`按引擎的順序在on_bar之前更新
+
+    def _init_fake_environment(self, instruments: list) -> None:
+        self._fake_cache = SimpleNamespace(
+            instrument={i.id: i for i in instruments}.get,
+        )
+        self._fake_portfolio = FakePortfolio()
+        self._fake_order_factory = FakeOrderFactory()
+        self.bar_indicators: dict = {}
+        self.positions_opened = 0
+
+    @property
+    def cache(self):
+        return self._fake_cache
+
+    @property
+    def portfolio(self):
+        return self._fake_portfolio
+
+    @property
+    def order_factory(self):
+        return self._fake_order_factory
+
+    def subscribe_bars(self, bar_type, *args, **kwargs) -> None:
+        pass
+
+    def register_indicator_for_bars(self, bar_type, indicator) -> None:
+        self.bar_indicators.setdefault(bar_type, []).append(indicator)
+
+    def submit_order(self, order, *args, **kwargs) -> None:
+        # 立即成交, 並像引擎一樣回調持倉開倉及平倉事件
+        before, after, realized = self._fake_portfolio.fill(order)
+        if before == 0 and after != 0:
+            self.positions_opened += 1
+            self.on_position_opened(
+                SimpleNamespace(
+                    instrument_id=order.instrument_id,
+                    position_id=PositionId(f"{order.instrument_id}-{self.positions_opened}"),
+                )
+            )
+        elif before != 0 and after == 0:
+            self.on_position_closed(
+                SimpleNamespace(
+                    instrument_id=order.instrument_id,
+                    position_id=PositionId(f"{order.instrument_id}-{self.positions_opened}"),
+                    realized_pnl=Money(realized, USDT),
+                )
+            )
+
+    def handle_bar(self, bar: Bar) -> None:
+        self._fake_portfolio.last_close[bar.bar_type.instrument_id] = bar.close.as_double()
+        for indicator in self.bar_indicators.get(bar.bar_type, ()):
+            indicator.handle_bar(bar)
+        self.on_bar(bar)
+
+
+class StrategyCase(NamedTuple):
+    strategy_cls: type
+    make_config: object  # list[InstrumentId] -> StrategyConfig
+    instruments: int
+
+
+CASES = {
+    "vwap_5m_1h": StrategyCase(
+        VWAPMultiTimeframeStrategy,
+        lambda ids: VWAPStrategyConfig(instrument_id=str(ids[0])),
+        1,
+    ),
+    "vwap_15m_4h": StrategyCase(
+        VWAPMultiTimeframeStrategy15M,
+        lambda ids: VWAPStrategy15MConfig(
+            instrument_id=str(ids[0]),
+            bar_type_1min=f"{ids[0]}-1-MINUTE-LAST-EXTERNAL",
+        ),
+        1,
+    ),
+    "vwap_multi_15m_4h": StrategyCase(
+        VWAPMultiInstrumentStrategy,
+        lambda ids: VWAPMultiInstrumentConfig(instrument_ids=[str(i) for i in ids]),
+        MULTI_INSTRUMENTS,
+    ),
+}
+
+
+def make_strategy(case: StrategyCase, instruments: list):
+    """
+    創建在假環境中運行並已調用on_start的策略實例
+    """
+    name = f"Benchmark{case.strategy_cls.__name__}"
+    cls = type(name, (_FakeEnvironment, case.strategy_cls), {})
+    strategy = cls(case.make_config([i.id for i in instruments]))
+    strategy._init_fake_environment(instruments)
+    strategy.on_start()
+    return strategy
+
+
+def synthetic_feed(strategy, instruments: list, days: int = DAYS, seed: int = 0) -> list[Bar]:
+    """
+    為策略註冊了指標的每個bar類型生成合成bar, 按時間排序
+
+    合成1分鐘bar按Nautilus時間bar聚合器的方式聚合 (見`resample_bars`); 同一時間的
+    bar按註冊順序排列, 與引擎中聚合器的觸發順序一致.
+    """
+    end = (pd.Timestamp(START) + pd.Timedelta(days=days)).strftime("%Y-%m-%d")
+    by_id = {i.id: (index, i) for index, i in enumerate(instruments)}
+    minute_bars = {}
+    keyed = []
+    for rank, bar_type in enumerate(strategy.bar_indicators):
+        index, instrument = by_id[bar_type.instrument_id]
+        if index not in minute_bars:
+            chunks = list(
+                synthetic_bars(index, START, end, seed, instrument.info["start_price"])
+            )
+            minute_bars[index] = pl.DataFrame(
+                {
+                    "ts_init": np.concatenate([c["ts"] for c in chunks]),
+                    **{
+                        name: np.concatenate([c[name] for c in chunks])
+                        for name in ("open", "high", "low", "close", "volume")
+                    },
+                }
+            )
+        every = f"{bar_interval_nanos(str(bar_type)) // 60_000_000_000}m"
+        frame = resample_bars(minute_bars[index], every)
+        for row in frame.iter_rows(named=True):
+            bar = Bar(
+                bar_type,
+                instrument.make_price(row["open"]),
+                instrument.make_price(row["high"]),
+                instrument.make_price(row["low"]),
+                instrument.make_price(row["close"]),
+                instrument.make_qty(row["volume"]),
+                row["ts"],
+                row["ts"],
+            )
+            keyed.append((row["ts"], rank, bar))
+    keyed.sort(key=lambda item: item[:2])
+    return [bar for _, _, bar in keyed]
+
+
+def measure_latency(strategy, bars: list[Bar]) -> np.ndarray:
+    """
+    逐bar計時 (指標更新及on_bar), 返回每bar的納秒數
+    """
+    handle = strategy.handle_bar
+    clock = time.perf_counter_ns
+    latencies = np.empty(len(bars), dtype=np.int64)
+    for i, bar in enumerate(bars):
+        started = clock()
+        handle(bar)
+        latencies[i] = clock() - started
+    return latencies
+
+
+def measure_allocations(strategy, bars: list[Bar]) -> tuple[float, float]:
+    """
+    以tracemalloc測量每bar的內存分配, 返回 (每bar峰值分配字節, 每bar保留字節)
+
+    峰值分配為每個bar處理期間超出處理前的最大追蹤內存, 反映臨時對象的開銷;
+    保留字節為運行前後追蹤內存的差值除以bar數, 有界的歷史數據應接近0.
+    """
+    tracemalloc.start()
+    try:
+        handle = strategy.handle_bar
+        start_memory, _ = tracemalloc.get_traced_memory()
+        allocated = 0
+        for bar in bars:
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            handle(bar)
+            allocated += tracemalloc.get_traced_memory()[1] - current
+        end_memory, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return allocated / len(bars), (end_memory - start_memory) / len(bars)
+
+
+def benchmark_case(name: str, days: int = DAYS, repeats: int = REPEATS) -> dict:
+    """
+    以合成bar測量一個策略類: 吞吐量取最快的一次, 延遲分位數來自同一次運行
+    """
+    case = CASES[name]
+    instruments = [make_instrument(i) for i in range(case.instruments)]
+    bars = synthetic_feed(make_strategy(case, instruments), instruments, days)
+
+    best = None
+    for _ in range(repeats):
+        # 每次使用新的策略實例, 指標及歷史數據從頭預熱
+        latencies = measure_latency(make_strategy(case, instruments), bars)
+        if best is None or latencies.sum() < best.sum():
+            best = latencies
+    strategy = make_strategy(case, instruments)
+    alloc, retained = measure_allocations(strategy, bars)
+
+    p50, p90, p99, p999 = np.percentile(best, [50, 90, 99, 99.9]) / 1000
+    return {
+        "strategy": name,
+        "bars": len(bars),
+        "orders": strategy.portfolio.fills,
+        "bars_per_sec": len(bars) / (best.sum() / 1e9),
+        "p50_us": p50,
+        "p90_us": p90,
+        "p99_us": p99,
+        "p999_us": p999,
+        "max_us": best.max() / 1000,
+        "alloc_bytes_per_bar": alloc,
+        "retained_bytes_per_bar": retained,
+    }
+
+
+def run_benchmark(
+    cases: list[str] | None = None,
+    days: int = DAYS,
+    repeats: int = REPEATS,
+) -> pd.DataFrame:
+    """
+    對每個策略類運行on_bar基準測試
+
+    策略在假的投資組合, 訂單工廠及緩存上運行 (不經過消息總線, 風控及撮合),
+    因此結果只反映策略自身的代碼: 指標更新, 歷史數據, 信號計算, 日誌格式化
+    及下單邏輯.
+
+    Parameters
+    ----------
+    cases : list[str], optional
+        要測試的`CASES`名稱, 默認為全部
+    days : int
+        合成數據的天數
+    repeats : int
+        延遲測量的重複次數, 取最快的一次
+
+    Returns
+    -------
+    pd.DataFrame
+        每個策略一行: bar數, 成交數, bars/s, 延遲分位數 (微秒) 及每bar分配字節數
+    """
+    results = []
+    for name in cases or list(CASES):
+        result = benchmark_case(name, days, repeats)
+        results.append(result)
+        print(
+            f"{name}: {result['bars']:,} bars, {result['bars_per_sec']:,.0f} bars/s, "
+            f"p99 {result['p99_us']:.1f}us, {result['alloc_bytes_per_bar']:.0f} B/bar"
+        )
+    return pd.DataFrame(results).set_index("strategy")
+
+
+if __name__ == "__main__":
+    frame = run_benchmark()
+    print(frame.to_string(float_format=lambda x: f"{x:,.1f}"))
+    sys.exit(check_baseline(frame, BASELINE_PATH, TOLERANCES))
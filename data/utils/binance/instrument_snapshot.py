@@ -0,0 +1,165 @@
+# 將Binance期貨交易對定義保存為本地快照, 供數據導入腳本離線使用
+#
+# 刷新快照 (需要網絡): python -m data.utils.binance.instrument_snapshot
+import asyncio
+import json
+import shutil
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from dotenv import load_dotenv
+from nautilus_trader.adapters.binance.common.enums import BinanceAccountType
+from nautilus_trader.adapters.binance.factories import get_cached_binance_http_client
+from nautilus_trader.adapters.binance.futures.providers import BinanceFuturesInstrumentProvider
+from nautilus_trader.common.component import LiveClock
+from nautilus_trader.config import InstrumentProviderConfig
+from nautilus_trader.model.identifiers import InstrumentId
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+
+
+# 加載.env文件中的環境變量
+env_path = Path(__file__).parents[3] / ".env"
+load_dotenv(dotenv_path=env_path)
+
+SNAPSHOT_PATH = Path("data/binance/instruments")
+SNAPSHOT_MAX_AGE = timedelta(days=7)
+
+
+async def create_provider():
+    """創建提供者以從實時交易所加載所有工具數據"""
+    clock = LiveClock()
+    client = get_cached_binance_http_client(
+        clock=clock,
+        account_type=BinanceAccountType.USDT_FUTURE,
+        is_testnet=False,
+    )
+
+    binance_provider = BinanceFuturesInstrumentProvider(
+        client=client,
+        clock=clock,
+        config=InstrumentProviderConfig(load_all=True, log_warnings=False),
+    )
+
+    await binance_provider.load_all_async()
+    return binance_provider
+
+
+def refresh_snapshot(snapshot_path: str | Path = SNAPSHOT_PATH) -> int:
+    """
+    從交易所下載所有交易對定義並替換本地快照
+
+    快照是一個只包含交易對的ParquetDataCatalog, 以及記錄下載時間的
+    `snapshot.json`. 新快照先寫入臨時目錄再替換, 失敗時保留舊快照.
+
+    Parameters
+    ----------
+    snapshot_path : str | Path
+        快照目錄的路徑
+
+    Returns
+    -------
+    int
+        保存的交易對數量
+    """
+    snapshot_path = Path(snapshot_path)
+    provider: BinanceFuturesInstrumentProvider = asyncio.run(create_provider())
+    instruments = provider.list_all()
+
+    tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.tmp")
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+    catalog = ParquetDataCatalog(tmp_path)
+    catalog.write_data(instruments)
+    metadata = {
+        "fetched_at": datetime.now(UTC).isoformat(),
+        "instruments": len(instruments),
+    }
+    (tmp_path / "snapshot.json").write_text(json.dumps(metadata, indent=2))
+
+    if snapshot_path.exists():
+        shutil.rmtree(snapshot_path)
+    tmp_path.rename(snapshot_path)
+    return len(instruments)
+
+
+class InstrumentSnapshot:
+    """
+    本地保存的交易對定義, 提供與InstrumentProvider相同的`find`接口
+
+    Parameters
+    ----------
+    instruments : list
+        交易對定義
+    fetched_at : datetime
+        快照的下載時間
+    """
+
+    def __init__(self, instruments: list, fetched_at: datetime):
+        self._instruments = {instrument.id: instrument for instrument in instruments}
+        self.fetched_at = fetched_at
+
+    @classmethod
+    def load(
+        cls,
+        snapshot_path: str | Path = SNAPSHOT_PATH,
+        max_age: timedelta | None = SNAPSHOT_MAX_AGE,
+    ) -> "InstrumentSnapshot":
+        """
+        讀取本地快照, 不需要網絡
+
+        Parameters
+        ----------
+        snapshot_path : str | Path
+            快照目錄的路徑
+        max_age : timedelta, optional
+            快照超過此時間時打印警告, None則不檢查
+
+        Raises
+        ------
+        FileNotFoundError
+            如果快照不存在
+        """
+        snapshot_path = Path(snapshot_path)
+        metadata_path = snapshot_path / "snapshot.json"
+        if not metadata_path.exists():
+            raise FileNotFoundError(
+                f"交易對快照不存在: {snapshot_path}, "
+                "請先執行 python -m data.utils.binance.instrument_snapshot"
+            )
+        metadata = json.loads(metadata_path.read_text())
+        snapshot = cls(
+            ParquetDataCatalog(snapshot_path).instruments(),
+            datetime.fromisoformat(metadata["fetched_at"]),
+        )
+        if max_age is not None and snapshot.is_stale(max_age):
+            print(
+                f"警告: 交易對快照已有 {snapshot.age().days} 天未更新, "
+                "新上線的交易對可能缺失, 請執行 "
+                "python -m data.utils.binance.instrument_snapshot 刷新"
+            )
+        return snapshot
+
+    def age(self) -> timedelta:
+        """返回快照距今的時間"""
+        return datetime.now(UTC) - self.fetched_at
+
+    def is_stale(self, max_age: timedelta = SNAPSHOT_MAX_AGE) -> bool:
+        """快照是否超過`max_age`"""
+        return self.age() > max_age
+
+    def find(self, instrument_id: InstrumentId):
+        """返回交易對定義, 不存在時返回None"""
+        return self._instruments.get(instrument_id)
+
+    def list_all(self) -> list:
+        """返回所有交易對定義"""
+        return list(self._instruments.values())
+
+    def __len__(self) -> int:
+        return len(self._instruments)
+
+
+if __name__ == "__main__":
+    count = refresh_snapshot(SNAPSHOT_PATH)
+    print(f"已保存 {count} 個交易對定義到 {SNAPSHOT_PATH}")
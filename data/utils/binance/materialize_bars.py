@@ -0,0 +1,109 @@
+# 從1分鐘bar預先聚合5m/15m/1h/4h bar並寫入獨立的catalog, 供策略直接訂閱
+#
+# 在專案根目錄執行: python -m data.utils.binance.materialize_bars
+import shutil
+from pathlib import Path
+
+import pandas as pd
+from nautilus_trader.model.data import BarType
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+from nautilus_trader.persistence.wranglers import BarDataWrangler
+
+from src.catalog_bars import (
+    bar_type_dir,
+    catalog_write_lock,
+    list_bar_types,
+    read_bars,
+    write_instrument,
+)
+from src.catalog_manifest import update_manifest
+from src.vectorized import resample_bars
+
+
+# Target intervals and their bar type step/aggregation
+TIMEFRAMES = {
+    "5m": "5-MINUTE",
+    "15m": "15-MINUTE",
+    "1h": "1-HOUR",
+    "4h": "4-HOUR",
+}
+
+
+def materialize_bars(
+    source_catalog_path: str | Path,
+    target_catalog_path: str | Path,
+    timeframes: list[str] | None = None,
+) -> None:
+    """
+    將catalog中所有1分鐘bar聚合為更高時間框架並寫入目標catalog
+
+    聚合方式與Nautilus時間bar聚合器一致: 以區間收盤時間作為時間戳,
+    無數據的區間以前收盤價補為零成交量bar. 寫入的bar類型為
+    `{instrument_id}-{step}-LAST-EXTERNAL`, 可直接以`use_stored_bars=True`訂閱.
+
+    Parameters
+    ----------
+    source_catalog_path : str | Path
+        包含1分鐘bar的catalog路徑
+    target_catalog_path : str | Path
+        寫入聚合bar的catalog路徑
+    timeframes : list[str], optional
+        要生成的時間框架, 默認為全部 (5m, 15m, 1h, 4h)
+    """
+    source_catalog_path = Path(source_catalog_path)
+    target_catalog_path = Path(target_catalog_path)
+    target_catalog_path.mkdir(parents=True, exist_ok=True)
+
+    source = ParquetDataCatalog(source_catalog_path)
+    target = ParquetDataCatalog(target_catalog_path)
+
+    # 寫入及更新索引期間鎖定目標catalog
+    with catalog_write_lock(target_catalog_path):
+        for bar_type_1min in list_bar_types(source_catalog_path):
+            if not bar_type_1min.endswith("-1-MINUTE-LAST-EXTERNAL"):
+                continue
+            instrument_id = bar_type_1min.removesuffix("-1-MINUTE-LAST-EXTERNAL")
+            try:
+                print(f"正在聚合: {instrument_id}")
+                instruments = source.instruments(instrument_ids=[instrument_id])
+                if not instruments:
+                    print(f"無法找到交易對 {instrument_id}, 跳過處理")
+                    continue
+                instrument = instruments[0]
+                write_instrument(target, instrument)
+
+                bars_1min = read_bars(source_catalog_path, bar_type_1min)
+                for timeframe in timeframes or list(TIMEFRAMES):
+                    resampled = resample_bars(bars_1min, timeframe).to_pandas()
+                    resampled.index = pd.to_datetime(resampled.pop("ts"), unit="ns", utc=True)
+
+                    bar_type_string = f"{instrument_id}-{TIMEFRAMES[timeframe]}-LAST-EXTERNAL"
+                    wrangler = BarDataWrangler(
+                        bar_type=BarType.from_str(bar_type_string),
+                        instrument=instrument,
+                    )
+                    bars = wrangler.process(resampled)
+                    # 每次重新生成整個序列, 先刪除上次寫入的文件
+                    shutil.rmtree(
+                        bar_type_dir(target_catalog_path, bar_type_string), ignore_errors=True
+                    )
+                    target.write_data(bars, basename_template=bar_type_string)
+                    print(f"  {bar_type_string}: {len(bars)} bars")
+
+            except Exception as e:
+                print(f"聚合 {instrument_id} 時發生錯誤: {e!s}")
+                continue
+
+        # 重建目標catalog的索引 (在鎖內, 以免與其他寫入者的更新互相覆蓋)
+        update_manifest(target_catalog_path)
+    print("\n所有時間框架聚合完成！")
+
+
+if __name__ == "__main__":
+    SOURCE_CATALOG_PATH = "data/binance/catalog"
+    TARGET_CATALOG_PATH = "data/binance/catalog_materialized"
+
+    materialize_bars(
+        source_catalog_path=SOURCE_CATALOG_PATH,
+        target_catalog_path=TARGET_CATALOG_PATH,
+    )
@@ -1,15 +1,9 @@
-import asyncio
+# 在專案根目錄執行: python -m data.utils.binance.raw_to_catalog
 import re
-import shutil
 from pathlib import Path
 
 import pandas as pd
 from dotenv import load_dotenv
-from nautilus_trader.adapters.binance.common.enums import BinanceAccountType
-from nautilus_trader.adapters.binance.factories import get_cached_binance_http_client
-from nautilus_trader.adapters.binance.futures.providers import BinanceFuturesInstrumentProvider
-from nautilus_trader.common.component import LiveClock
-from nautilus_trader.config import InstrumentProviderConfig
 from nautilus_trader.model.data import BarType
 from nautilus_trader.model.identifiers import InstrumentId
 from nautilus_trader.model.identifiers import Symbol
@@ -17,6 +11,16 @@ from nautilus_trader.model.identifiers import Venue
 from nautilus_trader.persistence.catalog import ParquetDataCatalog
 from nautilus_trader.persistence.wranglers import BarDataWrangler
 
+from data.utils.binance.instrument_snapshot import InstrumentSnapshot
+from src.catalog_bars import (
+    bar_time_range,
+    catalog_write_lock,
+    incremental_basename,
+    select_new_rows,
+    write_instrument,
+)
+from src.catalog_manifest import update_manifest
+
 
 # 加載.env文件中的環境變量
 env_path = Path(__file__).parents[3] / ".env"
@@ -51,33 +55,11 @@ def construct_bar_type_string(parsed_data: dict[str, str]) -> str:
         return f"{base_pair}{quote_pair}-SPOT.BINANCE-{timeframe}-LAST-EXTERNAL"
 
 
-async def create_provider():
-    """
-    Create a provider to load all instrument data from live exchange.
-    """
-    clock = LiveClock()
-
-    client = get_cached_binance_http_client(
-        clock=clock,
-        account_type=BinanceAccountType.USDT_FUTURE,
-        is_testnet=False,
-    )
-
-    binance_provider = BinanceFuturesInstrumentProvider(
-        client=client,
-        clock=clock,
-        config=InstrumentProviderConfig(load_all=True, log_warnings=False),
-    )
-
-    await binance_provider.load_all_async()
-    return binance_provider
-
-
 if __name__ == "__main__":
     btcusdt_perp = pd.read_parquet("data/binance/futures/BTC_USDT_USDT-5m-futures.parquet")
     btcusdt_perp.rename(columns={"date": "timestamp"}, inplace=True)
     btcusdt_perp.set_index("timestamp", inplace=True)
-    btcusdt_perp.sort_values("timestamp", inplace=True)
+    btcusdt_perp.sort_values("timestamp", inplace=True, kind="stable")
     # print(btcusdt_perp.head())
 
     output_path = Path("data/binance/futures_processed")
@@ -93,8 +75,8 @@ if __name__ == "__main__":
     # Add a trading venue (multiple venues possible)
     BINANCE = Venue("BINANCE")
 
-    # Use actual Binance instrument for backtesting
-    provider: BinanceFuturesInstrumentProvider = asyncio.run(create_provider())
+    # Use actual Binance instrument for backtesting, from the local snapshot
+    provider = InstrumentSnapshot.load()
 
     instrument_id = InstrumentId(symbol=Symbol("BTCUSDT-PERP"), venue=BINANCE)
     instrument = provider.find(instrument_id)
@@ -102,23 +84,27 @@ if __name__ == "__main__":
         raise RuntimeError(f"Unable to find instrument {instrument_id}")
     else:
         print(instrument)
-        wrangler = BarDataWrangler(
-            bar_type=BarType.from_str(bar_type_string), instrument=instrument
-        )
-        btcusdt_perp_bar = wrangler.process(btcusdt_perp)
-
         # 指定CATALOG_PATH
         CATALOG_PATH = Path("data/binance/catalog")
 
-        # 如果CATALOG_PATH存在, 將其刪除並重建
-        if CATALOG_PATH.exists():
-            import shutil
-
-            shutil.rmtree(CATALOG_PATH)
-        CATALOG_PATH.mkdir(parents=True)
-
-        catalog = ParquetDataCatalog(CATALOG_PATH)
-        # Write instrument and bars
-        catalog.write_data([instrument], basename_template=f"{instrument.id.value}")
-        catalog.write_data(btcusdt_perp_bar, basename_template=f"{instrument.id.value}")
-        print("Data written to catalog")
+        # 增量更新: 只追加catalog中尚未存在的時間範圍
+        with catalog_write_lock(CATALOG_PATH):
+            catalog = ParquetDataCatalog(CATALOG_PATH)
+            write_instrument(catalog, instrument)
+
+            new_data = select_new_rows(
+                btcusdt_perp, bar_time_range(CATALOG_PATH, bar_type_string)
+            )
+            if new_data.empty:
+                print("Catalog is up to date")
+            else:
+                wrangler = BarDataWrangler(
+                    bar_type=BarType.from_str(bar_type_string), instrument=instrument
+                )
+                btcusdt_perp_bar = wrangler.process(new_data)
+                catalog.write_data(
+                    btcusdt_perp_bar,
+                    basename_template=incremental_basename(bar_type_string, new_data),
+                )
+                print(f"{len(btcusdt_perp_bar)} bars written to catalog")
+            update_manifest(CATALOG_PATH, [bar_type_string])
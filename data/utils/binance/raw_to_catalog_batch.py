@@ -1,15 +1,17 @@
-import asyncio
+# 在專案根目錄執行: python -m data.utils.binance.raw_to_catalog_batch
+# 默認增量更新catalog, 設置 REBUILD_CATALOG=1 以刪除並重建
+# 默認不保存處理後的副本, 設置 KEEP_PROCESSED=1 以保存到 PROCESSED_DATA_PATH
+# 設置 CATALOG_PARTITION=day 或 month 以按天或按月分區寫入bar文件
+# 設置 CATALOG_ENCODING 以選擇bar文件的編碼配置 (見 src/catalog_bars.py 的 ENCODING_PROFILES)
+import multiprocessing
+import os
 import re
-import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import pandas as pd
 from dotenv import load_dotenv
-from nautilus_trader.adapters.binance.common.enums import BinanceAccountType
-from nautilus_trader.adapters.binance.factories import get_cached_binance_http_client
-from nautilus_trader.adapters.binance.futures.providers import BinanceFuturesInstrumentProvider
-from nautilus_trader.common.component import LiveClock
-from nautilus_trader.config import InstrumentProviderConfig
 from nautilus_trader.model.data import BarType
 from nautilus_trader.model.identifiers import InstrumentId
 from nautilus_trader.model.identifiers import Symbol
@@ -17,6 +19,19 @@ from nautilus_trader.model.identifiers import Venue
 from nautilus_trader.persistence.catalog import ParquetDataCatalog
 from nautilus_trader.persistence.wranglers import BarDataWrangler
 
+from data.utils.binance.instrument_snapshot import SNAPSHOT_PATH, InstrumentSnapshot
+from data.utils.binance.stream_ingest import is_sorted_by_time, stream_bars_to_catalog
+from src.catalog_bars import (
+    bar_time_range,
+    catalog_write_lock,
+    clear_catalog,
+    encoding_profile,
+    select_new_rows,
+    write_bar_frame,
+    write_instrument,
+)
+from src.catalog_manifest import update_manifest
+
 
 # 加載.env文件中的環境變量
 env_path = Path(__file__).parents[3] / ".env"
@@ -55,45 +70,134 @@ def construct_bar_type_string(parsed_data: dict[str, str]) -> str:
         return f"{base_pair}{quote_pair}-SPOT.BINANCE-{timeframe}-LAST-EXTERNAL"
 
 
-async def create_provider():
-    """創建提供者以從實時交易所加載所有工具數據"""
-    clock = LiveClock()
-    client = get_cached_binance_http_client(
-        clock=clock,
-        account_type=BinanceAccountType.USDT_FUTURE,
-        is_testnet=False,
-    )
-
-    binance_provider = BinanceFuturesInstrumentProvider(
-        client=client,
-        clock=clock,
-        config=InstrumentProviderConfig(load_all=True, log_warnings=False),
-    )
+def _ingest_file(
+    file_path: Path,
+    processed_data_path: Path | None,
+    catalog_path: Path,
+    bar_type_string: str,
+    instrument,
+    streaming: bool,
+    partition: str | None,
+    encoding: str,
+) -> dict:
+    """
+    在工作進程中讀取, 轉換單個原始文件並將bar寫入catalog
 
-    await binance_provider.load_all_async()
-    return binance_provider
+    每個文件對應唯一的bar類型, 各進程只寫入各自的bar目錄, 因此可以並行寫入.
+    已存在於catalog時間範圍內的行會被跳過, 只追加新數據.
+    """
+    stats = {"file": file_path.name, "bar_type": bar_type_string, "bars": 0}
+    started = time.perf_counter()
+    processed_filename = file_path.name.replace(".parquet", "-processed.parquet")
+    try:
+        # 未按時間排序的文件無法串流導入, 改為整個文件讀入後排序
+        if streaming and not is_sorted_by_time(file_path):
+            print(f"{file_path.name} 未按時間排序, 改用pandas導入")
+            streaming = False
+        if streaming:
+            # 逐塊直接寫入catalog的bar schema, 不建立DataFrame及Bar對象
+            stats["bars"] = stream_bars_to_catalog(
+                file_path,
+                catalog_path,
+                bar_type_string,
+                instrument,
+                processed_path=(
+                    processed_data_path / processed_filename
+                    if processed_data_path is not None
+                    else None
+                ),
+                partition=partition,
+                encoding=encoding,
+            )
+            stats["seconds"] = time.perf_counter() - started
+            return stats
+
+        # 讀取原始數據
+        raw_data = pd.read_parquet(file_path)
+        raw_data.rename(columns={"date": "timestamp"}, inplace=True)
+        raw_data.set_index("timestamp", inplace=True)
+        # 穩定排序, 重複時間戳保留文件中的最後一行
+        raw_data.sort_values("timestamp", inplace=True, kind="stable")
+
+        # 保存處理後的數據
+        if processed_data_path is not None:
+            raw_data.to_parquet(processed_data_path / processed_filename)
+
+        # 只保留catalog中尚未存在的行 (去除重複時間戳)
+        new_data = select_new_rows(raw_data, bar_time_range(catalog_path, bar_type_string))
+        if new_data.empty:
+            stats["seconds"] = time.perf_counter() - started
+            return stats
+
+        # 處理數據並追加寫入catalog, 文件名包含時間範圍以免覆蓋已有文件
+        wrangler = BarDataWrangler(
+            bar_type=BarType.from_str(bar_type_string), instrument=instrument
+        )
+        # Nautilus的寫入只支持設置row group大小, 壓縮及編碼使用默認值
+        catalog = ParquetDataCatalog(
+            catalog_path, max_rows_per_group=encoding_profile(encoding).row_group_rows
+        )
+        stats["bars"] = write_bar_frame(
+            catalog, bar_type_string, new_data, wrangler, partition
+        )
+    except Exception as e:
+        stats["error"] = str(e)
+    stats["seconds"] = time.perf_counter() - started
+    return stats
 
 
 def process_raw_data(
     raw_data_path: str | Path,
-    processed_data_path: str | Path,
+    processed_data_path: str | Path | None,
     catalog_path: str | Path,
-) -> None:
+    workers: int | None = None,
+    rebuild: bool = False,
+    snapshot_path: str | Path = SNAPSHOT_PATH,
+    streaming: bool = True,
+    partition: str | None = None,
+    encoding: str = "default",
+) -> list[dict]:
     """
     批量處理原始數據並將其保存到目錄中
 
+    各文件的讀取, 轉換及bar寫入在多個工作進程中並行執行. 交易對定義由主進程
+    統一寫入, 避免多個時間框架的文件同時寫入同一交易對.
+
+    默認以增量方式更新catalog: 只追加catalog中尚未存在的時間範圍, 重複運行
+    不會寫入重複數據, 可由cron每日執行.
+
     Parameters
     ----------
     raw_data_path : str | Path
         原始數據目錄的路徑
-    processed_data_path : str | Path
-        處理後數據保存的路徑
+    processed_data_path : str | Path, optional
+        處理後數據保存的路徑, None則不保存處理後的副本
     catalog_path : str | Path
         數據目錄的路徑
+    workers : int, optional
+        工作進程數, 默認為CPU核心數
+    rebuild : bool, default False
+        是否刪除並重建整個catalog
+    snapshot_path : str | Path
+        交易對定義快照的路徑, 由`data.utils.binance.instrument_snapshot`生成
+    streaming : bool, default True
+        是否以Arrow串流方式逐塊導入 (內存只取決於塊大小), False則使用pandas
+        及`BarDataWrangler`整個文件導入. 未按時間排序的文件總是以pandas導入.
+        兩種方式對重複時間戳都保留最後一行, 寫入的catalog相同
+    partition : str, optional
+        "day" 或 "month": 每個bar類型每天或每月寫入一個文件, 短時間範圍的
+        回測只需讀取對應的文件. None則每次導入寫入單一文件
+    encoding : str, default "default"
+        bar文件的編碼配置名稱, 見`src.catalog_bars.ENCODING_PROFILES`及
+        `python -m benchmarks.catalog_encoding`. 非串流導入只使用其row group大小
+
+    Returns
+    -------
+    list[dict]
+        每個文件的處理統計 (文件名, bar類型, bar數量, 耗時及錯誤信息)
     """
     # 轉換路徑為Path對象
     raw_data_path = Path(raw_data_path)
-    processed_data_path = Path(processed_data_path)
     catalog_path = Path(catalog_path)
 
     # 驗證路徑
@@ -101,69 +205,132 @@ def process_raw_data(
         raise ValueError(f"原始數據路徑不存在: {raw_data_path}")
 
     # 創建必要的目錄
-    processed_data_path.mkdir(parents=True, exist_ok=True)
-
-    # 如果catalog_path存在, 刪除並重建
-    if catalog_path.exists():
-        shutil.rmtree(catalog_path)
-    catalog_path.mkdir(parents=True)
-
+    if processed_data_path is not None:
+        processed_data_path = Path(processed_data_path)
+        processed_data_path.mkdir(parents=True, exist_ok=True)
+
+    # 寫入期間鎖定catalog, 避免重疊運行重複追加數據. 重建時在鎖內清空catalog,
+    # 保留鎖文件, 以免刪除其他運行持有的鎖
+    with catalog_write_lock(catalog_path):
+        if rebuild:
+            clear_catalog(catalog_path)
+        return _process_files(
+            raw_data_path,
+            processed_data_path,
+            catalog_path,
+            workers,
+            snapshot_path,
+            streaming,
+            partition,
+            encoding,
+        )
+
+
+def _process_files(
+    raw_data_path: Path,
+    processed_data_path: Path | None,
+    catalog_path: Path,
+    workers: int | None,
+    snapshot_path: str | Path,
+    streaming: bool,
+    partition: str | None,
+    encoding: str,
+) -> list[dict]:
     # 創建catalog實例
     catalog = ParquetDataCatalog(catalog_path)
 
-    # 獲取交易所提供者
-    provider: BinanceFuturesInstrumentProvider = asyncio.run(create_provider())
+    # 從本地快照讀取交易對定義, 不需要網絡
+    provider = InstrumentSnapshot.load(snapshot_path)
 
     # 添加交易場所
     BINANCE = Venue("BINANCE")
 
-    # 處理所有futures類型的parquet文件
-    for file_path in raw_data_path.glob("*-futures.parquet"):
+    # 解析所有futures類型的parquet文件, 確定bar類型及交易對
+    jobs = []
+    instruments = {}
+    bar_types = {}
+    for file_path in sorted(raw_data_path.glob("*-futures.parquet")):
         try:
-            print(f"正在處理: {file_path.name}")
-
-            # 讀取原始數據
-            raw_data = pd.read_parquet(file_path)
-            raw_data.rename(columns={"date": "timestamp"}, inplace=True)
-            raw_data.set_index("timestamp", inplace=True)
-            raw_data.sort_values("timestamp", inplace=True)
-
-            # 保存處理後的數據
-            processed_filename = file_path.name.replace(".parquet", "-processed.parquet")
-            processed_file_path = processed_data_path / processed_filename
-            raw_data.to_parquet(processed_file_path)
-
-            # 解析文件名並構建bar類型字符串
-            parsed_data = parse_instrument_string(processed_filename)
-            bar_type_string = construct_bar_type_string(parsed_data)
-
-            # 獲取交易對信息
-            base_pair = parsed_data["base_pair"]
-            symbol = Symbol(f"{base_pair}USDT-PERP")
-            instrument_id = InstrumentId(symbol=symbol, venue=BINANCE)
-            instrument = provider.find(instrument_id)
-
-            if instrument is None:
-                print(f"無法找到交易對 {instrument_id}, 跳過處理")
-                continue
-
-            # 處理數據
-            wrangler = BarDataWrangler(
-                bar_type=BarType.from_str(bar_type_string), instrument=instrument
+            parsed_data = parse_instrument_string(file_path.name)
+        except ValueError as e:
+            print(e)
+            continue
+        bar_type_string = construct_bar_type_string(parsed_data)
+        if bar_type_string in bar_types:
+            print(
+                f"{file_path.name} 與 {bar_types[bar_type_string]} 的bar類型相同, 跳過處理"
             )
-            processed_bars = wrangler.process(raw_data)
-
-            # 寫入catalog
-            catalog.write_data([instrument], basename_template=f"{instrument.id.value}")
-            catalog.write_data(processed_bars, basename_template=f"{bar_type_string}")
+            continue
 
-            print(f"成功處理並保存: {file_path.name}")
+        # 獲取交易對信息
+        base_pair = parsed_data["base_pair"]
+        symbol = Symbol(f"{base_pair}USDT-PERP")
+        instrument_id = InstrumentId(symbol=symbol, venue=BINANCE)
+        instrument = provider.find(instrument_id)
 
-        except Exception as e:
-            print(f"處理 {file_path.name} 時發生錯誤: {e!s}")
+        if instrument is None:
+            print(f"無法找到交易對 {instrument_id}, 跳過處理")
             continue
 
+        bar_types[bar_type_string] = file_path.name
+        instruments[instrument.id] = instrument
+        jobs.append(
+            (
+                file_path,
+                processed_data_path,
+                catalog_path,
+                bar_type_string,
+                instrument,
+                streaming,
+                partition,
+                encoding,
+            )
+        )
+
+    # 每個交易對只寫入一次
+    for instrument in instruments.values():
+        write_instrument(catalog, instrument)
+
+    if not jobs:
+        print("沒有需要處理的文件")
+        return []
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    print(f"使用 {workers} 個進程處理 {len(jobs)} 個文件...")
+
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        futures = [executor.submit(_ingest_file, *job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), start=1):
+            stats = future.result()
+            results.append(stats)
+            if "error" in stats:
+                print(f"[{done}/{len(jobs)}] 處理 {stats['file']} 時發生錯誤: {stats['error']}")
+            elif stats["bars"] == 0:
+                print(f"[{done}/{len(jobs)}] {stats['file']} 沒有新數據")
+            else:
+                print(
+                    f"[{done}/{len(jobs)}] 成功處理並保存: {stats['file']} "
+                    f"({stats['bars']} bars, {stats['seconds']:.1f}s)"
+                )
+    elapsed = time.perf_counter() - started
+
+    # 更新catalog索引, 只讀取本次寫入的bar類型的元數據
+    update_manifest(catalog_path, [stats["bar_type"] for stats in results])
+
+    # 吞吐量報告
+    succeeded = [stats for stats in results if "error" not in stats]
+    total_bars = sum(stats["bars"] for stats in succeeded)
+    busy = sum(stats["seconds"] for stats in results)
     print("\n所有數據處理完成！")
+    print(f"文件: {len(succeeded)} 成功, {len(results) - len(succeeded)} 失敗")
+    print(f"Bars: {total_bars:,}, 總耗時 {elapsed:.1f}s, {total_bars / elapsed:,.0f} bars/s")
+    print(f"並行加速: {busy / elapsed:.1f}x ({workers} 個進程)")
+    return results
 
 
 if __name__ == "__main__":
@@ -174,6 +341,12 @@ if __name__ == "__main__":
 
     process_raw_data(
         raw_data_path=RAW_DATA_PATH,
-        processed_data_path=PROCESSED_DATA_PATH,
+        processed_data_path=(
+            PROCESSED_DATA_PATH if os.getenv("KEEP_PROCESSED") == "1" else None
+        ),
         catalog_path=CATALOG_PATH,
+        workers=int(os.getenv("INGEST_WORKERS", "0")) or None,
+        rebuild=os.getenv("REBUILD_CATALOG") == "1",
+        partition=os.getenv("CATALOG_PARTITION") or None,
+        encoding=os.getenv("CATALOG_ENCODING", "default"),
     )
@@ -0,0 +1,31 @@
+# 掃描catalog中所有bar序列的數據質量問題: 缺失bar, 重複或亂序時間戳, OHLC不一致, 成交量異常
+#
+# 在專案根目錄執行: python -m data.utils.binance.scan_catalog
+import sys
+
+from src.catalog_verify import print_quality_report, scan_catalog
+
+
+def check_quality(catalog_path: str = "data/binance/catalog", volume_zscore: float = 8.0) -> bool:
+    """
+    掃描catalog並打印有問題的bar類型
+
+    Parameters
+    ----------
+    catalog_path : str
+        catalog的路徑
+    volume_zscore : float
+        成交量異常的穩健z分數閾值
+
+    Returns
+    -------
+    bool
+        所有bar序列都沒有問題時返回True
+    """
+    report = scan_catalog(catalog_path, volume_zscore=volume_zscore)
+    print_quality_report(report)
+    return report.is_empty() or report["issues"].sum() == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_quality() else 1)
@@ -0,0 +1,254 @@
+# 以Arrow串流方式將原始bar文件逐塊寫入catalog, 不經過pandas及Bar對象
+#
+# 內存使用只取決於每塊的行數, 多GB的1分鐘歷史數據也可直接導入
+import os
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from nautilus_trader.model.data import Bar, BarType
+from nautilus_trader.serialization.arrow.serializer import ArrowSerializer
+
+from src.catalog_bars import (
+    BAR_PRICE_COLUMNS,
+    EncodingProfile,
+    bar_time_range,
+    bar_type_dir,
+    encode_fixed,
+    encoding_profile,
+    partition_keys,
+    partition_slices,
+)
+
+
+# 每塊讀取的行數
+CHUNK_ROWS = 500_000
+
+
+def catalog_bar_schema(bar_type: str, instrument) -> pa.Schema:
+    """
+    返回catalog中`bar_type`的bar文件schema (包含bar類型及精度元數據)
+
+    Schema由Nautilus自身的序列化器生成, 因此與`catalog.write_data`寫入的
+    文件一致 (包括標準精度與高精度構建下不同的定點數類型).
+    """
+    bar = Bar(
+        BarType.from_str(bar_type),
+        instrument.make_price(0),
+        instrument.make_price(0),
+        instrument.make_price(0),
+        instrument.make_price(0),
+        instrument.make_qty(0),
+        0,
+        0,
+    )
+    return ArrowSerializer.serialize_batch([bar], data_cls=Bar).schema
+
+
+def _timestamp_nanos(column: pa.Array) -> np.ndarray:
+    # 原始文件的時間列可能是毫秒或納秒精度, 統一轉換為UNIX納秒
+    if pa.types.is_timestamp(column.type):
+        column = column.cast(pa.timestamp("ns", column.type.tz))
+    return column.cast(pa.int64()).to_numpy()
+
+
+class _RangeFile:
+    """
+    先寫入臨時路徑, 關閉時以時間範圍命名的bar文件
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        bar_type: str,
+        schema: pa.Schema,
+        encoding: EncodingProfile,
+        key=None,
+    ):
+        self.directory = directory
+        self.bar_type = bar_type
+        self.key = key
+        self.row_group_rows = encoding.row_group_rows
+        self.tmp_path = directory / f".{bar_type}-{os.getpid()}-{key}.parquet.tmp"
+        self.writer = pq.ParquetWriter(self.tmp_path, schema, **encoding.writer_options(schema))
+        self.first_ts = self.last_ts = None
+
+    def write(self, table: pa.Table, ts: np.ndarray) -> None:
+        self.writer.write_table(table, row_group_size=self.row_group_rows)
+        self.first_ts = ts[0] if self.first_ts is None else self.first_ts
+        self.last_ts = ts[-1]
+
+    def close(self) -> None:
+        self.writer.close()
+        os.replace(
+            self.tmp_path,
+            self.directory / f"{self.bar_type}-{self.first_ts}-{self.last_ts}.parquet",
+        )
+
+    def abort(self) -> None:
+        self.writer.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+def is_sorted_by_time(source_path: str | Path, chunk_rows: int = CHUNK_ROWS) -> bool:
+    """
+    原始bar文件是否已按時間排序 (允許重複時間戳), 只逐塊讀取時間列
+    """
+    source = pq.ParquetFile(source_path)
+    time_column = "date" if "date" in source.schema_arrow.names else "timestamp"
+    previous_ts = None
+    for batch in source.iter_batches(batch_size=chunk_rows, columns=[time_column]):
+        ts = _timestamp_nanos(batch.column(0))
+        if len(ts) == 0:
+            continue
+        if previous_ts is not None and ts[0] < previous_ts:
+            return False
+        if np.any(np.diff(ts) < 0):
+            return False
+        previous_ts = ts[-1]
+    return True
+
+
+def stream_bars_to_catalog(
+    source_path: str | Path,
+    catalog_path: str | Path,
+    bar_type: str,
+    instrument,
+    processed_path: str | Path | None = None,
+    chunk_rows: int = CHUNK_ROWS,
+    partition: str | None = None,
+    encoding: str = "default",
+) -> int:
+    """
+    將已按時間排序的原始bar文件逐塊轉換並追加寫入catalog
+
+    與`select_new_rows`相同, 只寫入catalog中已有時間範圍之外的行, 重複
+    時間戳保留最後一行 (跨塊的重複同樣處理). 新文件先寫入臨時文件, 完成
+    後以時間範圍命名, 中途失敗不會留下不完整的bar文件. 指定`partition`時
+    每天或每月寫入一個文件, 按時間範圍查詢時只需打開對應的文件. 未排序的
+    文件可先以`is_sorted_by_time`檢查, 改用pandas導入.
+
+    Parameters
+    ----------
+    source_path : str | Path
+        原始bar文件, 包含 date (或 timestamp), open, high, low, close, volume 列
+    catalog_path : str | Path
+        catalog的路徑
+    bar_type : str
+        寫入的bar類型字符串
+    instrument : Instrument
+        交易對定義, 提供價格及數量精度
+    processed_path : str | Path, optional
+        如果提供, 同時寫入以timestamp為時間列的處理後副本
+    chunk_rows : int
+        每塊讀取的行數
+    partition : str, optional
+        "day" 或 "month" (UTC), None則寫入單一文件
+    encoding : str, default "default"
+        `ENCODING_PROFILES`中的編碼配置名稱 (壓縮, 字典編碼, row group大小)
+
+    Returns
+    -------
+    int
+        寫入的bar數量
+
+    Raises
+    ------
+    ValueError
+        如果原始文件未按時間排序
+    """
+    source = pq.ParquetFile(source_path)
+    time_column = "date" if "date" in source.schema_arrow.names else "timestamp"
+    value_columns = [*BAR_PRICE_COLUMNS, "volume"]
+    schema = catalog_bar_schema(bar_type, instrument)
+    profile = encoding_profile(encoding)
+    precisions = {name: int(schema.metadata[b"price_precision"]) for name in BAR_PRICE_COLUMNS}
+    precisions["volume"] = int(schema.metadata[b"size_precision"])
+    stored = bar_time_range(catalog_path, bar_type)
+
+    directory = bar_type_dir(catalog_path, bar_type)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    current = None
+    processed_writer = None
+    # 每塊的最後一行留待下一塊: 下一塊以相同時間戳開始時由其取代
+    pending = None
+    written = 0
+
+    def write_rows(ts: np.ndarray, values: dict[str, np.ndarray]) -> int:
+        nonlocal current
+        # 跳過catalog中已有的時間範圍
+        if stored is not None:
+            keep = (ts < stored[0]) | (ts > stored[1])
+            ts, values = ts[keep], {name: v[keep] for name, v in values.items()}
+        if len(ts) == 0:
+            return 0
+
+        columns = {
+            name: encode_fixed(values[name], precisions[name], schema.field(name).type)
+            for name in value_columns
+        }
+        columns["ts_event"] = pa.array(ts.astype(np.uint64))
+        columns["ts_init"] = columns["ts_event"]
+        table = pa.table(
+            [columns[field.name].cast(field.type) for field in schema],
+            schema=schema,
+        )
+
+        # 每個分區寫入一個文件, 進入新分區時完成上一個文件
+        for part in partition_slices(ts, partition):
+            key = None if partition is None else partition_keys(ts[part][:1], partition)[0]
+            if current is not None and current.key != key:
+                current.close()
+                current = None
+            if current is None:
+                current = _RangeFile(directory, bar_type, schema, profile, key)
+            current.write(table.slice(part.start, part.stop - part.start), ts[part])
+        return len(ts)
+
+    try:
+        for batch in source.iter_batches(
+            batch_size=chunk_rows,
+            columns=[time_column, *value_columns],
+        ):
+            if processed_path is not None:
+                renamed = batch.rename_columns(["timestamp", *value_columns])
+                if processed_writer is None:
+                    processed_writer = pq.ParquetWriter(processed_path, renamed.schema)
+                processed_writer.write_batch(renamed)
+
+            if batch.num_rows == 0:
+                continue
+            ts = _timestamp_nanos(batch.column(time_column))
+            values = {
+                name: batch.column(name).to_numpy(zero_copy_only=False)
+                for name in value_columns
+            }
+            if pending is not None:
+                ts = np.concatenate([pending[0], ts])
+                values = {
+                    name: np.concatenate([pending[1][name], v]) for name, v in values.items()
+                }
+
+            # 檢查排序, 重複時間戳只保留最後一行
+            if np.any(np.diff(ts) < 0):
+                raise ValueError(f"{source_path} 未按時間排序, 無法串流導入")
+            keep = np.append(ts[1:] != ts[:-1], True)
+            keep[-1] = False
+            pending = (ts[-1:], {name: v[-1:] for name, v in values.items()})
+            written += write_rows(ts[keep], {name: v[keep] for name, v in values.items()})
+
+        if pending is not None:
+            written += write_rows(*pending)
+    except BaseException:
+        if current is not None:
+            current.abort()
+        raise
+    finally:
+        if processed_writer is not None:
+            processed_writer.close()
+
+    if current is not None:
+        current.close()
+    return written
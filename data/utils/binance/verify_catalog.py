@@ -1,24 +1,36 @@
-from pathlib import Path
+# 檢查catalog內容: 數量及時間範圍讀自Parquet元數據, 統計數據以列式掃描計算
+#
+# 在專案根目錄執行: python -m data.utils.binance.verify_catalog
+from src.catalog_bars import read_bars
+from src.catalog_verify import print_summary, summarize_catalog
 
-from nautilus_trader.model.data import Bar
-from nautilus_trader.persistence.catalog import ParquetDataCatalog
 
+def check_catalog(catalog_path: str = "data/binance/catalog", bar_step: str = "5-MINUTE"):
+    """
+    打印catalog中每個bar類型的bar數量, 時間範圍, 以及`bar_step`的首尾bar
 
-def check_catalog(catalog_path: str = "data/binance/catalog"):
-    catalog = ParquetDataCatalog(Path(catalog_path))
-
+    Parameters
+    ----------
+    catalog_path : str
+        catalog的路徑
+    bar_step : str
+        打印首尾bar的bar步長, 默認為 "5-MINUTE"
+    """
     print("Checking catalog contents...")
-    instruments = catalog.instruments()
-    print(f"Found {len(instruments)} instruments")
+    summary = summarize_catalog(catalog_path)
+    print_summary(summary)
 
-    for instrument in instruments:
-        print(f"\nInstrument: {instrument.id}")
-        bar_type = f"{instrument.id}-5-MINUTE-LAST-EXTERNAL"
-        bars = catalog.query(data_cls=Bar, bar_types=[bar_type])
-        print(f"Found {len(bars)} bars")
-        if bars:
-            print(f"First bar: {bars[0]}")
-            print(f"Last bar: {bars[-1]}")
+    # 首尾bar只讀取對應時間戳所在的row group
+    selected = summary.filter(summary["bar_type"].str.contains(f"-{bar_step}-"))
+    for row in selected.iter_rows(named=True):
+        if not row["rows"]:
+            continue
+        bar_type = row["bar_type"]
+        first = read_bars(catalog_path, bar_type, row["first_ts"], row["first_ts"])
+        last = read_bars(catalog_path, bar_type, row["last_ts"], row["last_ts"])
+        print(f"\n{bar_type}")
+        print(f"First bar: {first.row(0, named=True)}")
+        print(f"Last bar: {last.row(0, named=True)}")
 
 
 if __name__ == "__main__":
@@ -1,17 +1,15 @@
+# 在專案根目錄執行: python -m data.utils.databento.download_historical
 import asyncio  # noqa
 import os
-import shutil
 from datetime import datetime  # noqa
 from datetime import timedelta  # noqa
 from pathlib import Path
 
-import pandas as pd
 from dotenv import load_dotenv
 from nautilus_trader.adapters.databento.constants import PUBLISHERS_FILEPATH  # noqa
 from nautilus_trader.adapters.databento.data_utils import databento_data
 from nautilus_trader.adapters.databento.data_utils import init_databento_client
 from nautilus_trader.adapters.databento.data_utils import load_catalog  # noqa
-from nautilus_trader.adapters.databento.loaders import DatabentoDataLoader
 from nautilus_trader.model.data import BarType
 from nautilus_trader.model.identifiers import InstrumentId
 from nautilus_trader.model.identifiers import Symbol  # noqa
@@ -19,6 +17,19 @@ from nautilus_trader.model.identifiers import Venue
 from nautilus_trader.persistence.catalog import ParquetDataCatalog
 from nautilus_trader.persistence.wranglers import BarDataWrangler
 
+from data.utils.databento.ohlcv import read_ohlcv_dbn
+from src.catalog_bars import (
+    ROW_GROUP_ROWS,
+    bar_time_range,
+    catalog_write_lock,
+    clear_catalog,
+    select_new_rows,
+    to_unix_nanos,
+    write_bar_frame,
+    write_instrument,
+)
+from src.catalog_manifest import update_manifest
+
 
 # 加載.env文件中的環境變量
 env_path = Path(__file__).parents[3] / ".env"
@@ -39,6 +50,8 @@ def process_databento_data(
     raw_data_path: str | Path = "data/databento/raw",
     processed_data_path: str | Path = "data/databento/processed",
     catalog_path: str | Path = "data/databento/catalog",
+    rebuild: bool = False,
+    partition: str | None = None,
 ) -> None:
     """
     從Databento下載股票數據, 處理並保存到ParquetDataCatalog中
@@ -61,6 +74,11 @@ def process_databento_data(
         處理後數據保存路徑
     catalog_path : str | Path, optional
         數據目錄保存路徑
+    rebuild : bool, default False
+        是否刪除並重建整個catalog. 默認以增量方式只追加catalog中尚未存在的
+        時間範圍, 不影響其他股票的數據
+    partition : str, optional
+        "day" 或 "month": 每天或每月寫入一個bar文件, None則寫入單一文件
     """
     # 轉換路徑為Path對象
     raw_data_path = Path(raw_data_path)
@@ -71,10 +89,11 @@ def process_databento_data(
     raw_data_path.mkdir(parents=True, exist_ok=True)
     processed_data_path.mkdir(parents=True, exist_ok=True)
 
-    # 如果catalog_path存在, 刪除並重建
-    if catalog_path.exists():
-        shutil.rmtree(catalog_path)
-    catalog_path.mkdir(parents=True)
+    # 如果需要重建, 在鎖內清空catalog, 保留其他運行持有的鎖文件
+    if rebuild:
+        with catalog_write_lock(catalog_path):
+            clear_catalog(catalog_path)
+    catalog_path.mkdir(parents=True, exist_ok=True)
 
     # 初始化Databento客戶端
     init_databento_client(API_KEY)
@@ -96,6 +115,24 @@ def process_databento_data(
     else:
         raise ValueError(f"不支持的時間框架: {timeframe}")
 
+    # 構建條形圖類型字符串
+    # 將timeframe轉換為Nautilus格式
+    if timeframe == "1m":
+        bar_type_str = f"{symbol}.{venue}-1-MINUTE-LAST-EXTERNAL"
+    elif timeframe == "1h":
+        bar_type_str = f"{symbol}.{venue}-1-HOUR-LAST-EXTERNAL"
+    elif timeframe == "1d":
+        bar_type_str = f"{symbol}.{venue}-1-DAY-LAST-EXTERNAL"
+
+    # 請求的時間範圍已完全存在於catalog中時無需下載
+    time_range = bar_time_range(catalog_path, bar_type_str)
+    if time_range is not None and (
+        time_range[0] <= to_unix_nanos(start_time)
+        and to_unix_nanos(end_time) <= time_range[1]
+    ):
+        print(f"{bar_type_str} 在 {start_time} 到 {end_time} 的數據已存在, 跳過下載")
+        return
+
     print(f"開始下載 {symbol} 從 {start_time} 到 {end_time} 的 {schema} 數據...")
 
     try:
@@ -116,45 +153,18 @@ def process_databento_data(
         databento_file = result["databento_data_file"]
         print(f"數據成功下載到: {databento_file}")
 
-        # 讀取數據並進行處理
-        loader = DatabentoDataLoader()
-        bars = loader.from_dbn_file(
-            path=databento_file, as_legacy_cython=False  # 獲取PyO3對象以便稍後處理
-        )
-
-        # 構建要保存的原始數據
-        raw_data = pd.DataFrame()
-        for bar in bars:
-            data = {
-                "timestamp": pd.Timestamp(bar.ts_event, unit="ns"),
-                "open": float(bar.open),
-                "high": float(bar.high),
-                "low": float(bar.low),
-                "close": float(bar.close),
-                "volume": float(bar.volume),
-            }
-            raw_data = pd.concat([raw_data, pd.DataFrame([data])], ignore_index=True)
+        # 一次性將DBN文件解碼為列式數據
+        raw_data = read_ohlcv_dbn(databento_file)
 
         # 保存處理後的數據
         processed_filename = f"{symbol}_{venue}_{timeframe}-processed.parquet"
         processed_file_path = processed_data_path / processed_filename
 
-        raw_data.set_index("timestamp", inplace=True)
-        raw_data.sort_index(inplace=True)
         raw_data.to_parquet(processed_file_path)
         print(f"處理後的數據保存到: {processed_file_path}")
 
         # 創建數據目錄實例
-        catalog = ParquetDataCatalog(catalog_path)
-
-        # 構建條形圖類型字符串
-        # 將timeframe轉換為Nautilus格式
-        if timeframe == "1m":
-            bar_type_str = f"{symbol}.{venue}-1-MINUTE-LAST-EXTERNAL"
-        elif timeframe == "1h":
-            bar_type_str = f"{symbol}.{venue}-1-HOUR-LAST-EXTERNAL"
-        elif timeframe == "1d":
-            bar_type_str = f"{symbol}.{venue}-1-DAY-LAST-EXTERNAL"
+        catalog = ParquetDataCatalog(catalog_path, max_rows_per_group=ROW_GROUP_ROWS)
 
         # 構造Instrument對象(這裡使用從Databento中獲取的工具定義)
         if result.get("nautilus_definition"):
@@ -165,23 +175,23 @@ def process_databento_data(
             print(f"警告:未找到工具定義, 使用基本ID: {instrument_id}")
             # 在這種情況下, 我們將只能寫入資料, 但沒有完整的工具元數據
 
-        # 使用BarDataWrangler處理數據
-        bar_type = BarType.from_str(bar_type_str)
-        wrangler = BarDataWrangler(bar_type=bar_type, instrument=instrument)
-        processed_bars = wrangler.process(raw_data)
+        with catalog_write_lock(catalog_path):
+            # 只保留catalog中尚未存在的行 (去除重複時間戳)
+            new_data = select_new_rows(raw_data, bar_time_range(catalog_path, bar_type_str))
 
-        # 寫入工具和條形圖數據到目錄
-        catalog.write_data([instrument], basename_template=f"{instrument.id.value}")
-        catalog.write_data(processed_bars, basename_template=bar_type_str)
+            # 寫入工具和條形圖數據到目錄, 文件名包含時間範圍以免覆蓋已有文件
+            write_instrument(catalog, instrument)
+            bar_type = BarType.from_str(bar_type_str)
+            wrangler = BarDataWrangler(bar_type=bar_type, instrument=instrument)
+            written = write_bar_frame(catalog, bar_type_str, new_data, wrangler, partition)
+            update_manifest(catalog_path, [bar_type_str])
 
         print(f"\n成功處理並保存數據到目錄: {catalog_path}")
-        print(f"已處理 {len(processed_bars)} 個條形圖")
+        print(f"已追加 {written} 個條形圖")
 
         # 顯示數據範圍
-        if processed_bars:
-            first_bar = processed_bars[0]
-            last_bar = processed_bars[-1]
-            print(f"數據範圍: {first_bar.ts_init} 到 {last_bar.ts_init}")
+        if written:
+            print(f"數據範圍: {new_data.index[0]} 到 {new_data.index[-1]}")
 
     except Exception as e:
         print(f"處理數據時發生錯誤: {e}")
@@ -0,0 +1,410 @@
+# 多股票並行Databento下載器: 按月分塊, 限速並行下載, 原始DBN文件本地緩存, 可中斷後續傳
+#
+# 在專案根目錄執行: python -m data.utils.databento.downloader
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import NamedTuple
+
+import pandas as pd
+from dotenv import load_dotenv
+from nautilus_trader.adapters.databento.loaders import DatabentoDataLoader
+from nautilus_trader.model.data import BarType
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+from nautilus_trader.persistence.wranglers import BarDataWrangler
+
+from data.utils.databento.ohlcv import read_ohlcv_dbn
+from src.catalog_bars import (
+    ROW_GROUP_ROWS,
+    bar_time_range,
+    catalog_write_lock,
+    select_new_rows,
+    write_bar_frame,
+    write_instrument,
+)
+from src.catalog_manifest import update_manifest
+
+
+# 加載.env文件中的環境變量
+env_path = Path(__file__).parents[3] / ".env"
+load_dotenv(dotenv_path=env_path)
+
+# 時間框架對應的Databento schema及Nautilus bar步長
+SCHEMAS = {"1m": "ohlcv-1m", "1h": "ohlcv-1h", "1d": "ohlcv-1d"}
+BAR_STEPS = {"1m": "1-MINUTE", "1h": "1-HOUR", "1d": "1-DAY"}
+
+
+class Chunk(NamedTuple):
+    """
+    一個下載單位: 一個股票, 一個schema, 一個自然月 (`end`為下月第一天, 不包含在內)
+    """
+
+    symbol: str
+    schema: str
+    start: pd.Timestamp
+    end: pd.Timestamp
+
+
+def monthly_chunks(
+    symbols: list[str],
+    schema: str,
+    start_date: str,
+    end_date: str,
+) -> list[Chunk]:
+    """
+    將日期範圍按自然月拆分為下載塊
+
+    每個塊覆蓋完整的自然月, 與請求的起止日期無關, 使緩存文件可在不同的
+    請求之間重用.
+
+    Parameters
+    ----------
+    symbols : list[str]
+        股票代碼
+    schema : str
+        Databento schema, 例如 "ohlcv-1m"
+    start_date : str
+        開始日期 "YYYY-MM-DD"
+    end_date : str
+        結束日期 "YYYY-MM-DD" (包含在內)
+    """
+    first = pd.Timestamp(start_date, tz="UTC").normalize().replace(day=1)
+    last = pd.Timestamp(end_date, tz="UTC").normalize().replace(day=1)
+    bounds = pd.date_range(first, last + pd.offsets.MonthBegin(1), freq="MS")
+    return [
+        Chunk(symbol, schema, chunk_start, chunk_end)
+        for symbol in symbols
+        for chunk_start, chunk_end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+class RawCache:
+    """
+    以股票, schema及自然月為鍵的原始DBN文件緩存
+
+    文件先寫入臨時路徑再重命名, 中斷的下載不會被視為已完成, 重新運行時
+    只下載缺失的塊. 重新下載尚未結束的月份時覆蓋同一文件.
+
+    Parameters
+    ----------
+    directory : str | Path
+        緩存目錄
+    """
+
+    def __init__(self, directory: str | Path = "data/databento/raw"):
+        self.directory = Path(directory)
+
+    def path(self, chunk: Chunk) -> Path:
+        """返回塊的緩存文件路徑"""
+        return (
+            self.directory
+            / chunk.schema
+            / chunk.symbol
+            / f"{chunk.symbol}_{chunk.schema}_{chunk.start:%Y-%m}.dbn.zst"
+        )
+
+    def has(self, chunk: Chunk) -> bool:
+        """塊是否已下載完成"""
+        return self.path(chunk).exists()
+
+
+class RateLimiter:
+    """
+    線程安全的請求限速器, 保證相鄰請求間隔不小於`1 / requests_per_second`
+    """
+
+    def __init__(self, requests_per_second: float):
+        self._interval = 1.0 / requests_per_second
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """阻塞直到允許下一個請求"""
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _fetch_chunk(
+    client,
+    dataset: str,
+    chunk: Chunk,
+    cache: RawCache,
+    limiter: RateLimiter,
+    retries: int,
+) -> Path:
+    path = cache.path(chunk)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.part")
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            client.timeseries.get_range(
+                dataset=dataset,
+                symbols=[chunk.symbol],
+                schema=chunk.schema,
+                start=chunk.start.isoformat(),
+                end=chunk.end.isoformat(),
+                path=tmp_path,
+            )
+            os.replace(tmp_path, path)
+            return path
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            if attempt == retries:
+                raise
+            time.sleep(2**attempt)
+
+
+def download_chunks(
+    client,
+    dataset: str,
+    chunks: list[Chunk],
+    cache: RawCache,
+    max_workers: int = 4,
+    requests_per_second: float = 5.0,
+    retries: int = 3,
+) -> list[Path]:
+    """
+    並行下載緩存中缺失的塊
+
+    已完成的月份直接使用緩存; 尚未結束的月份 (結束時間晚於當前時間) 每次
+    都重新下載, 以取得最新數據.
+
+    Parameters
+    ----------
+    client : databento.Historical
+        Databento客戶端, 或任何提供相同`timeseries.get_range(dataset, symbols,
+        schema, start, end, path)`接口的本地替代對象
+    dataset : str
+        數據集, 例如 "XNAS.ITCH"
+    chunks : list[Chunk]
+        要下載的塊
+    cache : RawCache
+        原始文件緩存
+    max_workers : int
+        並行下載數
+    requests_per_second : float
+        每秒最多發出的請求數
+    retries : int
+        每個塊失敗後的重試次數
+
+    Returns
+    -------
+    list[Path]
+        所有塊的緩存文件路徑
+    """
+    now = pd.Timestamp.now(tz="UTC")
+    pending = [chunk for chunk in chunks if not cache.has(chunk) or chunk.end > now]
+    print(f"{len(chunks) - len(pending)} 個塊已緩存, 需要下載 {len(pending)} 個塊")
+
+    limiter = RateLimiter(requests_per_second)
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_fetch_chunk, client, dataset, chunk, cache, limiter, retries): chunk
+            for chunk in pending
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            chunk = futures[future]
+            try:
+                future.result()
+                print(f"[{done}/{len(pending)}] 已下載 {cache.path(chunk).name}")
+            except Exception as e:
+                failed.append(chunk)
+                print(f"[{done}/{len(pending)}] 下載 {cache.path(chunk).name} 失敗: {e}")
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} 個塊下載失敗, 重新運行以續傳")
+    return [cache.path(chunk) for chunk in chunks]
+
+
+def load_instrument(path: Path):
+    """
+    從definition DBN文件解碼Nautilus交易對定義, 取最新的一條
+    """
+    instruments = DatabentoDataLoader().from_dbn_file(path=path, as_legacy_cython=True)
+    if not instruments:
+        raise ValueError(f"{path} 中沒有交易對定義")
+    return instruments[-1]
+
+
+def ingest_symbol(
+    files: list[Path],
+    definition: Path,
+    symbol: str,
+    venue: str,
+    timeframe: str,
+    catalog_path: str | Path,
+    partition: str | None = None,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+) -> int:
+    """
+    將股票的OHLCV文件解碼並增量寫入catalog
+
+    Parameters
+    ----------
+    files : list[Path]
+        OHLCV DBN文件
+    definition : Path
+        交易對定義DBN文件
+    symbol : str
+        股票代碼
+    venue : str
+        交易所代碼
+    timeframe : str
+        時間框架, "1m", "1h" 或 "1d"
+    catalog_path : str | Path
+        數據目錄路徑
+    partition : str, optional
+        "day" 或 "month": 每天或每月寫入一個bar文件, None則寫入單一文件
+    start, end : pd.Timestamp, optional
+        只寫入開盤時間在[start, end)範圍內的bar, None表示不限制
+
+    Returns
+    -------
+    int
+        寫入的bar數量
+    """
+    if not files:
+        raise ValueError(f"{symbol} 沒有 {SCHEMAS[timeframe]} 文件")
+
+    instrument = load_instrument(definition)
+    bar_type_str = f"{symbol}.{venue}-{BAR_STEPS[timeframe]}-LAST-EXTERNAL"
+    raw_data = pd.concat([read_ohlcv_dbn(path) for path in files])
+    # 月度文件可能超出請求的範圍: 開盤時間在[start, end)內即收盤時間在(start, end]內
+    if start is not None:
+        raw_data = raw_data[raw_data.index.tz_localize("UTC") > start]
+    if end is not None:
+        raw_data = raw_data[raw_data.index.tz_localize("UTC") <= end]
+
+    catalog = ParquetDataCatalog(catalog_path, max_rows_per_group=ROW_GROUP_ROWS)
+    write_instrument(catalog, instrument)
+
+    # 只保留catalog中尚未存在的行 (去除重複時間戳)
+    new_data = select_new_rows(raw_data, bar_time_range(catalog_path, bar_type_str))
+    if new_data.empty:
+        return 0
+    wrangler = BarDataWrangler(bar_type=BarType.from_str(bar_type_str), instrument=instrument)
+    return write_bar_frame(catalog, bar_type_str, new_data, wrangler, partition)
+
+
+def download_symbols(
+    symbols: list[str],
+    venue: str,
+    start_date: str,
+    end_date: str,
+    timeframe: str = "1m",
+    client=None,
+    cache_dir: str | Path = "data/databento/raw",
+    catalog_path: str | Path = "data/databento/catalog",
+    max_workers: int = 4,
+    requests_per_second: float = 5.0,
+    partition: str | None = None,
+) -> dict[str, int]:
+    """
+    下載多個股票的歷史數據並增量寫入catalog
+
+    Parameters
+    ----------
+    symbols : list[str]
+        股票代碼, 例如 ["PLTR", "NVDA"]
+    venue : str
+        交易所代碼, 例如 "XNAS"
+    start_date : str
+        開始日期 "YYYY-MM-DD"
+    end_date : str
+        結束日期 "YYYY-MM-DD" (包含在內)
+    timeframe : str, default "1m"
+        時間框架, "1m", "1h" 或 "1d"
+    client : databento.Historical, optional
+        Databento客戶端或本地替代對象, 默認以DATABENTO_API_KEY創建
+    cache_dir : str | Path
+        原始DBN文件緩存目錄
+    catalog_path : str | Path
+        數據目錄路徑
+    max_workers : int
+        並行下載數
+    requests_per_second : float
+        每秒最多發出的請求數
+    partition : str, optional
+        "day" 或 "month": 每天或每月寫入一個bar文件, None則每次寫入單一文件
+
+    Returns
+    -------
+    dict[str, int]
+        每個股票寫入的bar數量
+    """
+    if timeframe not in SCHEMAS:
+        raise ValueError(f"不支持的時間框架: {timeframe}")
+    if client is None:
+        import databento as db
+
+        api_key = os.environ.get("DATABENTO_API_KEY")
+        if not api_key:
+            raise ValueError("未找到DATABENTO_API_KEY環境變量, 請確保設置正確的API密鑰")
+        client = db.Historical(api_key)
+
+    dataset = f"{venue}.ITCH"
+    cache = RawCache(cache_dir)
+
+    # OHLCV按月分塊, 交易對定義取範圍內第一個月
+    chunks = monthly_chunks(symbols, SCHEMAS[timeframe], start_date, end_date)
+    definitions = {
+        chunk.symbol: chunk._replace(schema="definition")
+        for chunk in chunks
+        if chunk.start == chunks[0].start
+    }
+    download_chunks(
+        client,
+        dataset,
+        chunks + list(definitions.values()),
+        cache,
+        max_workers,
+        requests_per_second,
+    )
+
+    # 只寫入請求的日期範圍, 不包括月度文件中範圍以外的bar
+    start = pd.Timestamp(start_date, tz="UTC").normalize()
+    end = pd.Timestamp(end_date, tz="UTC").normalize() + pd.Timedelta(days=1)
+    written = {}
+    with catalog_write_lock(catalog_path):
+        for symbol in symbols:
+            try:
+                written[symbol] = ingest_symbol(
+                    [cache.path(chunk) for chunk in chunks if chunk.symbol == symbol],
+                    cache.path(definitions[symbol]),
+                    symbol,
+                    venue,
+                    timeframe,
+                    catalog_path,
+                    partition,
+                    start,
+                    end,
+                )
+                print(f"{symbol}: 已追加 {written[symbol]} 個條形圖")
+            except Exception as e:
+                print(f"處理 {symbol} 時發生錯誤: {e}")
+        update_manifest(
+            catalog_path,
+            [f"{symbol}.{venue}-{BAR_STEPS[timeframe]}-LAST-EXTERNAL" for symbol in written],
+        )
+    return written
+
+
+if __name__ == "__main__":
+    # 示例使用
+    download_symbols(
+        symbols=["PLTR", "NVDA", "TSLA"],
+        venue="XNAS",
+        start_date="2024-01-01",
+        end_date="2025-01-31",
+        timeframe="1m",
+        partition="month",
+    )
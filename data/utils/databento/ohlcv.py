@@ -0,0 +1,92 @@
+# 將Databento OHLCV DBN文件一次性解碼為列式數據, 供處理後文件及catalog寫入使用
+from pathlib import Path
+
+import databento as db
+import numpy as np
+import pandas as pd
+from databento_dbn import FIXED_PRICE_SCALE, Metadata, RType, Schema, SType
+
+
+OHLCV_PRICE_COLUMNS = ("open", "high", "low", "close")
+
+# OHLCV記錄的DBN二進制佈局 (56字節)
+OHLCV_DTYPE = np.dtype(
+    [
+        ("length", "u1"),
+        ("rtype", "u1"),
+        ("publisher_id", "<u2"),
+        ("instrument_id", "<u4"),
+        ("ts_event", "<u8"),
+        ("open", "<i8"),
+        ("high", "<i8"),
+        ("low", "<i8"),
+        ("close", "<i8"),
+        ("volume", "<u8"),
+    ]
+)
+
+# 各OHLCV記錄類型的bar長度 (納秒)
+OHLCV_INTERVALS = {
+    int(RType.OHLCV_1S): 1_000_000_000,
+    int(RType.OHLCV_1M): 60_000_000_000,
+    int(RType.OHLCV_1H): 3_600_000_000_000,
+    int(RType.OHLCV_1D): 86_400_000_000_000,
+}
+
+
+def ohlcv_frame(records: np.ndarray, timestamp_on_close: bool = True) -> pd.DataFrame:
+    """
+    將OHLCV記錄數組轉換為以timestamp為索引的浮點數DataFrame
+
+    Parameters
+    ----------
+    records : np.ndarray
+        `DBNStore.to_ndarray()`返回的結構化數組, 價格為1e-9定點整數
+    timestamp_on_close : bool, default True
+        Databento的ts_event為bar開盤時間, True時加上bar長度以收盤時間為
+        時間戳, 與`DatabentoDataLoader`的默認行為一致
+
+    Returns
+    -------
+    pd.DataFrame
+        open, high, low, close, volume列, 按時間排序, 可直接傳給`BarDataWrangler`
+    """
+    columns = {
+        name: records[name].astype(np.float64) / FIXED_PRICE_SCALE
+        for name in OHLCV_PRICE_COLUMNS
+    }
+    columns["volume"] = records["volume"].astype(np.float64)
+    ts = records["ts_event"].astype(np.int64)
+    if timestamp_on_close and len(records):
+        intervals = np.array([OHLCV_INTERVALS[int(r)] for r in np.unique(records["rtype"])])
+        if len(intervals) != 1:
+            raise ValueError("OHLCV records mix several bar intervals")
+        ts = ts + intervals[0]
+    index = pd.DatetimeIndex(ts.astype("datetime64[ns]"), name="timestamp")
+    return pd.DataFrame(columns, index=index).sort_index(kind="stable")
+
+
+def read_ohlcv_dbn(path: str | Path, timestamp_on_close: bool = True) -> pd.DataFrame:
+    """
+    讀取OHLCV DBN文件 (可為zstd壓縮) 為浮點數DataFrame
+
+    整個文件以結構化數組一次性解碼, 耗時與行數成線性關係.
+    """
+    records = db.DBNStore.from_file(path).to_ndarray()
+    return ohlcv_frame(records, timestamp_on_close)
+
+
+def write_dbn(path: Path, records: np.ndarray, symbol: str = "BENCH") -> None:
+    """
+    將`OHLCV_DTYPE`格式的1分鐘OHLCV記錄寫為未壓縮的DBN文件, 供基準測試及測試使用
+    """
+    metadata = Metadata(
+        dataset="XNAS.ITCH",
+        start=int(records["ts_event"][0]),
+        end=int(records["ts_event"][-1]) + OHLCV_INTERVALS[int(RType.OHLCV_1M)],
+        stype_in=SType.RAW_SYMBOL,
+        stype_out=SType.INSTRUMENT_ID,
+        schema=Schema.OHLCV_1M,
+        symbols=[symbol],
+    )
+    path.write_bytes(bytes(metadata.encode()) + records.tobytes())
@@ -0,0 +1,419 @@
+# 生成合成永續合約1分鐘bar的ParquetDataCatalog, 供基準測試及回測吞吐量測試離線使用
+#
+# 在專案根目錄執行:
+#     python -m data.utils.synthetic.generate_catalog [交易對數量] [年數] [catalog路徑]
+# 同一seed生成的數據完全相同
+import math
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from nautilus_trader.model.currencies import USDT
+from nautilus_trader.model.enums import CurrencyType
+from nautilus_trader.model.identifiers import InstrumentId, Symbol
+from nautilus_trader.model.instruments import CryptoPerpetual
+from nautilus_trader.model.objects import QUANTITY_MAX, Currency, Price, Quantity
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+
+from data.utils.binance.stream_ingest import catalog_bar_schema
+from src.catalog_bars import (
+    BAR_PRICE_COLUMNS,
+    bar_type_dir,
+    catalog_write_lock,
+    encode_fixed,
+    encoding_profile,
+    partition_slices,
+    write_instrument,
+)
+from src.catalog_manifest import update_manifest
+
+
+NANOS_PER_MINUTE = 60_000_000_000
+MINUTES_PER_DAY = 1440
+VENUE = "BINANCE"
+
+# 價格模型參數
+START_PRICE_RANGE = (0.01, 50_000)  # 起始價格範圍 (對數均勻分佈)
+ANNUAL_VOL_RANGE = (0.4, 1.2)  # 年化波動率範圍
+JUMPS_PER_DAY = 0.2  # 平均每天的價格跳空次數
+JUMP_SIZE = 0.03  # 跳空幅度的標準差
+REGIME_PERSISTENCE = 0.95  # 每日波動率狀態的自相關係數 (向0均值回歸)
+REGIME_VOL = 0.08  # 每日波動率狀態的擾動, 平穩標準差約0.26
+PRICE_BAND = 100.0  # 價格在起始價格的1/100至100倍之間反射, 避免成交量及定點數溢出
+# 缺失數據 (交易所停機或數據源中斷)
+GAPS_PER_MONTH = 2.0
+MEAN_GAP_MINUTES = 15
+MAX_GAP_MINUTES = 240
+
+
+def instrument_id_for(index: int) -> str:
+    """返回第`index`個合成交易對的ID, 例如 "SYN0001USDT-PERP.BINANCE" """
+    return f"SYN{index:04d}USDT-PERP.{VENUE}"
+
+
+def _instrument_rng(seed: int, index: int, stream: int) -> np.random.Generator:
+    # 每個交易對使用獨立的隨機流, 結果與生成順序及進程數無關
+    return np.random.default_rng([seed, index, stream])
+
+
+def make_instrument(
+    index: int,
+    seed: int = 0,
+    price_range: tuple[float, float] = START_PRICE_RANGE,
+) -> CryptoPerpetual:
+    """
+    生成第`index`個合成USDT本位永續合約的定義
+
+    起始價格在`price_range`內對數均勻分佈, 價格精度保留約6位有效數字,
+    數量精度隨價格提高.
+    """
+    rng = _instrument_rng(seed, index, 0)
+    price = float(np.exp(rng.uniform(*np.log(price_range))))
+    magnitude = math.floor(math.log10(price))
+    price_precision = int(np.clip(5 - magnitude, 0, 8))
+    size_precision = int(np.clip(magnitude - 1, 0, 3))
+
+    code = f"SYN{index:04d}"
+    base = Currency(code, 8, 0, f"Synthetic {index}", CurrencyType.CRYPTO)
+    Currency.register(base, overwrite=True)
+    instrument_id = InstrumentId.from_str(instrument_id_for(index))
+    return CryptoPerpetual(
+        instrument_id=instrument_id,
+        raw_symbol=Symbol(f"{code}USDT"),
+        base_currency=base,
+        quote_currency=USDT,
+        settlement_currency=USDT,
+        is_inverse=False,
+        price_precision=price_precision,
+        size_precision=size_precision,
+        price_increment=Price(10.0**-price_precision, price_precision),
+        size_increment=Quantity(10.0**-size_precision, size_precision),
+        min_quantity=Quantity(10.0**-size_precision, size_precision),
+        ts_event=0,
+        ts_init=0,
+        margin_init=Decimal("0.05"),
+        margin_maint=Decimal("0.025"),
+        maker_fee=Decimal("0.0002"),
+        taker_fee=Decimal("0.0005"),
+        info={"synthetic": True, "start_price": price},
+    )
+
+
+def seasonality(ts: np.ndarray) -> np.ndarray:
+    """
+    返回每根bar的成交活躍度係數
+
+    日內在歐洲及美國開盤時段較高, 資金費率結算 (00:00, 08:00, 16:00 UTC)
+    時出現尖峰, 週末活躍度較低.
+    """
+    minutes = ts // NANOS_PER_MINUTE
+    hour = (minutes % MINUTES_PER_DAY) / 60.0
+    intraday = (
+        0.6
+        + 0.3 * np.exp(-(((hour - 8.0) / 2.0) ** 2))
+        + 0.6 * np.exp(-(((hour - 14.5) / 2.5) ** 2))
+    )
+    funding = np.where(minutes % 480 == 0, 1.5, 1.0)
+    weekday = (minutes // MINUTES_PER_DAY + 3) % 7  # 1970-01-01為星期四, 星期一為0
+    weekend = np.where(weekday >= 5, 0.6, 1.0)
+    return intraday * funding * weekend
+
+
+def _month_starts(start: pd.Timestamp, end: pd.Timestamp) -> list[pd.Timestamp]:
+    bounds = [start]
+    month = start + pd.offsets.MonthBegin(1)
+    while month < end:
+        bounds.append(month)
+        month += pd.offsets.MonthBegin(1)
+    return [*bounds, end]
+
+
+def synthetic_bars(
+    index: int,
+    start: str,
+    end: str,
+    seed: int = 0,
+    start_price: float | None = None,
+):
+    """
+    按月生成一個合成交易對的1分鐘bar, 每次產出一個月的浮點數列
+
+    價格為幾何布朗運動 (含-σ²/2漂移修正, 價格期望不變), 波動率隨日內季節性
+    及每日的波動率狀態變化, 並加入泊松跳空. 波動率狀態經歸一化, 長期平均
+    方差與`annual_vol`一致; 對數價格在起始價格的`PRICE_BAND`倍範圍邊界反射.
+    成交量與季節性, 波動率狀態及絕對收益率相關, 上限為`QUANTITY_MAX`.
+    每月隨機刪除若干段連續的bar以模擬數據缺失.
+
+    Parameters
+    ----------
+    index : int
+        交易對編號
+    start : str
+        開始日期 (包含)
+    end : str
+        結束日期 (不包含)
+    seed : int
+        隨機種子
+    start_price : float, optional
+        起始價格, 默認與`make_instrument`相同
+
+    Yields
+    ------
+    dict[str, np.ndarray]
+        ts (UNIX納秒), open, high, low, close, volume
+    """
+    params = _instrument_rng(seed, index, 0)
+    price = float(np.exp(params.uniform(*np.log(START_PRICE_RANGE))))
+    if start_price is not None:
+        price = start_price
+    annual_vol = params.uniform(*ANNUAL_VOL_RANGE)
+    minute_vol = annual_vol / math.sqrt(365 * MINUTES_PER_DAY)
+    notional_per_minute = float(np.exp(params.normal(np.log(50_000), 1.0)))
+
+    log_floor = math.log(price / PRICE_BAND)
+    log_ceiling = math.log(price * PRICE_BAND)
+    # exp(regime)的二階矩為exp(2 * 平穩方差), 以此歸一化使平均方差不受狀態影響
+    regime_var = REGIME_VOL**2 / (1.0 - REGIME_PERSISTENCE**2)
+
+    rng = _instrument_rng(seed, index, 1)
+    regime = 0.0
+    start_ts = pd.Timestamp(start, tz="UTC")
+    end_ts = pd.Timestamp(end, tz="UTC")
+    bounds = _month_starts(start_ts, end_ts)
+    for month_start, month_end in zip(bounds[:-1], bounds[1:]):
+        ts = np.arange(month_start.value, month_end.value, NANOS_PER_MINUTE, dtype=np.int64)
+        n = len(ts)
+        if n == 0:
+            continue
+
+        # 每日波動率狀態 (AR(1)), 按天展開到每分鐘
+        days = (n + MINUTES_PER_DAY - 1) // MINUTES_PER_DAY
+        daily = np.empty(days)
+        shocks = rng.normal(0.0, REGIME_VOL, days)
+        for d in range(days):
+            regime = REGIME_PERSISTENCE * regime + shocks[d]
+            daily[d] = regime
+        level = np.exp(np.repeat(daily, MINUTES_PER_DAY)[:n] - regime_var)
+
+        season = seasonality(ts)
+        sigma = minute_vol * level * np.sqrt(season)
+        returns = rng.normal(0.0, 1.0, n) * sigma - 0.5 * sigma**2
+        jumps = rng.random(n) < JUMPS_PER_DAY / MINUTES_PER_DAY
+        returns[jumps] += rng.normal(0.0, JUMP_SIZE, jumps.sum())
+
+        # 對數價格在[log_floor, log_ceiling]內反射 (以兩倍寬度為週期折疊)
+        width = log_ceiling - log_floor
+        folded = np.mod(math.log(price) + np.cumsum(returns) - log_floor, 2.0 * width)
+        close = np.exp(log_floor + width - np.abs(folded - width))
+        open_ = np.concatenate([[price], close[:-1]])
+        wick = np.abs(rng.normal(0.0, 1.0, (2, n))) * sigma * 0.5
+        high = np.maximum(open_, close) * np.exp(wick[0])
+        low = np.minimum(open_, close) * np.exp(-wick[1])
+        price = float(close[-1])
+
+        activity = season * level * (1.0 + np.abs(returns) / sigma) * np.where(jumps, 5.0, 1.0)
+        volume = notional_per_minute * activity * rng.lognormal(0.0, 0.5, n) / close
+        volume = np.minimum(volume, float(QUANTITY_MAX))
+
+        # 數據缺失: 每月若干段連續的bar被刪除
+        keep = np.ones(n, dtype=bool)
+        gap_starts = np.flatnonzero(rng.random(n) < GAPS_PER_MONTH / (30 * MINUTES_PER_DAY))
+        gap_lengths = np.minimum(
+            rng.geometric(1.0 / MEAN_GAP_MINUTES, len(gap_starts)), MAX_GAP_MINUTES
+        )
+        for gap_start, length in zip(gap_starts, gap_lengths):
+            keep[gap_start : gap_start + length] = False
+
+        yield {
+            "ts": ts[keep],
+            "open": open_[keep],
+            "high": high[keep],
+            "low": low[keep],
+            "close": close[keep],
+            "volume": volume[keep],
+        }
+
+
+def _write_instrument_bars(
+    catalog_path: Path,
+    index: int,
+    instrument,
+    start: str,
+    end: str,
+    seed: int,
+    partition: str | None,
+    encoding: str,
+) -> int:
+    """
+    在工作進程中生成一個交易對的bar並直接以catalog的bar schema寫入
+    """
+    bar_type = f"{instrument.id}-1-MINUTE-LAST-EXTERNAL"
+    schema = catalog_bar_schema(bar_type, instrument)
+    price_precision = int(schema.metadata[b"price_precision"])
+    size_precision = int(schema.metadata[b"size_precision"])
+    profile = encoding_profile(encoding)
+    options = profile.writer_options(schema)
+
+    directory = bar_type_dir(catalog_path, bar_type)
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True)
+
+    def to_table(chunk: dict) -> pa.Table:
+        columns = {
+            name: encode_fixed(chunk[name], price_precision, schema.field(name).type)
+            for name in BAR_PRICE_COLUMNS
+        }
+        columns["volume"] = encode_fixed(
+            chunk["volume"], size_precision, schema.field("volume").type
+        )
+        columns["ts_event"] = pa.array(chunk["ts"].astype(np.uint64))
+        columns["ts_init"] = columns["ts_event"]
+        return pa.table([columns[field.name].cast(field.type) for field in schema], schema=schema)
+
+    written = 0
+    writer = None
+    first_ts = last_ts = None
+    tmp_path = directory / f".{bar_type}.parquet.tmp"
+    for chunk in synthetic_bars(index, start, end, seed, instrument.info["start_price"]):
+        ts = chunk["ts"]
+        if len(ts) == 0:
+            continue
+        table = to_table(chunk)
+        written += len(ts)
+        if partition is None:
+            # 單一文件: 逐月追加, 完成後以時間範圍命名
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, schema, **options)
+                first_ts = ts[0]
+            writer.write_table(table, row_group_size=profile.row_group_rows)
+            last_ts = ts[-1]
+            continue
+        for part in partition_slices(ts, partition):
+            pq.write_table(
+                table.slice(part.start, part.stop - part.start),
+                directory / f"{bar_type}-{ts[part.start]}-{ts[part.stop - 1]}.parquet",
+                row_group_size=profile.row_group_rows,
+                **options,
+            )
+    if writer is not None:
+        writer.close()
+        os.replace(tmp_path, directory / f"{bar_type}-{first_ts}-{last_ts}.parquet")
+    return written
+
+
+def generate_catalog(
+    catalog_path: str | Path = "data/synthetic/catalog",
+    instruments: int = 100,
+    years: float = 1.0,
+    start: str = "2022-01-01",
+    seed: int = 0,
+    partition: str | None = "month",
+    encoding: str = "default",
+    workers: int | None = None,
+    price_range: tuple[float, float] = START_PRICE_RANGE,
+) -> dict:
+    """
+    生成包含`instruments`個合成永續合約, 每個`years`年1分鐘bar的catalog
+
+    同一seed生成的交易對定義及bar完全相同, 與進程數無關. 已存在的合成
+    bar類型會被覆蓋, catalog中其他數據不受影響.
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        catalog的路徑
+    instruments : int
+        交易對數量
+    years : float
+        每個交易對的數據年數
+    start : str
+        開始日期
+    seed : int
+        隨機種子
+    partition : str, optional, default "month"
+        "day" 或 "month": 每天或每月寫入一個文件, None則每個bar類型一個文件
+    encoding : str, default "default"
+        bar文件的編碼配置名稱, 見`src.catalog_bars.ENCODING_PROFILES`
+    workers : int, optional
+        工作進程數, 默認為CPU核心數
+    price_range : tuple[float, float]
+        起始價格範圍, 改變範圍後同一seed生成的價格不同
+
+    Returns
+    -------
+    dict
+        交易對數量, bar數量, 磁盤大小 (字節) 及耗時
+    """
+    catalog_path = Path(catalog_path)
+    catalog_path.mkdir(parents=True, exist_ok=True)
+    end = (pd.Timestamp(start) + pd.Timedelta(days=round(365 * years))).strftime("%Y-%m-%d")
+    definitions = [make_instrument(i, seed, price_range) for i in range(instruments)]
+    bar_types = [f"{instrument.id}-1-MINUTE-LAST-EXTERNAL" for instrument in definitions]
+
+    started = time.perf_counter()
+    total = 0
+    with catalog_write_lock(catalog_path):
+        catalog = ParquetDataCatalog(catalog_path)
+        for instrument in definitions:
+            write_instrument(catalog, instrument)
+
+        workers = min(workers or os.cpu_count() or 1, instruments)
+        print(f"使用 {workers} 個進程生成 {instruments} 個交易對 {start} 到 {end} 的bar...")
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _write_instrument_bars,
+                    catalog_path,
+                    i,
+                    instrument,
+                    start,
+                    end,
+                    seed,
+                    partition,
+                    encoding,
+                )
+                for i, instrument in enumerate(definitions)
+            ]
+            for done, future in enumerate(as_completed(futures), start=1):
+                total += future.result()
+                if done % max(1, instruments // 10) == 0 or done == instruments:
+                    print(f"[{done}/{instruments}] {total:,} bars")
+
+        manifest = update_manifest(catalog_path, bar_types)
+    elapsed = time.perf_counter() - started
+
+    size = sum(
+        path.stat().st_size
+        for bar_type in bar_types
+        for path in bar_type_dir(catalog_path, bar_type).glob("*.parquet")
+    )
+    print(
+        f"完成: {total:,} bars, {size / 2**30:.2f} GiB, {elapsed:.1f}s "
+        f"({total / elapsed:,.0f} bars/s), catalog共 {len(manifest.bars)} 個bar類型"
+    )
+    return {"instruments": instruments, "bars": total, "bytes": size, "seconds": elapsed}
+
+
+if __name__ == "__main__":
+    generate_catalog(
+        catalog_path=sys.argv[3] if len(sys.argv) > 3 else "data/synthetic/catalog",
+        instruments=int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+        years=float(sys.argv[2]) if len(sys.argv) > 2 else 1.0,
+        seed=int(os.getenv("SYNTHETIC_SEED", "0")),
+        partition=os.getenv("CATALOG_PARTITION", "month") or None,
+        encoding=os.getenv("CATALOG_ENCODING", "default"),
+        workers=int(os.getenv("GENERATE_WORKERS", "0")) or None,
+    )
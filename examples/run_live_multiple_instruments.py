@@ -27,7 +27,10 @@ from nautilus_trader.live.node import TradingNode
 from nautilus_trader.model.identifiers import TraderId
 
 # Import your VWAP strategy
-from src.vwap_strategy_15min import VWAPMultiTimeframeStrategy, VWAPStrategyConfig
+from src.vwap_strategy_multiple_instruments import (
+    VWAPMultiTimeframeStrategy,
+    VWAPStrategyConfig,
+)
 
 
 async def main():
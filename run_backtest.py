@@ -1,162 +1,60 @@
-from decimal import Decimal
+import os
+import sys
 
 import polars as pl
-from nautilus_trader.backtest.engine import BacktestEngine
-from nautilus_trader.backtest.node import (
-    BacktestDataConfig,
-    BacktestEngineConfig,
-    BacktestNode,
-    BacktestRunConfig,
-    BacktestVenueConfig,
-)
-from nautilus_trader.backtest.results import BacktestResult
-from nautilus_trader.config import ImportableStrategyConfig, LoggingConfig
-from nautilus_trader.model.data import Bar
-from nautilus_trader.model.identifiers import Venue
-from nautilus_trader.persistence.catalog import ParquetDataCatalog
 
-
-def run_backtest():
-    start = "2024-01-01"
-    end = "2024-12-31"
-    # You can also use a relative path such as `ParquetDataCatalog("./catalog")`,
-    # for example if you're running this notebook after the data setup from the docs.
-    # catalog = ParquetDataCatalog.from_env()
-    catalog = ParquetDataCatalog("./data/binance/catalog")
-    instruments = catalog.instruments()
-
-    # Define the instrument for the strategy
-    venue = BacktestVenueConfig(
-        name="BINANCE",
-        oms_type="NETTING",
-        account_type="MARGIN",
-        starting_balances=["100 USDT"],
-        base_currency="USDT",
-        default_leverage=Decimal("10.0"),
-    )
-
-    data_ADA_1 = BacktestDataConfig(
-        catalog_path=str(catalog.path),
-        data_cls=Bar,
-        instrument_id=instruments[0].id,
-        start_time=start,
-        end_time=end,
-        bar_types=[f"{instruments[0].id}-1-MINUTE-LAST-EXTERNAL"],
-    )
-    data_LTC_1 = BacktestDataConfig(
-        catalog_path=str(catalog.path),
-        data_cls=Bar,
-        instrument_id=instruments[3].id,
-        start_time=start,
-        end_time=end,
-        bar_types=[f"{instruments[3].id}-1-MINUTE-LAST-EXTERNAL"],
-    )
-    data_SUI_1 = BacktestDataConfig(
-        catalog_path=str(catalog.path),
-        data_cls=Bar,
-        instrument_id=instruments[-1].id,
-        start_time=start,
-        end_time=end,
-        bar_types=[f"{instruments[-1].id}-1-MINUTE-LAST-EXTERNAL"],
-    )
-
-    engine_ADA = BacktestEngineConfig(
-        strategies=[
-            ImportableStrategyConfig(
-                strategy_path="src.vwap_strategy:VWAPMultiTimeframeStrategy",
-                config_path="src.vwap_strategy:VWAPStrategyConfig",
-                config={
-                    "instrument_id": str(instruments[0].id),
-                    "vwap_period_5min": 48,  # Approximately 4 trading hours (for 5min bars)
-                    "vwap_period_1h": 12,  # Approximately 12 trading hours (for 1h bars)
-                    "std_dev_multiplier": 2.0,  # Standard deviation multiplier for VWAP bands
-                    "entry_volume_threshold": 1.5,  # Volume threshold compared to average
-                    "risk_per_trade": 0.1,  # 10% risk per trade
-                    "time_exit_hours": (
-                        24  # Exit trade after 168 hours if not stopped out/taken profit
-                    ),
-                },
-            )
-        ],
-        logging=LoggingConfig(log_level="INFO"),
-    )
-    engine_LTC = BacktestEngineConfig(
-        strategies=[
-            ImportableStrategyConfig(
-                strategy_path="src.vwap_strategy:VWAPMultiTimeframeStrategy",
-                config_path="src.vwap_strategy:VWAPStrategyConfig",
-                config={
-                    "instrument_id": str(instruments[3].id),
-                    "vwap_period_5min": 48,  # Approximately one trading day (for 5min bars)
-                    "vwap_period_1h": 12,  # Approximately 5 trading days (for 1h bars)
-                    "std_dev_multiplier": 2.0,  # Standard deviation multiplier for VWAP bands
-                    "entry_volume_threshold": 1.5,  # Volume threshold compared to average
-                    "risk_per_trade": 0.1,  # 10% risk per trade
-                    "time_exit_hours": (
-                        24  # Exit trade after 168 hours if not stopped out/taken profit
-                    ),
-                },
-            )
-        ],
-        logging=LoggingConfig(log_level="INFO"),
-    )
-    engine_SUI = BacktestEngineConfig(
-        strategies=[
-            ImportableStrategyConfig(
-                strategy_path="src.vwap_strategy:VWAPMultiTimeframeStrategy",
-                config_path="src.vwap_strategy:VWAPStrategyConfig",
-                config={
-                    "instrument_id": str(instruments[-1].id),
-                    "vwap_period_5min": 48,  # Approximately one trading day (for 5min bars)
-                    "vwap_period_1h": 12,  # Approximately 5 trading days (for 1h bars)
-                    "std_dev_multiplier": 2.0,  # Standard deviation multiplier for VWAP bands
-                    "entry_volume_threshold": 1.5,  # Volume threshold compared to average
-                    "risk_per_trade": 0.1,  # 10% risk per trade
-                    "time_exit_hours": (
-                        24  # Exit trade after 168 hours if not stopped out/taken profit
-                    ),
-                },
-            )
-        ],
-        logging=LoggingConfig(log_level="INFO"),
-    )
-    config_ADA = BacktestRunConfig(
-        engine=engine_ADA,
-        venues=[venue],
-        data=[data_ADA_1],
-    )
-    config_LTC = BacktestRunConfig(
-        engine=engine_LTC,
-        venues=[venue],
-        data=[data_LTC_1],
-    )
-    config_SUI = BacktestRunConfig(
-        engine=engine_SUI,
-        venues=[venue],
-        data=[data_SUI_1],
-    )
-
-    configs = [config_ADA, config_LTC, config_SUI]
-
-    node = BacktestNode(configs=configs)
-
-    # Runs one or many configs synchronously
-    results: list[BacktestResult] = node.run()  # noqa
-
-    for i in range(len(configs)):
-        id = ["ADA", "LTC", "SUI"]
-        engine: BacktestEngine = node.get_engine(configs[i].id)
-        order_fills_report = pl.DataFrame(engine.trader.generate_order_fills_report())
-        order_fills_report.write_json(f"./reports/order_fills_report_{id[i]}.json")
-        positions_report = pl.DataFrame(engine.trader.generate_positions_report())
-        positions_report.write_json(f"./reports/positions_report_{id[i]}.json")
-        account_report = pl.DataFrame(
-            engine.trader.generate_account_report(Venue("BINANCE"))
-        )
-        account_report.write_json(f"./reports/account_report_{id[i]}.json")
-
-    node.dispose()
+from src.backtest_matrix import build_run_configs, expand_matrix, load_matrix
+from src.backtest_runner import check_data_coverage, run_parallel
+from src.reports import scan_summary, write_run_reports
+
+
+def run_backtest(
+    matrix_path: str = "backtests/vwap_5m_1h.toml",
+    workers: int | None = None,
+    cache_dir: str | None = ".backtest_cache",
+    reports_dir: str = "./reports",
+):
+    """
+    Run every backtest described by a matrix file.
+
+    Parameters
+    ----------
+    matrix_path : str
+        The TOML matrix listing instruments, date ranges, strategies and
+        parameter sets (see `src.backtest_matrix.load_matrix`).
+    workers : int, optional
+        The number of worker processes, defaults to the number of CPUs.
+    cache_dir : str, optional
+        The result cache directory. Runs whose strategy code, config, venue
+        and catalog files are unchanged return their stored reports. No
+        caching if None.
+    reports_dir : str
+        The root directory of the Parquet reports and summary table.
+    """
+    matrix = load_matrix(matrix_path)
+    entries = expand_matrix(matrix)
+    configs = build_run_configs(matrix, entries)
+    labels = [entry.label for entry in entries]
+    check_data_coverage(configs)
+    print(f"Running {len(configs)} backtests from {matrix_path}")
+
+    # Each config runs in its own process, reports are written as runs finish
+    for i, result, reports in run_parallel(
+        configs, workers=workers, cache_dir=cache_dir
+    ):
+        entry = entries[i]
+        print(f"Finished {entry.label} in {result.elapsed_time:.1f}s")
+        write_run_reports(reports_dir, entry, result, reports)
+
+    # Summary of this matrix, read lazily from the cross-run summary table
+    summary = scan_summary(reports_dir).filter(pl.col("label").is_in(labels))
+    print(summary.sort("pnl", descending=True).collect())
 
 
 if __name__ == "__main__":
-    run_backtest()
+    # Usage: python run_backtest.py [matrix.toml]
+    # Worker processes come from BACKTEST_WORKERS, defaulting to the number of CPUs
+    run_backtest(
+        *sys.argv[1:2],
+        workers=int(os.getenv("BACKTEST_WORKERS", "0")) or None,
+    )
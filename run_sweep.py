@@ -0,0 +1,164 @@
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import polars as pl
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+
+from src.backtest_runner import (
+    SUMMARY_COLUMNS,
+    make_run_config,
+    run_cached,
+    summarize_reports,
+)
+from src.catalog_bars import bar_files
+from src.catalog_manifest import CatalogManifest, manifest_path
+from src.result_cache import ResultCache
+
+
+def expand_grid(param_grid: dict[str, list]) -> list[dict]:
+    """
+    Expand a parameter grid into the list of all parameter combinations.
+    """
+    names = list(param_grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(param_grid[name] for name in names))
+    ]
+
+
+def catalog_instrument_ids(catalog_path: str | Path) -> list[str]:
+    """
+    Return the catalog instruments that have 1-minute bars.
+
+    Read from the catalog manifest when there is one.
+    """
+    if manifest_path(catalog_path).exists():
+        return CatalogManifest.load(catalog_path).instrument_ids("1-MINUTE")
+    catalog = ParquetDataCatalog(str(catalog_path))
+    return [
+        str(instrument.id)
+        for instrument in catalog.instruments()
+        if bar_files(catalog_path, f"{instrument.id}-1-MINUTE-LAST-EXTERNAL")
+    ]
+
+
+def _run_sweep_job(
+    catalog_path: str,
+    instrument_id: str,
+    start: str,
+    end: str,
+    strategy: str,
+    params: dict,
+    cache_dir: str | None,
+) -> dict:
+    """
+    Run one backtest in a worker process and return its summary row.
+
+    A failed run has empty summary columns and its message in `error`.
+    """
+    row = {"instrument_id": instrument_id, **params}
+    try:
+        run_config = make_run_config(
+            catalog_path,
+            instrument_id,
+            start,
+            end,
+            strategy_params=params,
+            strategy=strategy,
+            log_level="ERROR",
+        )
+        cache = ResultCache(cache_dir) if cache_dir is not None else None
+        _, reports = run_cached(run_config, cache)
+        row.update(summarize_reports(reports))
+    except Exception as e:
+        row.update(dict.fromkeys(SUMMARY_COLUMNS), error=str(e))
+    return row
+
+
+def run_sweep(
+    param_grid: dict[str, list],
+    instrument_ids: list[str] | None = None,
+    catalog_path: str = "./data/binance/catalog",
+    start: str = "2024-01-01",
+    end: str = "2024-12-31",
+    strategy: str = "5m/1h",
+    workers: int | None = None,
+    cache_dir: str | None = ".backtest_cache",
+) -> pl.DataFrame:
+    """
+    Backtest every parameter combination on every instrument in parallel.
+
+    Parameters
+    ----------
+    param_grid : dict[str, list]
+        Strategy config field names mapped to the values to try.
+    instrument_ids : list[str], optional
+        The instruments to run, defaults to every catalog instrument with
+        1-minute bars.
+    catalog_path : str
+        The catalog holding the 1-minute bars.
+    start : str
+        The start of the data range.
+    end : str
+        The end of the data range.
+    strategy : str, default "5m/1h"
+        The strategy class, "5m/1h" or "15m/4h".
+    workers : int, optional
+        The number of worker processes, defaults to the number of CPUs.
+    cache_dir : str, optional
+        The result cache directory, so unchanged runs are not repeated.
+        No caching if None.
+
+    Returns
+    -------
+    pl.DataFrame
+        One row per run with the parameters, PnL, win rate and max drawdown.
+    """
+    if instrument_ids is None:
+        instrument_ids = catalog_instrument_ids(catalog_path)
+    combinations = expand_grid(param_grid)
+    jobs = [
+        (catalog_path, instrument_id, start, end, strategy, params, cache_dir)
+        for instrument_id in instrument_ids
+        for params in combinations
+    ]
+    workers = min(workers or os.cpu_count() or 1, len(jobs)) or 1
+    print(f"Running {len(jobs)} backtests on {workers} workers...")
+
+    rows = []
+    # Each worker runs a single backtest so its memory is returned afterwards
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as executor:
+        futures = [executor.submit(_run_sweep_job, *job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), start=1):
+            row = future.result()
+            rows.append(row)
+            status = f"error: {row['error']}" if "error" in row else f"pnl={row['pnl']:.2f}"
+            print(f"[{done}/{len(jobs)}] {row['instrument_id']} {status}")
+
+    if not rows:
+        return pl.DataFrame(schema=["instrument_id", *param_grid, *SUMMARY_COLUMNS])
+    # Only failed rows have `error`, so the schema is inferred from every row
+    return pl.DataFrame(rows, infer_schema_length=None).sort(["instrument_id", *param_grid])
+
+
+if __name__ == "__main__":
+    PARAM_GRID = {
+        "vwap_period_5min": [24, 48, 96],
+        "std_dev_multiplier": [1.5, 2.0, 2.5],
+        "entry_volume_threshold": [1.2, 1.5, 2.0],
+        "time_exit_hours": [12, 24, 48],
+        "risk_per_trade": [0.1],
+    }
+
+    results = run_sweep(PARAM_GRID)
+
+    Path("./reports").mkdir(exist_ok=True)
+    results.write_parquet("./reports/sweep_results.parquet")
+    print(results.sort("pnl", descending=True, nulls_last=True))
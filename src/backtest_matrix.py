@@ -0,0 +1,154 @@
+# -------------------------------------------------------------------------------------------------
+#  Declarative backtest matrix
+#  從TOML文件讀取回測矩陣(交易對、日期範圍、策略、參數組), 展開為回測配置
+# -------------------------------------------------------------------------------------------------
+
+import fnmatch
+import tomllib
+from pathlib import Path
+from typing import NamedTuple
+
+from nautilus_trader.backtest.node import BacktestRunConfig
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+
+from src.backtest_runner import STRATEGIES, make_run_config
+from src.catalog_manifest import CatalogManifest, manifest_path
+
+
+class MatrixEntry(NamedTuple):
+    """
+    One expanded backtest: a single instrument, date range and parameter set.
+    """
+
+    label: str
+    run: str
+    strategy: str
+    instrument_id: str
+    start: str
+    end: str
+    param_set: str
+    params: dict
+
+
+def load_matrix(path: str | Path) -> dict:
+    """
+    Load a backtest matrix file.
+
+    The file has a top-level `catalog_path`, an optional `stored_bars_catalog`
+    of materialized higher-timeframe bars for the strategies to subscribe to
+    directly, and one `[[run]]` table per strategy block with keys:
+
+    - `name`: the run name used in report labels
+    - `strategy`: "5m/1h" or "15m/4h"
+    - `instruments`: instrument IDs or glob patterns over the catalog instruments
+    - `periods`: a list of `{ start = ..., end = ... }` date ranges
+    - `params`: strategy config fields shared by every parameter set
+    - `param_sets`: optional list of tables, each with a `name` and overriding fields
+    """
+    with open(path, "rb") as f:
+        matrix = tomllib.load(f)
+
+    if "catalog_path" not in matrix:
+        raise ValueError(f"{path}: missing `catalog_path`")
+    for run in matrix.get("run", []):
+        for key in ("name", "strategy", "instruments", "periods"):
+            if key not in run:
+                raise ValueError(f"{path}: run {run.get('name', '?')!r} is missing `{key}`")
+        if run["strategy"] not in STRATEGIES:
+            raise ValueError(
+                f"{path}: run {run['name']!r} has unknown strategy {run['strategy']!r}, "
+                f"expected one of {sorted(STRATEGIES)}"
+            )
+        for param_set in run.get("param_sets", []):
+            if "name" not in param_set:
+                raise ValueError(f"{path}: run {run['name']!r} has a param set without `name`")
+    return matrix
+
+
+def resolve_instruments(patterns: list[str], available: list[str]) -> list[str]:
+    """
+    Resolve instrument IDs and glob patterns against the available instruments.
+
+    Raises
+    ------
+    ValueError
+        If a pattern matches no instrument.
+    """
+    resolved = []
+    for pattern in patterns:
+        matches = fnmatch.filter(available, pattern)
+        if not matches:
+            raise ValueError(f"No catalog instrument matches {pattern!r}")
+        resolved.extend(m for m in sorted(matches) if m not in resolved)
+    return resolved
+
+
+def expand_matrix(matrix: dict, available: list[str] | None = None) -> list[MatrixEntry]:
+    """
+    Expand a loaded matrix into one entry per backtest.
+
+    Parameters
+    ----------
+    matrix : dict
+        The matrix as returned by `load_matrix`.
+    available : list[str], optional
+        The instrument IDs to match patterns against, defaults to the
+        instruments with 1-minute bars in the matrix catalog manifest, or to
+        the catalog instruments if it has no manifest.
+
+    Returns
+    -------
+    list[MatrixEntry]
+    """
+    if available is None:
+        if manifest_path(matrix["catalog_path"]).exists():
+            available = CatalogManifest.load(matrix["catalog_path"]).instrument_ids("1-MINUTE")
+        else:
+            catalog = ParquetDataCatalog(matrix["catalog_path"])
+            available = [str(instrument.id) for instrument in catalog.instruments()]
+
+    entries = []
+    for run in matrix.get("run", []):
+        shared = run.get("params", {})
+        param_sets = run.get("param_sets") or [{"name": "default"}]
+        for instrument_id in resolve_instruments(run["instruments"], available):
+            symbol = instrument_id.split(".")[0]
+            for period in run["periods"]:
+                for param_set in param_sets:
+                    params = {**shared, **param_set}
+                    name = params.pop("name")
+                    entries.append(
+                        MatrixEntry(
+                            label=f"{run['name']}_{name}_{symbol}_{period['start']}_{period['end']}",
+                            run=run["name"],
+                            strategy=run["strategy"],
+                            instrument_id=instrument_id,
+                            start=str(period["start"]),
+                            end=str(period["end"]),
+                            param_set=name,
+                            params=params,
+                        )
+                    )
+    return entries
+
+
+def build_run_configs(
+    matrix: dict,
+    entries: list[MatrixEntry],
+) -> list[BacktestRunConfig]:
+    """
+    Build one run config per matrix entry.
+    """
+    return [
+        make_run_config(
+            matrix["catalog_path"],
+            entry.instrument_id,
+            entry.start,
+            entry.end,
+            strategy_params=entry.params,
+            strategy=entry.strategy,
+            log_level=matrix.get("log_level", "INFO"),
+            stored_bars_catalog=matrix.get("stored_bars_catalog"),
+        )
+        for entry in entries
+    ]
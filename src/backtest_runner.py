@@ -0,0 +1,361 @@
+# -------------------------------------------------------------------------------------------------
+#  Backtest run helpers
+#  構建單一交易對的BacktestRunConfig並從回測結果中提取績效指標
+# -------------------------------------------------------------------------------------------------
+
+import multiprocessing
+import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from nautilus_trader.backtest.engine import BacktestEngine
+from nautilus_trader.backtest.node import (
+    BacktestDataConfig,
+    BacktestEngineConfig,
+    BacktestNode,
+    BacktestRunConfig,
+    BacktestVenueConfig,
+)
+from nautilus_trader.backtest.results import BacktestResult
+from nautilus_trader.config import ImportableStrategyConfig, LoggingConfig
+from nautilus_trader.model.data import Bar
+from nautilus_trader.model.identifiers import Venue
+
+from src.catalog_manifest import CatalogManifest, manifest_path
+from src.result_cache import ResultCache
+
+
+# Stored bar type steps by timeframe, as (signal, trend)
+STORED_BAR_STEPS = {
+    "5m/1h": ("5-MINUTE", "1-HOUR"),
+    "15m/4h": ("15-MINUTE", "4-HOUR"),
+}
+
+# Strategy classes by timeframe, as (strategy_path, config_path)
+STRATEGIES = {
+    "5m/1h": (
+        "src.vwap_strategy:VWAPMultiTimeframeStrategy",
+        "src.vwap_strategy:VWAPStrategyConfig",
+    ),
+    "15m/4h": (
+        "src.vwap_strategy_15min:VWAPMultiTimeframeStrategy15M",
+        "src.vwap_strategy_15min:VWAPStrategy15MConfig",
+    ),
+}
+
+# The keys of `summarize_reports`, left empty in the rows of failed runs
+SUMMARY_COLUMNS = ("positions", "pnl", "win_rate", "max_drawdown")
+
+
+def binance_venue(starting_balance: str = "100 USDT") -> BacktestVenueConfig:
+    """
+    Return the Binance futures venue used by the backtests.
+    """
+    return BacktestVenueConfig(
+        name="BINANCE",
+        oms_type="NETTING",
+        account_type="MARGIN",
+        starting_balances=[starting_balance],
+        base_currency="USDT",
+        default_leverage=Decimal("10.0"),
+    )
+
+
+def make_run_config(
+    catalog_path: str | Path,
+    instrument_id: str,
+    start: str,
+    end: str,
+    strategy_params: dict,
+    strategy: str = "5m/1h",
+    venue: BacktestVenueConfig | None = None,
+    log_level: str = "INFO",
+    stored_bars_catalog: str | Path | None = None,
+) -> BacktestRunConfig:
+    """
+    Build a run config for one instrument and one strategy parameter set.
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        The catalog holding the 1-minute bars.
+    instrument_id : str
+        The instrument to backtest.
+    start : str
+        The start of the data range.
+    end : str
+        The end of the data range.
+    strategy_params : dict
+        Strategy config fields other than the instrument.
+    strategy : str, default "5m/1h"
+        The key into `STRATEGIES` selecting the strategy class.
+    venue : BacktestVenueConfig, optional
+        The venue config, defaults to `binance_venue()`.
+    log_level : str, default "INFO"
+        The engine log level.
+    stored_bars_catalog : str | Path, optional
+        A catalog of bars materialized by `data.utils.binance.materialize_bars`.
+        If given the strategy subscribes to the stored signal and trend bars
+        from it instead of aggregating 1-minute bars from `catalog_path`.
+
+    Returns
+    -------
+    BacktestRunConfig
+    """
+    strategy_path, config_path = STRATEGIES[strategy]
+    bar_type_1min = f"{instrument_id}-1-MINUTE-LAST-EXTERNAL"
+
+    config = {"instrument_id": str(instrument_id), **strategy_params}
+    if strategy == "15m/4h":
+        config.setdefault("bar_type_1min", bar_type_1min)
+
+    if stored_bars_catalog is not None:
+        config["use_stored_bars"] = True
+        catalog_path = stored_bars_catalog
+        bar_types = [
+            f"{instrument_id}-{step}-LAST-EXTERNAL" for step in STORED_BAR_STEPS[strategy]
+        ]
+    else:
+        bar_types = [bar_type_1min]
+
+    return BacktestRunConfig(
+        engine=BacktestEngineConfig(
+            strategies=[
+                ImportableStrategyConfig(
+                    strategy_path=strategy_path,
+                    config_path=config_path,
+                    config=config,
+                )
+            ],
+            logging=LoggingConfig(log_level=log_level),
+        ),
+        venues=[venue or binance_venue()],
+        data=[
+            BacktestDataConfig(
+                catalog_path=str(catalog_path),
+                data_cls=Bar,
+                instrument_id=instrument_id,
+                start_time=start,
+                end_time=end,
+                bar_types=bar_types,
+            )
+        ],
+    )
+
+
+def check_data_coverage(run_configs: list[BacktestRunConfig]) -> None:
+    """
+    Check every run's bar types against its catalog manifest before running.
+
+    Catalogs without a manifest are not checked. Range edges are compared with
+    `CatalogManifest.edge_tolerance`, so close-stamped bars, session opens and
+    ranges ending on a weekend or holiday are not reported as missing.
+
+    Raises
+    ------
+    ValueError
+        If a run requests bars the catalog does not hold for its whole range.
+    """
+    manifests = {}
+    problems = []
+    for run_config in run_configs:
+        for data_config in run_config.data:
+            catalog_path = data_config.catalog_path
+            if catalog_path not in manifests:
+                manifests[catalog_path] = (
+                    CatalogManifest.load(catalog_path)
+                    if manifest_path(catalog_path).exists()
+                    else None
+                )
+            manifest = manifests[catalog_path]
+            if manifest is None:
+                continue
+            problems.extend(
+                manifest.missing(
+                    data_config.bar_types or [],
+                    data_config.start_time,
+                    data_config.end_time,
+                )
+            )
+    if problems:
+        shown = "\n  ".join(dict.fromkeys(problems))
+        raise ValueError(f"Catalog data missing:\n  {shown}")
+
+
+def _money_to_float(value) -> float:
+    # Reports render Money as e.g. "12.34 USDT"
+    return float(str(value).split()[0])
+
+
+def summarize_reports(reports: dict) -> dict:
+    """
+    Return PnL, win rate and drawdown from the reports of a finished run.
+
+    The win rate counts break-even positions as won, as the strategies do.
+    The drawdown is the largest peak-to-trough fall of the account total,
+    as a fraction of the peak.
+
+    Parameters
+    ----------
+    reports : dict
+        The reports as returned by `generate_reports`.
+
+    Returns
+    -------
+    dict
+    """
+    positions = reports["positions"]
+    account = reports["account"]
+
+    pnls = (
+        np.array([_money_to_float(v) for v in positions["realized_pnl"]])
+        if not positions.empty
+        else np.array([])
+    )
+    balances = (
+        np.array([_money_to_float(v) for v in account["total"]])
+        if not account.empty
+        else np.array([])
+    )
+    if len(balances):
+        peaks = np.maximum.accumulate(balances)
+        max_drawdown = float(np.max((peaks - balances) / peaks))
+    else:
+        max_drawdown = 0.0
+
+    return {
+        "positions": len(pnls),
+        "pnl": float(pnls.sum()),
+        "win_rate": float((pnls >= 0).mean()) if len(pnls) else 0.0,
+        "max_drawdown": max_drawdown,
+    }
+
+
+def run_single(run_config: BacktestRunConfig) -> tuple[BacktestNode, BacktestEngine]:
+    """
+    Run one config in its own node and return the node and its engine.
+
+    The caller is responsible for disposing the node.
+    """
+    node = BacktestNode(configs=[run_config])
+    node.run()
+    return node, node.get_engine(run_config.id)
+
+
+def generate_reports(engine: BacktestEngine, venue: str = "BINANCE") -> dict:
+    """
+    Return the order fills, positions and account reports of a finished engine.
+    """
+    return {
+        "order_fills": engine.trader.generate_order_fills_report(),
+        "positions": engine.trader.generate_positions_report(),
+        "account": engine.trader.generate_account_report(Venue(venue)),
+    }
+
+
+def run_cached(
+    run_config: BacktestRunConfig,
+    cache: ResultCache | None = None,
+    venue: str = "BINANCE",
+) -> tuple[BacktestResult, dict]:
+    """
+    Run one config and return its result and reports, using `cache` if given.
+    """
+    if cache is not None:
+        key = cache.key(run_config)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+
+    node, engine = run_single(run_config)
+    try:
+        result, reports = engine.get_result(), generate_reports(engine, venue)
+    finally:
+        node.dispose()
+
+    if cache is not None:
+        cache.put(key, result, reports)
+    return result, reports
+
+
+def _run_config_job(
+    index: int,
+    run_config: BacktestRunConfig,
+    venue: str,
+    cache_dir: str | None,
+) -> tuple[int, BacktestResult, dict]:
+    """
+    Run one config in a worker process and return its result and reports.
+    """
+    cache = ResultCache(cache_dir) if cache_dir is not None else None
+    return index, *run_cached(run_config, cache, venue)
+
+
+def run_parallel(
+    run_configs: list[BacktestRunConfig],
+    workers: int | None = None,
+    venue: str = "BINANCE",
+    cache_dir: str | None = None,
+) -> Iterator[tuple[int, BacktestResult, dict]]:
+    """
+    Run each config in its own worker process, yielding as each one finishes.
+
+    Every config gets a fresh process, so a finished run returns its memory
+    to the OS and runs cannot affect each other through shared state. With
+    a `cache_dir`, runs whose key is already cached are yielded first without
+    starting a worker.
+
+    Parameters
+    ----------
+    run_configs : list[BacktestRunConfig]
+        The configs to run.
+    workers : int, optional
+        The number of worker processes, defaults to the number of CPUs.
+    venue : str, default "BINANCE"
+        The venue to generate the account report for.
+    cache_dir : str, optional
+        The `ResultCache` directory, no caching if None.
+
+    Yields
+    ------
+    tuple[int, BacktestResult, dict]
+        The index of the config in `run_configs`, its result, and its
+        reports as returned by `generate_reports`.
+    """
+    pending = list(enumerate(run_configs))
+    if cache_dir is not None:
+        cache = ResultCache(cache_dir)
+        misses = []
+        for i, run_config in pending:
+            hit = cache.get(cache.key(run_config))
+            if hit is None:
+                misses.append((i, run_config))
+            else:
+                yield i, *hit
+        pending = misses
+    if not pending:
+        return
+
+    workers = min(workers or os.cpu_count() or 1, len(pending))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        max_tasks_per_child=1,
+    ) as executor:
+        futures = [
+            executor.submit(_run_config_job, i, run_config, venue, cache_dir)
+            for i, run_config in pending
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def timestamp_ns(values) -> np.ndarray:
+    """
+    Convert report timestamps (datetimes or UNIX nanoseconds) to UNIX nanoseconds.
+    """
+    return pd.DatetimeIndex(pd.to_datetime(values, utc=True)).as_unit("ns").asi8
@@ -0,0 +1,136 @@
+# -------------------------------------------------------------------------------------------------
+#  Bounded bar history
+#  以列式NumPy數組保存固定長度的bar歷史, 取代無限增長的Bar列表
+# -------------------------------------------------------------------------------------------------
+
+import numpy as np
+from nautilus_trader.model.data import Bar
+
+
+class BarHistory:
+    """
+    Fixed-capacity, columnar history of bars.
+
+    Bars are stored as one NumPy array per field instead of as `Bar` objects,
+    and the oldest bar is overwritten once `capacity` bars have been appended,
+    so the memory held by the history is constant for the life of a strategy.
+
+    Parameters
+    ----------
+    capacity : int
+        The maximum number of bars retained.
+
+    Raises
+    ------
+    ValueError
+        If `capacity` is not positive.
+    """
+
+    __slots__ = (
+        "capacity",
+        "ts_event",
+        "open",
+        "high",
+        "low",
+        "close",
+        "volume",
+        "_index",
+        "_count",
+    )
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, was {capacity}")
+
+        self.capacity = capacity
+        self.ts_event = np.zeros(capacity, dtype=np.uint64)
+        self.open = np.zeros(capacity, dtype=np.float64)
+        self.high = np.zeros(capacity, dtype=np.float64)
+        self.low = np.zeros(capacity, dtype=np.float64)
+        self.close = np.zeros(capacity, dtype=np.float64)
+        self.volume = np.zeros(capacity, dtype=np.float64)
+        self._index = 0  # Next write position
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return the number of bytes held by the history arrays.
+        """
+        return (
+            self.ts_event.nbytes
+            + self.open.nbytes
+            + self.high.nbytes
+            + self.low.nbytes
+            + self.close.nbytes
+            + self.volume.nbytes
+        )
+
+    def append(self, bar: Bar) -> None:
+        """
+        Add a bar to the history, evicting the oldest bar when full.
+
+        Parameters
+        ----------
+        bar : Bar
+            The bar to add.
+        """
+        self.append_values(
+            bar.ts_event,
+            bar.open.as_double(),
+            bar.high.as_double(),
+            bar.low.as_double(),
+            bar.close.as_double(),
+            bar.volume.as_double(),
+        )
+
+    def append_values(
+        self,
+        ts_event: int,
+        open: float,
+        high: float,
+        low: float,
+        close: float,
+        volume: float,
+    ) -> None:
+        """
+        Add a bar given as plain values, evicting the oldest bar when full.
+        """
+        i = self._index
+        self.ts_event[i] = ts_event
+        self.open[i] = open
+        self.high[i] = high
+        self.low[i] = low
+        self.close[i] = close
+        self.volume[i] = volume
+
+        self._index = i + 1 if i + 1 < self.capacity else 0
+        if self._count < self.capacity:
+            self._count += 1
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """
+        Return copies of the retained bars as columns, oldest first.
+        """
+        if self._count < self.capacity:
+            order = np.arange(self._count)
+        else:
+            order = np.roll(np.arange(self.capacity), -self._index)
+        return {
+            "ts_event": self.ts_event[order],
+            "open": self.open[order],
+            "high": self.high[order],
+            "low": self.low[order],
+            "close": self.close[order],
+            "volume": self.volume[order],
+        }
+
+    def clear(self) -> None:
+        """
+        Remove all bars from the history.
+        """
+        self._index = 0
+        self._count = 0
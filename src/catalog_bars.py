@@ -0,0 +1,550 @@
+# -------------------------------------------------------------------------------------------------
+#  Columnar access to bars stored in a ParquetDataCatalog
+#  直接以列式方式讀取catalog中的bar數據, 不建立Bar對象
+# -------------------------------------------------------------------------------------------------
+
+import fcntl
+import glob
+import re
+import shutil
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+
+# Nautilus stores prices and sizes as fixed-point integers: int64/uint64 with
+# 9 decimal places in standard precision builds, and 128-bit values (as
+# 16-byte fixed size binary) with 16 decimal places in high precision builds.
+FIXED_SCALAR_STANDARD = 1e9
+FIXED_SCALAR_HIGH = 1e16
+FIXED_PRECISION_STANDARD = 9
+FIXED_PRECISION_HIGH = 16
+
+BAR_PRICE_COLUMNS = ("open", "high", "low", "close")
+BAR_COLUMNS = ("open", "high", "low", "close", "volume", "ts_event", "ts_init")
+
+# Held by every catalog writer, see `catalog_write_lock`
+WRITE_LOCK_FILE = ".write.lock"
+
+# Time partitions a bar type's files can be split into, as numpy datetime units
+PARTITIONS = {"day": "D", "month": "M"}
+
+# Rows per row group, about one month of 1-minute bars: a one-month query on
+# 1-minute data decodes one or two row groups and skips the rest by statistics
+ROW_GROUP_ROWS = 50_000
+
+# Incremental and partitioned files are named "{bar_type}-{first_ts}-{last_ts}".
+# Only 19-digit (post-2001) nanosecond stamps are matched, any other name is
+# read without pruning.
+_FILE_RANGE = re.compile(r"-(\d{19})-(\d{19})\.parquet$")
+
+
+class EncodingProfile(NamedTuple):
+    """
+    Parquet encoding settings for bar files.
+    """
+
+    compression: str
+    compression_level: int | None = None
+    use_dictionary: bool = True
+    delta_integers: bool = False
+    row_group_rows: int = ROW_GROUP_ROWS
+
+    def writer_options(self, schema: pa.Schema) -> dict:
+        """
+        Return the `pq.ParquetWriter` / `pq.write_table` options for `schema`.
+        """
+        options = {
+            "compression": self.compression,
+            "compression_level": self.compression_level,
+            "use_dictionary": self.use_dictionary,
+        }
+        if self.delta_integers:
+            # Timestamps and fixed-point prices are slowly changing integers
+            options["column_encoding"] = {
+                field.name: "DELTA_BINARY_PACKED"
+                for field in schema
+                if pa.types.is_integer(field.type)
+            }
+        return options
+
+
+# Named encoding profiles, selectable by the ingestion scripts and compared by
+# `python -m benchmarks.catalog_encoding`. "default" is what pyarrow and the
+# Nautilus catalog write.
+ENCODING_PROFILES = {
+    "default": EncodingProfile("snappy"),
+    "uncompressed": EncodingProfile("none"),
+    "lz4": EncodingProfile("lz4"),
+    "zstd": EncodingProfile("zstd", compression_level=3),
+    "zstd-max": EncodingProfile("zstd", compression_level=15),
+    "zstd-delta": EncodingProfile(
+        "zstd", compression_level=3, use_dictionary=False, delta_integers=True
+    ),
+    "small-row-groups": EncodingProfile("snappy", row_group_rows=5_000),
+    "large-row-groups": EncodingProfile("snappy", row_group_rows=500_000),
+}
+
+
+def encoding_profile(name: str) -> EncodingProfile:
+    """
+    Return the encoding profile called `name`.
+    """
+    if name not in ENCODING_PROFILES:
+        raise ValueError(
+            f"Unknown encoding profile {name!r}, expected one of {list(ENCODING_PROFILES)}"
+        )
+    return ENCODING_PROFILES[name]
+
+
+def bar_type_dir(catalog_path: str | Path, bar_type: str) -> Path:
+    """
+    Return the directory holding the Parquet files for `bar_type`.
+    """
+    return Path(catalog_path) / "data" / "bar" / str(bar_type)
+
+
+def bar_files(catalog_path: str | Path, bar_type: str) -> list[Path]:
+    """
+    Return the Parquet files for `bar_type`, sorted by name.
+    """
+    directory = bar_type_dir(catalog_path, bar_type)
+    if not directory.exists():
+        return []
+    return sorted(directory.rglob("*.parquet"))
+
+
+def list_bar_types(catalog_path: str | Path) -> list[str]:
+    """
+    Return the bar types that have data in the catalog.
+    """
+    bar_root = Path(catalog_path) / "data" / "bar"
+    if not bar_root.exists():
+        return []
+    return sorted(p.name for p in bar_root.iterdir() if p.is_dir())
+
+
+def bar_file_stats(path: str | Path) -> dict:
+    """
+    Return the row count, row groups, size and `ts_init` range of a bar file.
+
+    Everything is read from the Parquet footer; data pages are decoded only
+    for row groups written without statistics.
+
+    Returns
+    -------
+    dict
+        `rows`, `row_groups`, `bytes`, and `first_ts`/`last_ts` as UNIX
+        nanoseconds (None for an empty file).
+    """
+    metadata = pq.read_metadata(path)
+    index = metadata.schema.to_arrow_schema().get_field_index("ts_init")
+    first = last = None
+    for i in range(metadata.num_row_groups):
+        row_group = metadata.row_group(i)
+        if row_group.num_rows == 0:
+            continue
+        stats = row_group.column(index).statistics
+        if stats is None or not stats.has_min_max:
+            column = pq.ParquetFile(path).read_row_group(i, columns=["ts_init"])
+            low = pc.min(column.column("ts_init")).as_py()
+            high = pc.max(column.column("ts_init")).as_py()
+        else:
+            low, high = stats.min, stats.max
+        first = low if first is None else min(first, low)
+        last = high if last is None else max(last, high)
+    return {
+        "rows": metadata.num_rows,
+        "row_groups": metadata.num_row_groups,
+        "bytes": Path(path).stat().st_size,
+        "first_ts": None if first is None else int(first),
+        "last_ts": None if last is None else int(last),
+    }
+
+
+def bar_time_range(catalog_path: str | Path, bar_type: str) -> tuple[int, int] | None:
+    """
+    Return the first and last `ts_init` stored for `bar_type`, or None if empty.
+
+    The range is read from the Parquet footers (see `bar_file_stats`).
+    """
+    stats = [bar_file_stats(path) for path in bar_files(catalog_path, bar_type)]
+    stats = [s for s in stats if s["first_ts"] is not None]
+    if not stats:
+        return None
+    return min(s["first_ts"] for s in stats), max(s["last_ts"] for s in stats)
+
+
+def select_new_rows(
+    frame: pd.DataFrame,
+    time_range: tuple[int, int] | None,
+) -> pd.DataFrame:
+    """
+    Return the rows of a timestamp-indexed bar frame not yet in the catalog.
+
+    Duplicate timestamps keep their last row, the result is sorted, and rows
+    inside the stored `time_range` (as returned by `bar_time_range`) are
+    dropped so new files never overlap existing ones. Gaps inside the stored
+    range are therefore not backfilled.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        The bars, indexed by timestamp as passed to `BarDataWrangler`.
+    time_range : tuple[int, int], optional
+        The stored (first, last) UNIX nanoseconds, None if nothing is stored.
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+    if time_range is None:
+        return frame
+    ts = pd.DatetimeIndex(frame.index).as_unit("ns").asi8
+    first, last = time_range
+    return frame[(ts < first) | (ts > last)]
+
+
+def incremental_basename(bar_type: str, frame: pd.DataFrame) -> str:
+    """
+    Return a file basename for appending `frame` that never replaces a stored file.
+    """
+    ts = pd.DatetimeIndex(frame.index).as_unit("ns").asi8
+    return f"{bar_type}-{ts[0]}-{ts[-1]}"
+
+
+def file_time_range(path: str | Path) -> tuple[int, int] | None:
+    """
+    Return the `ts_init` range encoded in a bar file name, None for other names.
+    """
+    match = _FILE_RANGE.search(Path(path).name)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def partition_keys(ts: np.ndarray, partition: str) -> np.ndarray:
+    """
+    Return the UTC day or month of each UNIX nanosecond timestamp.
+    """
+    if partition not in PARTITIONS:
+        raise ValueError(
+            f"Unsupported partition {partition!r}, expected one of {list(PARTITIONS)}"
+        )
+    return (
+        np.asarray(ts, dtype=np.int64)
+        .astype("datetime64[ns]")
+        .astype(f"datetime64[{PARTITIONS[partition]}]")
+    )
+
+
+def partition_slices(ts: np.ndarray, partition: str | None) -> list[slice]:
+    """
+    Split sorted UNIX nanosecond timestamps into one slice per day or month.
+
+    Parameters
+    ----------
+    ts : np.ndarray
+        The sorted timestamps.
+    partition : str, optional
+        "day" or "month" (UTC), or None for a single slice.
+
+    Returns
+    -------
+    list[slice]
+    """
+    if len(ts) == 0:
+        return []
+    if partition is None:
+        return [slice(0, len(ts))]
+    keys = partition_keys(ts, partition)
+    bounds = [0, *(np.flatnonzero(keys[1:] != keys[:-1]) + 1), len(ts)]
+    return [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def write_bar_frame(
+    catalog,
+    bar_type: str,
+    frame: pd.DataFrame,
+    wrangler,
+    partition: str | None = None,
+) -> int:
+    """
+    Convert a timestamp-indexed bar frame with `wrangler` and append it to `catalog`.
+
+    With a `partition`, one file is written per day or month so time-range
+    queries open only the files they need. Files are named with
+    `incremental_basename` and never replace stored files.
+
+    Parameters
+    ----------
+    catalog : ParquetDataCatalog
+        The catalog to write to.
+    bar_type : str
+        The bar type string.
+    frame : pd.DataFrame
+        The sorted bars, as passed to `BarDataWrangler.process`.
+    wrangler : BarDataWrangler
+        The wrangler for `bar_type`.
+    partition : str, optional
+        "day" or "month", or None for a single file.
+
+    Returns
+    -------
+    int
+        The number of bars written.
+    """
+    ts = pd.DatetimeIndex(frame.index).as_unit("ns").asi8
+    written = 0
+    for part in partition_slices(ts, partition):
+        chunk = frame.iloc[part]
+        bars = wrangler.process(chunk)
+        catalog.write_data(bars, basename_template=incremental_basename(bar_type, chunk))
+        written += len(bars)
+    return written
+
+
+def write_instrument(catalog, instrument) -> None:
+    """
+    Write an instrument definition to `catalog`, replacing the stored one.
+
+    The file is named after the instrument ID. Nautilus 1.216 looks for a free
+    file name by formatting `{i}` into the basename template, so it never
+    finds one for a stored file of the same name; the stored file is removed
+    first instead.
+
+    Parameters
+    ----------
+    catalog : ParquetDataCatalog
+        The catalog to write to.
+    instrument : Instrument
+        The instrument definition.
+    """
+    name = instrument.id.value
+    data_path = Path(catalog.path) / "data"
+    if data_path.exists():
+        for class_path in data_path.iterdir():
+            if class_path.name == "bar" or not class_path.is_dir():
+                continue
+            for path in class_path.glob(f"*/{glob.escape(name)}.parquet"):
+                path.unlink()
+    catalog.write_data([instrument], basename_template=name)
+
+
+@contextmanager
+def catalog_write_lock(catalog_path: str | Path) -> Iterator[None]:
+    """
+    Hold an exclusive lock on the catalog while writing.
+
+    Overlapping runs (e.g. a slow cron job and the next one) would otherwise
+    both see the same stored ranges and append the same rows twice.
+    """
+    catalog_path = Path(catalog_path)
+    catalog_path.mkdir(parents=True, exist_ok=True)
+    with open(catalog_path / WRITE_LOCK_FILE, "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def clear_catalog(catalog_path: str | Path) -> None:
+    """
+    Delete everything stored in the catalog except its write lock file.
+
+    Call with `catalog_write_lock` held: a rebuild then waits for running
+    writers, and the lock file other writers open stays the same file.
+    """
+    for path in Path(catalog_path).iterdir():
+        if path.name == WRITE_LOCK_FILE:
+            continue
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+
+
+def to_unix_nanos(value: str | int | pd.Timestamp | None) -> int | None:
+    """
+    Convert a date string, timestamp or UNIX nanoseconds value to UNIX nanoseconds.
+    """
+    if value is None or isinstance(value, int):
+        return value
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return int(ts.value)
+
+
+def decode_fixed(array: pa.Array | pa.ChunkedArray) -> np.ndarray:
+    """
+    Decode a fixed-point price or size column into float64 values.
+
+    Parameters
+    ----------
+    array : pa.Array | pa.ChunkedArray
+        The raw column as written by the catalog.
+
+    Returns
+    -------
+    np.ndarray
+    """
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+
+    if pa.types.is_fixed_size_binary(array.type):
+        # Little-endian two's complement i128: value = high * 2**64 + low
+        raw = np.frombuffer(
+            array.buffers()[1],
+            dtype="<u8",
+            count=2 * len(array),
+            offset=array.offset * 16,
+        )
+        low = raw[0::2].astype(np.float64)
+        high = raw[1::2].view(np.int64).astype(np.float64)
+        return (high * 2.0**64 + low) / FIXED_SCALAR_HIGH
+
+    return array.to_numpy(zero_copy_only=False).astype(np.float64) / FIXED_SCALAR_STANDARD
+
+
+def encode_fixed(values: np.ndarray, precision: int, type: pa.DataType) -> pa.Array:
+    """
+    Encode float values as a fixed-point price or size column.
+
+    Values are rounded to `precision` decimal places (half away from zero,
+    as `Price` and `Quantity` do) and scaled to the catalog's fixed-point
+    representation, so the result matches what `BarDataWrangler` writes.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The float values.
+    precision : int
+        The price or size precision of the instrument.
+    type : pa.DataType
+        The target column type, an integer type or 16-byte fixed size binary.
+
+    Returns
+    -------
+    pa.Array
+
+    Raises
+    ------
+    ValueError
+        If a value is not finite or does not fit the fixed-point column.
+    """
+    scaled = np.asarray(values, dtype=np.float64) * 10.0**precision
+    high_precision = pa.types.is_fixed_size_binary(type)
+    if high_precision:
+        multiplier = 10 ** (FIXED_PRECISION_HIGH - precision)
+        raw_max = 2**127 - 1
+    else:
+        multiplier = 10 ** (FIXED_PRECISION_STANDARD - precision)
+        raw_max = int(np.iinfo(type.to_pandas_dtype()).max)
+    # Units are computed as int64 before scaling, so both must fit
+    limit = min(raw_max // multiplier, int(np.iinfo(np.int64).max))
+    low = 0.0 if pa.types.is_unsigned_integer(type) else -float(limit)
+    in_range = (scaled >= low) & (scaled < float(limit))
+    if not in_range.all():
+        bad = float(np.asarray(values, dtype=np.float64)[~in_range][0])
+        raise ValueError(
+            f"{bad} does not fit a {type} fixed-point column with precision {precision}"
+        )
+    units = (np.sign(scaled) * np.floor(np.abs(scaled) + 0.5)).astype(np.int64)
+
+    if high_precision:
+        # 128-bit product computed as decimals, which share the i128 layout
+        product = pc.multiply(
+            pc.cast(pa.array(units), pa.decimal128(20, 0)),
+            pa.scalar(multiplier, pa.decimal128(17, 0)),
+        )
+        return pa.Array.from_buffers(
+            type, len(product), [None, product.buffers()[1]], offset=product.offset
+        )
+
+    if pa.types.is_unsigned_integer(type):
+        return pa.array(units.astype(np.uint64) * np.uint64(multiplier)).cast(type)
+    return pa.array(units * multiplier).cast(type)
+
+
+def decode_bar_table(table: pa.Table) -> pl.DataFrame:
+    """
+    Decode a raw catalog bar table into a float OHLCV frame.
+
+    The returned frame has `ts_event` and `ts_init` as Int64 UNIX nanoseconds
+    and `open`, `high`, `low`, `close`, `volume` as Float64.
+    """
+    columns = {
+        name: decode_fixed(table.column(name)) for name in (*BAR_PRICE_COLUMNS, "volume")
+    }
+    for name in ("ts_event", "ts_init"):
+        columns[name] = table.column(name).to_numpy().astype(np.int64)
+    return pl.DataFrame(columns).select(BAR_COLUMNS)
+
+
+def read_bars(
+    catalog_path: str | Path,
+    bar_type: str,
+    start: str | int | pd.Timestamp | None = None,
+    end: str | int | pd.Timestamp | None = None,
+) -> pl.DataFrame:
+    """
+    Read the bars for `bar_type` as a float OHLCV frame sorted by `ts_init`.
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        The catalog root.
+    bar_type : str
+        The bar type string, e.g. "ADAUSDT-PERP.BINANCE-1-MINUTE-LAST-EXTERNAL".
+    start : str | int | pd.Timestamp, optional
+        The inclusive lower bound on `ts_init`.
+    end : str | int | pd.Timestamp, optional
+        The inclusive upper bound on `ts_init`.
+
+    Returns
+    -------
+    pl.DataFrame
+    """
+    start_ns = to_unix_nanos(start)
+    end_ns = to_unix_nanos(end)
+
+    # Files named with their time range are skipped without opening them
+    files = []
+    for path in bar_files(catalog_path, bar_type):
+        span = file_time_range(path)
+        if span is None or (
+            (start_ns is None or span[1] >= start_ns) and (end_ns is None or span[0] <= end_ns)
+        ):
+            files.append(path)
+    if not files:
+        return pl.DataFrame(
+            schema={
+                **{name: pl.Float64 for name in (*BAR_PRICE_COLUMNS, "volume")},
+                "ts_event": pl.Int64,
+                "ts_init": pl.Int64,
+            }
+        )
+
+    filters = []
+    if start_ns is not None:
+        filters.append(("ts_init", ">=", start_ns))
+    if end_ns is not None:
+        filters.append(("ts_init", "<=", end_ns))
+
+    tables = [
+        pq.read_table(path, columns=list(BAR_COLUMNS), filters=filters or None)
+        for path in files
+    ]
+    frame = pl.concat([decode_bar_table(t) for t in tables])
+    return frame.sort("ts_init")
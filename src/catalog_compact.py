@@ -0,0 +1,217 @@
+# -------------------------------------------------------------------------------------------------
+#  Catalog compaction
+#  合併每個bar類型的碎片文件: 按ts_init排序, 去除重複, 以目標row group大小原子性重寫
+# -------------------------------------------------------------------------------------------------
+#
+# Compact every bar type of a catalog from the project root:
+#     python -m src.catalog_compact data/binance/catalog
+# CATALOG_PARTITION=day or month rewrites one file per day or month, and
+# CATALOG_ENCODING picks the encoding profile (see ENCODING_PROFILES).
+
+import ctypes
+import ctypes.util
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.catalog_bars import (
+    bar_file_stats,
+    bar_files,
+    bar_type_dir,
+    catalog_write_lock,
+    encoding_profile,
+    list_bar_types,
+    partition_keys,
+    partition_slices,
+)
+from src.catalog_manifest import update_manifest
+
+
+# Staging area for rewritten directories, on the same filesystem as the catalog
+STAGING_DIR = ".compact"
+
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+
+def _exchange_directories(a: Path, b: Path) -> None:
+    # renameat2(RENAME_EXCHANGE) swaps both paths in one step on Linux, so a
+    # reader listing the directory sees either the old or the new file set
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    renameat2 = getattr(libc, "renameat2", None)
+    if renameat2 is not None:
+        status = renameat2(
+            _AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE
+        )
+        if status == 0:
+            return
+        errno = ctypes.get_errno()
+        if errno not in (22, 38, 95):  # EINVAL, ENOSYS, EOPNOTSUPP: not supported here
+            raise OSError(errno, os.strerror(errno), str(a), None, str(b))
+
+    # Two renames, the directory is missing only between them
+    parked = a.with_name(f"{a.name}.swap")
+    os.rename(b, parked)
+    os.rename(a, b)
+    os.rename(parked, a)
+
+
+def needs_compaction(stats: list[dict], partition: str | None = None) -> bool:
+    """
+    Return whether bar files, as described by `bar_file_stats`, need compacting.
+
+    Without a partition any bar type with more than one file is compacted.
+    With a partition, files spanning several days or months, or several
+    files in one day or month, are compacted.
+    """
+    stats = [s for s in stats if s["rows"]]
+    if partition is None:
+        return len(stats) > 1
+    firsts = partition_keys([s["first_ts"] for s in stats], partition)
+    lasts = partition_keys([s["last_ts"] for s in stats], partition)
+    return bool((firsts != lasts).any()) or len(set(firsts.tolist())) < len(stats)
+
+
+def _compact(
+    catalog_path: Path,
+    bar_type: str,
+    partition: str | None,
+    encoding: str,
+    force: bool,
+) -> dict:
+    directory = bar_type_dir(catalog_path, bar_type)
+    files = bar_files(catalog_path, bar_type)
+    stats = [bar_file_stats(path) for path in files]
+    result = {
+        "bar_type": bar_type,
+        "files_before": len(files),
+        "files_after": len(files),
+        "rows_before": sum(s["rows"] for s in stats),
+        "rows_after": sum(s["rows"] for s in stats),
+        "compacted": False,
+    }
+    if not files or not (force or needs_compaction(stats, partition)):
+        return result
+
+    # Merge, sort by ts_init (stable, so later files follow earlier ones) and
+    # keep the last row of each timestamp, as incremental appends do. Files
+    # are taken in write order, not name order: appends start after the
+    # stored range, ties fall back to mtime, and a legacy `<bar_type>.parquet`
+    # would otherwise sort after every `<bar_type>-<ts>-<ts>.parquet`
+    order = sorted(
+        range(len(files)),
+        key=lambda i: (stats[i]["first_ts"] or 0, files[i].stat().st_mtime_ns, files[i].name),
+    )
+    tables = [pq.read_table(files[i]) for i in order]
+    schema = tables[0].schema
+    table = pa.concat_tables([t.cast(schema) for t in tables])
+    table = table.take(pc.sort_indices(table, [("ts_init", "ascending")]))
+    ts = table.column("ts_init").to_numpy().astype(np.int64)
+    if len(ts):
+        keep = np.r_[ts[1:] != ts[:-1], True]
+        table = table.filter(pa.array(keep))
+        ts = ts[keep]
+
+    staging = Path(catalog_path) / STAGING_DIR / bar_type
+    if staging.exists():
+        shutil.rmtree(staging)
+    staging.mkdir(parents=True)
+    profile = encoding_profile(encoding)
+    for part in partition_slices(ts, partition):
+        pq.write_table(
+            table.slice(part.start, part.stop - part.start),
+            staging / f"{bar_type}-{ts[part.start]}-{ts[part.stop - 1]}.parquet",
+            row_group_size=profile.row_group_rows,
+            **profile.writer_options(schema),
+        )
+
+    # Swap in the rewritten directory, then drop the old files
+    _exchange_directories(staging, directory)
+    shutil.rmtree(staging)
+
+    result["files_after"] = len(partition_slices(ts, partition))
+    result["rows_after"] = len(ts)
+    result["compacted"] = True
+    return result
+
+
+def compact_catalog(
+    catalog_path: str | Path,
+    bar_types: list[str] | None = None,
+    partition: str | None = None,
+    encoding: str = "default",
+    force: bool = False,
+    workers: int | None = None,
+) -> list[dict]:
+    """
+    Merge the fragments of each bar type into sorted, deduplicated files.
+
+    Each bar type's files are read, sorted by `ts_init`, deduplicated
+    (keeping the last row of a timestamp, as incremental appends do) and
+    rewritten with the `encoding` profile (codec, dictionary encoding and
+    row-group size), as one file or one file per day or month. The new files
+    are written to a staging directory and swapped with the bar type
+    directory in one rename, so readers see either the old or the new files,
+    never a partial rewrite. The catalog write lock is held throughout and the
+    manifest is refreshed afterwards.
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        The catalog root.
+    bar_types : list[str], optional
+        The bar types to compact, defaults to all bar types in the catalog.
+    partition : str, optional
+        "day" or "month" to write one file per partition, None for one file.
+    encoding : str, default "default"
+        The name of the profile in `ENCODING_PROFILES` to write with.
+    force : bool, default False
+        If bar types already laid out as requested are rewritten anyway, e.g.
+        to drop duplicates inside a single file or to change the encoding.
+    workers : int, optional
+        The number of threads, defaults to the CPU count.
+
+    Returns
+    -------
+    list[dict]
+        Per bar type: the file and row counts before and after, and whether
+        it was rewritten.
+    """
+    catalog_path = Path(catalog_path)
+    if bar_types is None:
+        bar_types = list_bar_types(catalog_path)
+    workers = workers or os.cpu_count() or 1
+    with catalog_write_lock(catalog_path):
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(
+                    executor.map(
+                        lambda b: _compact(catalog_path, b, partition, encoding, force),
+                        bar_types,
+                    )
+                )
+        finally:
+            shutil.rmtree(catalog_path / STAGING_DIR, ignore_errors=True)
+        update_manifest(catalog_path, [r["bar_type"] for r in results if r["compacted"]])
+    return results
+
+
+if __name__ == "__main__":
+    partition = os.getenv("CATALOG_PARTITION") or None
+    encoding = os.getenv("CATALOG_ENCODING", "default")
+    for catalog in sys.argv[1:] or ["data/binance/catalog"]:
+        results = compact_catalog(catalog, partition=partition, encoding=encoding)
+        compacted = [r for r in results if r["compacted"]]
+        for r in compacted:
+            print(
+                f"{r['bar_type']}: {r['files_before']} -> {r['files_after']} files, "
+                f"{r['rows_before'] - r['rows_after']} duplicate rows removed"
+            )
+        print(f"{catalog}: compacted {len(compacted)} of {len(results)} bar types")
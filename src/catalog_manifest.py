@@ -0,0 +1,313 @@
+# -------------------------------------------------------------------------------------------------
+#  Catalog manifest
+#  寫入時維護的catalog索引: 每個交易對及bar類型的行數, 時間範圍及文件列表
+# -------------------------------------------------------------------------------------------------
+#
+# Rebuild the manifest of an existing catalog from the project root:
+#     python -m src.catalog_manifest data/binance/catalog
+
+import json
+import os
+import sys
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import NamedTuple
+
+from src.catalog_bars import (
+    bar_file_stats,
+    bar_files,
+    bar_type_dir,
+    list_bar_types,
+    to_unix_nanos,
+)
+from src.catalog_verify import bar_interval_nanos, instrument_id_of
+
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Instrument classes that trade around the clock. Other instruments trade in
+# sessions, so their first and last bars may fall up to a long weekend inside
+# a requested date range
+CONTINUOUS_INSTRUMENT_CLASSES = ("crypto_perpetual", "crypto_future", "crypto_option")
+SESSION_SLACK_NS = 4 * 86_400_000_000_000
+
+
+class BarCoverage(NamedTuple):
+    """
+    The stored bars of one bar type, as recorded in the manifest.
+    """
+
+    bar_type: str
+    instrument_id: str
+    rows: int
+    first_ts: int | None
+    last_ts: int | None
+    files: tuple[str, ...]
+
+    def covers(self, start: int | None, end: int | None, tolerance: int = 0) -> bool:
+        """
+        Return whether the stored bars span [`start`, `end`] (UNIX nanoseconds).
+
+        The first bar may start up to `tolerance` nanoseconds after `start`
+        and the last bar end up to `tolerance` before `end`.
+        """
+        if self.first_ts is None:
+            return False
+        return (start is None or self.first_ts <= start + tolerance) and (
+            end is None or self.last_ts >= end - tolerance
+        )
+
+
+def manifest_path(catalog_path: str | Path) -> Path:
+    """
+    Return the manifest file of a catalog.
+    """
+    return Path(catalog_path) / MANIFEST_FILE
+
+
+def bar_coverage(catalog_path: str | Path, bar_type: str) -> BarCoverage:
+    """
+    Return the coverage of `bar_type` read from its Parquet footers.
+    """
+    directory = bar_type_dir(catalog_path, bar_type)
+    files = bar_files(catalog_path, bar_type)
+    stats = [bar_file_stats(path) for path in files]
+    firsts = [s["first_ts"] for s in stats if s["first_ts"] is not None]
+    lasts = [s["last_ts"] for s in stats if s["last_ts"] is not None]
+    return BarCoverage(
+        bar_type=bar_type,
+        instrument_id=instrument_id_of(bar_type),
+        rows=sum(s["rows"] for s in stats),
+        first_ts=min(firsts) if firsts else None,
+        last_ts=max(lasts) if lasts else None,
+        files=tuple(str(path.relative_to(directory)) for path in files),
+    )
+
+
+def _catalog_instruments(catalog_path: str | Path) -> dict[str, str]:
+    # Instruments are stored as data/<instrument class>/<instrument_id>/
+    data_root = Path(catalog_path) / "data"
+    if not data_root.exists():
+        return {}
+    return {
+        directory.name: class_dir.name
+        for class_dir in sorted(data_root.iterdir())
+        if class_dir.is_dir() and class_dir.name != "bar"
+        for directory in sorted(class_dir.iterdir())
+        if directory.is_dir()
+    }
+
+
+def update_manifest(
+    catalog_path: str | Path,
+    bar_types: list[str] | None = None,
+) -> "CatalogManifest":
+    """
+    Refresh the manifest entries of `bar_types` after they were written.
+
+    Only the footers of the given bar types are read, other entries are kept
+    as recorded. The manifest is replaced atomically; callers hold
+    `catalog_write_lock` so concurrent writers do not lose entries.
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        The catalog root.
+    bar_types : list[str], optional
+        The bar types written, defaults to rebuilding every entry. Every
+        entry is also rebuilt when the catalog has no manifest yet.
+
+    Returns
+    -------
+    CatalogManifest
+    """
+    path = manifest_path(catalog_path)
+    entries = {}
+    if not path.exists():
+        # The first manifest of a catalog indexes every bar type
+        bar_types = None
+    elif bar_types is not None:
+        entries = dict(CatalogManifest.load(catalog_path).bars)
+    for bar_type in list_bar_types(catalog_path) if bar_types is None else bar_types:
+        coverage = bar_coverage(catalog_path, bar_type)
+        if coverage.files:
+            entries[bar_type] = coverage
+        else:
+            entries.pop(bar_type, None)
+
+    manifest = CatalogManifest(
+        instruments=_catalog_instruments(catalog_path),
+        bars=dict(sorted(entries.items())),
+        updated_at=datetime.now(UTC),
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest.to_dict(), indent=2))
+    os.replace(tmp_path, path)
+    return manifest
+
+
+class CatalogManifest:
+    """
+    The instruments and bar coverage of a catalog, readable without touching bar files.
+
+    Parameters
+    ----------
+    instruments : dict[str, str]
+        The instrument class directory by instrument ID.
+    bars : dict[str, BarCoverage]
+        The coverage by bar type.
+    updated_at : datetime
+        When the manifest was last written.
+    """
+
+    def __init__(
+        self,
+        instruments: dict[str, str],
+        bars: dict[str, BarCoverage],
+        updated_at: datetime,
+    ):
+        self.instruments = instruments
+        self.bars = bars
+        self.updated_at = updated_at
+
+    @classmethod
+    def load(cls, catalog_path: str | Path) -> "CatalogManifest":
+        """
+        Read the manifest of a catalog.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the catalog has no manifest.
+        """
+        path = manifest_path(catalog_path)
+        if not path.exists():
+            raise FileNotFoundError(
+                f"No catalog manifest at {path}, "
+                f"run `python -m src.catalog_manifest {catalog_path}` to build it"
+            )
+        data = json.loads(path.read_text())
+        return cls(
+            instruments=data["instruments"],
+            bars={
+                bar_type: BarCoverage(
+                    bar_type=bar_type, **{**entry, "files": tuple(entry["files"])}
+                )
+                for bar_type, entry in data["bars"].items()
+            },
+            updated_at=datetime.fromisoformat(data["updated_at"]),
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Return the manifest as JSON-serializable data.
+        """
+        return {
+            "version": MANIFEST_VERSION,
+            "updated_at": self.updated_at.isoformat(),
+            "instruments": self.instruments,
+            "bars": {
+                bar_type: {
+                    "instrument_id": coverage.instrument_id,
+                    "rows": coverage.rows,
+                    "first_ts": coverage.first_ts,
+                    "last_ts": coverage.last_ts,
+                    "files": list(coverage.files),
+                }
+                for bar_type, coverage in self.bars.items()
+            },
+        }
+
+    def coverage(self, bar_type: str) -> BarCoverage | None:
+        """
+        Return the coverage of `bar_type`, None if it has no bars.
+        """
+        return self.bars.get(str(bar_type))
+
+    def instrument_ids(self, bar_step: str | None = None) -> list[str]:
+        """
+        Return the instrument IDs, or only those with bars of `bar_step` (e.g. "1-MINUTE").
+        """
+        if bar_step is None:
+            return sorted(self.instruments)
+        suffix = f"-{bar_step}-LAST-EXTERNAL"
+        return sorted(
+            {c.instrument_id for c in self.bars.values() if c.bar_type.endswith(suffix)}
+        )
+
+    def edge_tolerance(self, bar_type: str) -> int:
+        """
+        Return how far inside a requested range the bars of `bar_type` may start and end.
+
+        Bars stamped at their close start one bar interval after the range
+        start. Instruments that trade in sessions (equities, futures, FX, or
+        any instrument the manifest has no class for) also get
+        `SESSION_SLACK_NS`, since their first bar follows the session open and
+        a range may end on a weekend or holiday.
+        """
+        tolerance = bar_interval_nanos(str(bar_type)) or 0
+        instrument_class = self.instruments.get(instrument_id_of(str(bar_type)))
+        if instrument_class not in CONTINUOUS_INSTRUMENT_CLASSES:
+            tolerance += SESSION_SLACK_NS
+        return tolerance
+
+    def covering(
+        self,
+        bar_step: str,
+        start: str | int | None = None,
+        end: str | int | None = None,
+    ) -> list[str]:
+        """
+        Return the instrument IDs whose `bar_step` bars span [`start`, `end`].
+
+        The range edges allow for `edge_tolerance`. For example
+        `covering("1-MINUTE", "2024-01-01", "2024-12-31")` lists the instruments with
+        1-minute data for all of 2024.
+        """
+        start_ns, end_ns = to_unix_nanos(start), to_unix_nanos(end)
+        suffix = f"-{bar_step}-LAST-EXTERNAL"
+        return sorted(
+            c.instrument_id
+            for c in self.bars.values()
+            if c.bar_type.endswith(suffix)
+            and c.covers(start_ns, end_ns, self.edge_tolerance(c.bar_type))
+        )
+
+    def missing(
+        self,
+        bar_types: list[str],
+        start: str | int | None = None,
+        end: str | int | None = None,
+    ) -> list[str]:
+        """
+        Return a description of every bar type not stored for all of [`start`, `end`].
+
+        The range edges allow for `edge_tolerance`.
+        """
+        start_ns, end_ns = to_unix_nanos(start), to_unix_nanos(end)
+        problems = []
+        for bar_type in map(str, bar_types):
+            coverage = self.coverage(bar_type)
+            if coverage is None:
+                problems.append(f"{bar_type}: no bars")
+            elif not coverage.covers(start_ns, end_ns, self.edge_tolerance(bar_type)):
+                problems.append(
+                    f"{bar_type}: stored {_format_ns(coverage.first_ts)} to "
+                    f"{_format_ns(coverage.last_ts)}, requested {start} to {end}"
+                )
+        return problems
+
+
+def _format_ns(value: int | None) -> str:
+    return "-" if value is None else datetime.fromtimestamp(value / 1e9, UTC).isoformat()
+
+
+if __name__ == "__main__":
+    for catalog in sys.argv[1:] or ["data/binance/catalog"]:
+        manifest = update_manifest(catalog)
+        print(
+            f"{manifest_path(catalog)}: {len(manifest.instruments)} instruments, "
+            f"{len(manifest.bars)} bar types"
+        )
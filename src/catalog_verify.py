@@ -0,0 +1,433 @@
+# -------------------------------------------------------------------------------------------------
+#  Catalog verification from Parquet metadata and columnar scans
+#  以Parquet元數據及列式掃描檢查catalog, 不建立Bar對象
+# -------------------------------------------------------------------------------------------------
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pyarrow.parquet as pq
+
+from src.catalog_bars import (
+    BAR_PRICE_COLUMNS,
+    bar_file_stats,
+    bar_files,
+    decode_fixed,
+    list_bar_types,
+)
+
+
+# Rows decoded at a time by the statistics and quality scans
+SCAN_BATCH_ROWS = 1_000_000
+
+# Log-volume histogram of the volume outlier check, the bin width bounds the
+# error of its median and MAD
+LOG_VOLUME_BIN = 0.001
+_LOG_VOLUME_RANGE = (-40.0, 60.0)
+_LOG_VOLUME_BINS = int((_LOG_VOLUME_RANGE[1] - _LOG_VOLUME_RANGE[0]) / LOG_VOLUME_BIN)
+
+# Time bar aggregations and their length in nanoseconds
+_AGGREGATION_NANOS = {
+    "MILLISECOND": 1_000_000,
+    "SECOND": 1_000_000_000,
+    "MINUTE": 60_000_000_000,
+    "HOUR": 3_600_000_000_000,
+    "DAY": 86_400_000_000_000,
+    "WEEK": 604_800_000_000_000,
+}
+
+# Counted by `scan_bar_type`, in report order
+QUALITY_CHECKS = (
+    "non_monotonic",
+    "duplicates",
+    "gaps",
+    "ohlc_invalid",
+    "non_positive",
+    "zero_volume",
+    "volume_outliers",
+)
+
+
+def instrument_id_of(bar_type: str) -> str:
+    """
+    Return the instrument id part of a bar type string.
+    """
+    # A bar type is "{instrument_id}-{step}-{aggregation}-{price_type}-{source}"
+    return bar_type.rsplit("-", 4)[0]
+
+
+def bar_interval_nanos(bar_type: str) -> int | None:
+    """
+    Return the bar length of a time bar type in nanoseconds, None for other aggregations.
+    """
+    step, aggregation = bar_type.rsplit("-", 4)[1:3]
+    if aggregation not in _AGGREGATION_NANOS:
+        return None
+    return int(step) * _AGGREGATION_NANOS[aggregation]
+
+
+def _log_volume_bins(volume: np.ndarray) -> np.ndarray:
+    # Histogram bin of each positive volume, clipped to the histogram range
+    bins = (np.log(volume) - _LOG_VOLUME_RANGE[0]) / LOG_VOLUME_BIN
+    return np.clip(bins, 0, _LOG_VOLUME_BINS - 1).astype(np.int64)
+
+
+def _scan_stats(files: list[Path]) -> dict:
+    # One pass over the OHLCV columns, one batch decoded at a time
+    low = high = None
+    close_sum = volume_sum = 0.0
+    rows = 0
+    for path in files:
+        for batch in pq.ParquetFile(path).iter_batches(
+            batch_size=SCAN_BATCH_ROWS,
+            columns=[*BAR_PRICE_COLUMNS, "volume"],
+        ):
+            if batch.num_rows == 0:
+                continue
+            batch_low = decode_fixed(batch.column("low")).min()
+            batch_high = decode_fixed(batch.column("high")).max()
+            low = batch_low if low is None else min(low, batch_low)
+            high = batch_high if high is None else max(high, batch_high)
+            close_sum += decode_fixed(batch.column("close")).sum()
+            volume_sum += decode_fixed(batch.column("volume")).sum()
+            rows += batch.num_rows
+    return {
+        "low": low,
+        "high": high,
+        "mean_close": close_sum / rows if rows else None,
+        "volume": volume_sum,
+        "mean_volume": volume_sum / rows if rows else None,
+    }
+
+
+def bar_type_summary(catalog_path: str | Path, bar_type: str, stats: bool = True) -> dict:
+    """
+    Summarize the bars stored for `bar_type`.
+
+    Counts, sizes and the `ts_init` range come from the Parquet footers. When
+    `stats` is True the OHLCV columns are also scanned in batches for the
+    price range, mean close and volume.
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        The catalog root.
+    bar_type : str
+        The bar type string.
+    stats : bool, default True
+        If the OHLCV columns should be scanned.
+
+    Returns
+    -------
+    dict
+    """
+    files = bar_files(catalog_path, bar_type)
+    file_stats = [bar_file_stats(path) for path in files]
+    firsts = [s["first_ts"] for s in file_stats if s["first_ts"] is not None]
+    lasts = [s["last_ts"] for s in file_stats if s["last_ts"] is not None]
+    summary = {
+        "bar_type": bar_type,
+        "instrument_id": instrument_id_of(bar_type),
+        "files": len(files),
+        "row_groups": sum(s["row_groups"] for s in file_stats),
+        "rows": sum(s["rows"] for s in file_stats),
+        "bytes": sum(s["bytes"] for s in file_stats),
+        "first_ts": min(firsts) if firsts else None,
+        "last_ts": max(lasts) if lasts else None,
+    }
+    if stats:
+        summary.update(_scan_stats(files))
+    return summary
+
+
+def summarize_catalog(
+    catalog_path: str | Path,
+    bar_types: list[str] | None = None,
+    stats: bool = True,
+    workers: int | None = None,
+) -> pl.DataFrame:
+    """
+    Summarize every bar type in the catalog, one row per bar type.
+
+    Bar types are summarized in parallel threads; the Parquet reader and the
+    numpy reductions release the GIL, so the scan scales with the cores.
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        The catalog root.
+    bar_types : list[str], optional
+        The bar types to summarize, defaults to all bar types in the catalog.
+    stats : bool, default True
+        If the OHLCV columns should be scanned (see `bar_type_summary`).
+    workers : int, optional
+        The number of threads, defaults to the CPU count.
+
+    Returns
+    -------
+    pl.DataFrame
+        Sorted by bar type, with `start` and `end` as UTC datetimes.
+    """
+    if bar_types is None:
+        bar_types = list_bar_types(catalog_path)
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        summaries = list(
+            executor.map(lambda b: bar_type_summary(catalog_path, b, stats), bar_types)
+        )
+    if not summaries:
+        return pl.DataFrame()
+
+    frame = pl.DataFrame(summaries, infer_schema_length=None)
+    return frame.with_columns(
+        pl.from_epoch(pl.col("first_ts"), time_unit="ns").dt.replace_time_zone("UTC").alias("start"),
+        pl.from_epoch(pl.col("last_ts"), time_unit="ns").dt.replace_time_zone("UTC").alias("end"),
+    ).sort("bar_type")
+
+
+def print_summary(frame: pl.DataFrame) -> None:
+    """
+    Print a catalog summary as returned by `summarize_catalog`.
+    """
+    if frame.is_empty():
+        print("No bars found")
+        return
+    columns = [
+        c
+        for c in ("bar_type", "rows", "start", "end", "low", "high", "mean_close", "volume")
+        if c in frame.columns
+    ]
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=200, fmt_str_lengths=60):
+        print(frame.select(columns))
+    print(
+        f"{frame.height} bar types, {frame['rows'].sum()} bars, "
+        f"{frame['files'].sum()} files, {frame['bytes'].sum() / 2**20:.1f} MiB"
+    )
+
+
+def _iter_batches(files: list[Path], columns: list[str]):
+    # Files in name order, rows in stored order, so ordering faults stay visible
+    for path in files:
+        for batch in pq.ParquetFile(path).iter_batches(
+            batch_size=SCAN_BATCH_ROWS, columns=columns
+        ):
+            if batch.num_rows:
+                yield batch
+
+
+def _histogram_median(counts: np.ndarray, centers: np.ndarray) -> float:
+    # The value at which the cumulative count reaches half the total
+    order = np.argsort(centers, kind="stable")
+    cumulative = np.cumsum(counts[order])
+    return float(centers[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+
+def _gap_stats(ts: np.ndarray, interval: int, max_gap: int | None) -> tuple:
+    # Gaps of an unsorted series, measured on its sorted unique timestamps
+    ordered = np.sort(ts)
+    unique = ordered[np.r_[True, np.diff(ordered) != 0]]
+    spans = np.diff(unique)
+    is_gap = spans > interval
+    if max_gap is not None:
+        is_gap &= spans <= max_gap
+    gap_ends = unique[1:][is_gap]
+    return (
+        int(np.isin(ts, gap_ends).sum()),
+        int((spans[is_gap] // interval - 1).sum()),
+        int(spans[is_gap].max()) if is_gap.any() else 0,
+        int(gap_ends.min()) if len(gap_ends) else None,
+    )
+
+
+def scan_bar_type(
+    catalog_path: str | Path,
+    bar_type: str,
+    volume_zscore: float = 8.0,
+    max_gap: int | None = None,
+) -> dict:
+    """
+    Check the bars stored for `bar_type` for data-quality problems.
+
+    The series is scanned in stored order, `SCAN_BATCH_ROWS` rows at a time,
+    so memory does not grow with its length:
+
+    - `non_monotonic`: bars whose `ts_event` is earlier than the previous bar.
+    - `duplicates`: bars with the same `ts_event` as the previous bar.
+    - `gaps`: intervals longer than the bar length, with `missing_bars`
+      counting the bars they skip (time bar types only).
+    - `ohlc_invalid`: bars where high < low, or open/close is outside [low, high].
+    - `non_positive`: bars with a zero or negative price.
+    - `zero_volume`: bars with zero volume.
+    - `volume_outliers`: bars whose log volume is more than `volume_zscore`
+      robust standard deviations (median/MAD) from the median.
+
+    The log-volume median and MAD come from a histogram with bins of
+    `LOG_VOLUME_BIN` built in the first pass; a second pass over the volume
+    column flags the outliers. Gaps of an unsorted series are measured on
+    its sorted timestamps, which reads the `ts_event` column once more.
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        The catalog root.
+    bar_type : str
+        The bar type string.
+    volume_zscore : float, default 8.0
+        The robust z-score above which a bar's volume is an outlier.
+    max_gap : int, optional
+        Gaps longer than this many nanoseconds are ignored, e.g. overnight
+        and weekend closes for equities. By default every gap is reported.
+
+    Returns
+    -------
+    dict
+        The count of each check in `QUALITY_CHECKS`, plus `bar_type`, `rows`,
+        `missing_bars`, `max_gap_ns` and `first_issue_ts`, the `ts_event` of
+        the earliest flagged bar (None if the series is clean).
+    """
+    files = bar_files(catalog_path, bar_type)
+    interval = bar_interval_nanos(bar_type)
+    report = {"bar_type": bar_type, "rows": 0}
+    report |= {check: 0 for check in QUALITY_CHECKS}
+    report |= {"missing_bars": 0, "max_gap_ns": 0, "first_issue_ts": None}
+    first_issue = {}  # Check -> earliest flagged ts_event
+    histogram = np.zeros(_LOG_VOLUME_BINS, dtype=np.int64)
+
+    def flag(check: str, mask: np.ndarray, ts: np.ndarray) -> None:
+        count = int(mask.sum())
+        if count:
+            report[check] += count
+            first = int(ts[mask].min())
+            first_issue[check] = min(first_issue.get(check, first), first)
+
+    previous_ts = None
+    for batch in _iter_batches(files, [*BAR_PRICE_COLUMNS, "volume", "ts_event"]):
+        ts = batch.column("ts_event").to_numpy().astype(np.int64)
+        o, h, l, c, v = (
+            decode_fixed(batch.column(name)) for name in (*BAR_PRICE_COLUMNS, "volume")
+        )
+        report["rows"] += len(ts)
+
+        # Steps from the previous bar, the first bar is never an ordering fault
+        steps = np.diff(ts, prepend=ts[0] if previous_ts is None else previous_ts)
+        duplicates = steps == 0
+        if previous_ts is None:
+            duplicates[0] = False
+        previous_ts = ts[-1]
+        flag("non_monotonic", steps < 0, ts)
+        flag("duplicates", duplicates, ts)
+        flag("ohlc_invalid", (h < l) | (o > h) | (o < l) | (c > h) | (c < l), ts)
+        flag("non_positive", (o <= 0) | (h <= 0) | (l <= 0) | (c <= 0), ts)
+        flag("zero_volume", v == 0, ts)
+
+        # Gaps between consecutive bars, exact while the series is sorted
+        if interval is not None:
+            gap = steps > interval
+            if max_gap is not None:
+                gap &= steps <= max_gap
+            flag("gaps", gap, ts)
+            if gap.any():
+                report["missing_bars"] += int((steps[gap] // interval - 1).sum())
+                report["max_gap_ns"] = max(report["max_gap_ns"], int(steps[gap].max()))
+
+        traded = v[v > 0]
+        histogram += np.bincount(_log_volume_bins(traded), minlength=_LOG_VOLUME_BINS)
+
+    if interval is not None and report["non_monotonic"]:
+        ts = np.concatenate(
+            [b.column(0).to_numpy().astype(np.int64) for b in _iter_batches(files, ["ts_event"])]
+        )
+        gaps, missing, longest, first = _gap_stats(ts, interval, max_gap)
+        report |= {"gaps": gaps, "missing_bars": missing, "max_gap_ns": longest}
+        first_issue.pop("gaps", None)
+        if first is not None:
+            first_issue["gaps"] = first
+
+    if histogram.sum() > 1:
+        centers = _LOG_VOLUME_RANGE[0] + (np.arange(_LOG_VOLUME_BINS) + 0.5) * LOG_VOLUME_BIN
+        median = _histogram_median(histogram, centers)
+        mad = _histogram_median(histogram, np.abs(centers - median)) * 1.4826
+        if mad > 0:
+            for batch in _iter_batches(files, ["volume", "ts_event"]):
+                v = decode_fixed(batch.column("volume"))
+                outliers = np.zeros(len(v), dtype=bool)
+                traded = v > 0
+                outliers[traded] = np.abs(np.log(v[traded]) - median) / mad > volume_zscore
+                flag("volume_outliers", outliers, batch.column("ts_event").to_numpy())
+
+    if first_issue:
+        report["first_issue_ts"] = min(first_issue.values())
+    return report
+
+
+def scan_catalog(
+    catalog_path: str | Path,
+    bar_types: list[str] | None = None,
+    volume_zscore: float = 8.0,
+    max_gap: int | None = None,
+    workers: int | None = None,
+) -> pl.DataFrame:
+    """
+    Run `scan_bar_type` over every bar type in the catalog in parallel threads.
+
+    Parameters
+    ----------
+    catalog_path : str | Path
+        The catalog root.
+    bar_types : list[str], optional
+        The bar types to scan, defaults to all bar types in the catalog.
+    volume_zscore : float, default 8.0
+        See `scan_bar_type`.
+    max_gap : int, optional
+        See `scan_bar_type`.
+    workers : int, optional
+        The number of threads, defaults to the CPU count.
+
+    Returns
+    -------
+    pl.DataFrame
+        One row per bar type, sorted by bar type, with an `issues` total.
+    """
+    if bar_types is None:
+        bar_types = list_bar_types(catalog_path)
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        reports = list(
+            executor.map(
+                lambda b: scan_bar_type(catalog_path, b, volume_zscore, max_gap),
+                bar_types,
+            )
+        )
+    if not reports:
+        return pl.DataFrame()
+
+    frame = pl.DataFrame(reports, infer_schema_length=None)
+    return frame.with_columns(
+        pl.sum_horizontal(QUALITY_CHECKS).alias("issues"),
+        pl.duration(nanoseconds=pl.col("max_gap_ns")).alias("max_gap"),
+        pl.from_epoch(pl.col("first_issue_ts"), time_unit="ns")
+        .dt.replace_time_zone("UTC")
+        .alias("first_issue"),
+    ).sort("bar_type")
+
+
+def print_quality_report(frame: pl.DataFrame) -> None:
+    """
+    Print the bar types with issues from a `scan_catalog` report.
+    """
+    if frame.is_empty():
+        print("No bars found")
+        return
+    issues = frame.filter(pl.col("issues") > 0)
+    print(
+        f"{frame.height} bar types, {frame['rows'].sum()} bars scanned, "
+        f"{issues.height} with issues"
+    )
+    if issues.is_empty():
+        return
+    columns = ["bar_type", *QUALITY_CHECKS, "missing_bars", "max_gap", "first_issue"]
+    with pl.Config(tbl_rows=-1, tbl_cols=-1, tbl_width_chars=250, fmt_str_lengths=60):
+        print(issues.select(columns))
@@ -0,0 +1,139 @@
+# -------------------------------------------------------------------------------------------------
+#  Columnar backtest reports
+#  以Parquet格式按回測/交易對分區保存報告, 並維護可跨回測延遲查詢的匯總表
+# -------------------------------------------------------------------------------------------------
+
+import json
+from pathlib import Path
+
+import pandas as pd
+import polars as pl
+from nautilus_trader.backtest.results import BacktestResult
+
+from src.backtest_matrix import MatrixEntry
+from src.backtest_runner import summarize_reports
+
+
+REPORT_KINDS = ("order_fills", "positions", "account")
+
+
+def _report_frame(report: pd.DataFrame) -> pl.DataFrame:
+    # Reports mix Python objects into object columns, store those as strings
+    report = report.reset_index()
+    objects = report.select_dtypes(include="object").columns
+    report[objects] = report[objects].astype(str)
+    return pl.from_pandas(report)
+
+
+def _partition_path(reports_dir: Path, table: str, entry: MatrixEntry) -> Path:
+    return (
+        reports_dir
+        / table
+        / f"run={entry.run}"
+        / f"instrument_id={entry.instrument_id}"
+        / f"{entry.label}.parquet"
+    )
+
+
+def write_run_reports(
+    reports_dir: str | Path,
+    entry: MatrixEntry,
+    result: BacktestResult,
+    reports: dict,
+) -> pl.DataFrame:
+    """
+    Write the reports and summary row of one run as Parquet.
+
+    Reports are written to `<reports_dir>/<kind>/run=<run>/instrument_id=<id>/`
+    and the summary row to `<reports_dir>/summary/...` with the same
+    partitioning, one file per run, so that `scan_summary` can query any
+    number of runs lazily.
+
+    Parameters
+    ----------
+    reports_dir : str | Path
+        The root reports directory.
+    entry : MatrixEntry
+        The matrix entry the run was built from.
+    result : BacktestResult
+        The run result.
+    reports : dict
+        The reports as returned by `generate_reports`.
+
+    Returns
+    -------
+    pl.DataFrame
+        The summary row.
+    """
+    reports_dir = Path(reports_dir)
+    for kind in REPORT_KINDS:
+        report = reports[kind]
+        if report.empty:
+            continue
+        path = _partition_path(reports_dir, kind, entry)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _report_frame(report).with_columns(label=pl.lit(entry.label)).write_parquet(
+            path
+        )
+
+    summary = pl.DataFrame(
+        {
+            "label": entry.label,
+            "strategy": entry.strategy,
+            "param_set": entry.param_set,
+            "start": entry.start,
+            "end": entry.end,
+            "params": json.dumps(entry.params, sort_keys=True),
+            **summarize_reports(reports),
+            "total_orders": result.total_orders,
+            "elapsed_time": result.elapsed_time,
+        },
+        schema={
+            "label": pl.Utf8,
+            "strategy": pl.Utf8,
+            "param_set": pl.Utf8,
+            "start": pl.Utf8,
+            "end": pl.Utf8,
+            "params": pl.Utf8,
+            "positions": pl.Int64,
+            "pnl": pl.Float64,
+            "win_rate": pl.Float64,
+            "max_drawdown": pl.Float64,
+            "total_orders": pl.Int64,
+            "elapsed_time": pl.Float64,
+        },
+    )
+    path = _partition_path(reports_dir, "summary", entry)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    summary.write_parquet(path)
+    return summary
+
+
+def scan_summary(reports_dir: str | Path = "./reports") -> pl.LazyFrame:
+    """
+    Return a lazy frame over the summary rows of every run.
+
+    The `run` and `instrument_id` partition columns are included, and
+    filters on them only open the matching files.
+    """
+    return pl.scan_parquet(
+        Path(reports_dir) / "summary" / "**" / "*.parquet", hive_partitioning=True
+    )
+
+
+def scan_report(kind: str, reports_dir: str | Path = "./reports") -> pl.LazyFrame:
+    """
+    Return a lazy frame over one report kind across every run.
+
+    Parameters
+    ----------
+    kind : str
+        One of "order_fills", "positions" or "account".
+    reports_dir : str | Path
+        The root reports directory.
+    """
+    if kind not in REPORT_KINDS:
+        raise ValueError(f"Unknown report kind {kind!r}, expected one of {REPORT_KINDS}")
+    return pl.scan_parquet(
+        Path(reports_dir) / kind / "**" / "*.parquet", hive_partitioning=True
+    )
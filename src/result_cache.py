@@ -0,0 +1,143 @@
+# -------------------------------------------------------------------------------------------------
+#  Content-addressed backtest result cache
+#  以策略源碼、配置及catalog文件指紋為鍵緩存回測結果, 未變更的回測直接返回已保存的報告
+# -------------------------------------------------------------------------------------------------
+
+import hashlib
+import importlib
+import os
+import pickle
+import tempfile
+from importlib.metadata import version
+from pathlib import Path
+
+from nautilus_trader.backtest.node import BacktestRunConfig
+
+from src.catalog_bars import bar_files
+
+
+# Every strategy imports helpers from src/, so the whole package is hashed
+SOURCE_ROOT = Path(__file__).parent
+
+
+def source_digest(root: Path = SOURCE_ROOT) -> str:
+    """
+    Return a digest of every Python source file under `root`.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(root.rglob("*.py")):
+        digest.update(str(path.relative_to(root)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def catalog_files(run_config: BacktestRunConfig) -> list[Path]:
+    """
+    Return the catalog files a run reads: its bar files and instrument files.
+    """
+    files = []
+    for data_config in run_config.data:
+        catalog_path = Path(data_config.catalog_path)
+        for bar_type in data_config.bar_types or []:
+            files.extend(bar_files(catalog_path, str(bar_type)))
+        if data_config.instrument_id is not None:
+            files.extend(
+                (catalog_path / "data").glob(f"*/{data_config.instrument_id}/**/*.parquet")
+            )
+    return sorted(set(files))
+
+
+def _resolve_strategy_config(importable) -> bytes:
+    # Parse through the config class so defaults are part of the key
+    module_name, class_name = importable.config_path.split(":")
+    config_cls = getattr(importlib.import_module(module_name), class_name)
+    return config_cls(**importable.config).json()
+
+
+def run_key(run_config: BacktestRunConfig, sources: str | None = None) -> str:
+    """
+    Return the cache key of a run.
+
+    The key covers the strategy source code, the resolved strategy configs
+    (including defaults), the venue and data configs, the catalog files read
+    (by path, size and modification time) and the Nautilus version. Logging
+    settings are deliberately left out since they do not change results.
+
+    Parameters
+    ----------
+    run_config : BacktestRunConfig
+        The run to key.
+    sources : str, optional
+        A precomputed `source_digest()`, to avoid rehashing for every run.
+
+    Returns
+    -------
+    str
+    """
+    digest = hashlib.sha256()
+    digest.update(version("nautilus_trader").encode())
+    digest.update((sources or source_digest()).encode())
+    for importable in run_config.engine.strategies:
+        digest.update(importable.strategy_path.encode())
+        digest.update(_resolve_strategy_config(importable))
+    for venue in run_config.venues:
+        digest.update(venue.json())
+    for data_config in run_config.data:
+        digest.update(data_config.json())
+    for path in catalog_files(run_config):
+        stat = path.stat()
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    A directory of backtest results addressed by `run_key`.
+
+    Each entry is a pickle of the `BacktestResult` and its reports, written
+    atomically so concurrent runs never observe a partial entry.
+
+    Parameters
+    ----------
+    directory : str | Path
+        The cache directory, created if missing.
+    """
+
+    def __init__(self, directory: str | Path = ".backtest_cache"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._sources = source_digest()
+
+    def key(self, run_config: BacktestRunConfig) -> str:
+        """
+        Return the cache key of `run_config`.
+        """
+        return run_key(run_config, self._sources)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pkl"
+
+    def get(self, key: str) -> tuple | None:
+        """
+        Return the cached (result, reports) for `key`, or None on a miss.
+        """
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def put(self, key: str, result, reports: dict) -> None:
+        """
+        Store the result and reports of a run under `key`.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((result, reports), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
@@ -0,0 +1,136 @@
+# -------------------------------------------------------------------------------------------------
+#  Rolling window statistics
+#  固定容量的環形緩衝區, 以O(1)更新滾動平均值和標準差
+# -------------------------------------------------------------------------------------------------
+
+import numpy as np
+
+
+class RollingWindow:
+    """
+    Fixed-capacity ring buffer with constant time mean and standard deviation.
+
+    The window keeps its values in a preallocated NumPy array and maintains a
+    running mean and sum of squared deviations (Welford's method, extended for
+    removals) as values enter and leave the window. The aggregates are rebuilt
+    from the buffer once per full revolution to keep floating point drift
+    bounded, which keeps the amortized cost per update constant.
+
+    Parameters
+    ----------
+    capacity : int
+        The maximum number of values held in the window.
+
+    Raises
+    ------
+    ValueError
+        If `capacity` is not positive.
+    """
+
+    __slots__ = ("capacity", "_values", "_index", "_count", "_mean", "_m2", "_updates")
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, was {capacity}")
+
+        self.capacity = capacity
+        self._values = np.zeros(capacity, dtype=np.float64)
+        self._index = 0  # Next write position
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0  # Sum of squared deviations from the mean
+        self._updates = 0  # Updates since the last exact recomputation
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def is_full(self) -> bool:
+        """
+        Return whether the window holds `capacity` values.
+        """
+        return self._count == self.capacity
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return the number of bytes held by the window buffer.
+        """
+        return self._values.nbytes
+
+    def append(self, value: float) -> None:
+        """
+        Add a value to the window, evicting the oldest value when full.
+
+        Parameters
+        ----------
+        value : float
+            The value to add.
+        """
+        if self._count < self.capacity:
+            self._count += 1
+            delta = value - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (value - self._mean)
+        else:
+            old = self._values[self._index]
+            old_mean = self._mean
+            self._mean += (value - old) / self._count
+            self._m2 += (value - old) * (value - self._mean + old - old_mean)
+
+        self._values[self._index] = value
+        self._index += 1
+        if self._index == self.capacity:
+            self._index = 0
+
+        self._updates += 1
+        if self._updates >= self.capacity:
+            self._recompute()
+
+    def _recompute(self) -> None:
+        values = self._values[: self._count]
+        self._mean = float(values.mean())
+        self._m2 = float(((values - self._mean) ** 2).sum())
+        self._updates = 0
+
+    def mean(self) -> float:
+        """
+        Return the mean of the values in the window (0.0 when empty).
+        """
+        return self._mean
+
+    def sum(self) -> float:
+        """
+        Return the sum of the values in the window.
+        """
+        return self._mean * self._count
+
+    def std(self) -> float:
+        """
+        Return the population standard deviation of the window.
+
+        Matches ``np.std(values)`` (``ddof=0``).
+        """
+        if self._count == 0:
+            return 0.0
+        # Rounding can leave a tiny negative residue for constant windows
+        return float(np.sqrt(max(self._m2, 0.0) / self._count))
+
+    def values(self) -> np.ndarray:
+        """
+        Return a copy of the window values, oldest first.
+        """
+        if self._count < self.capacity:
+            return self._values[: self._count].copy()
+        return np.roll(self._values, -self._index)
+
+    def clear(self) -> None:
+        """
+        Remove all values from the window.
+        """
+        self._values.fill(0.0)
+        self._index = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._updates = 0
@@ -3,7 +3,6 @@
 #  使用VWAP在1小時和5分鐘時間框架上進行交易
 # -------------------------------------------------------------------------------------------------
 
-from collections import deque
 from decimal import Decimal
 from typing import Optional
 
@@ -18,6 +17,9 @@ from nautilus_trader.model.events import PositionClosed, PositionOpened
 from nautilus_trader.model.identifiers import InstrumentId, Venue
 from nautilus_trader.trading.strategy import Strategy
 
+from src.bar_history import BarHistory
+from src.rolling import RollingWindow
+
 
 class VWAPStrategyConfig(StrategyConfig, frozen=True):
     """
@@ -33,6 +35,9 @@ class VWAPStrategyConfig(StrategyConfig, frozen=True):
     time_exit_hours: int = (
         24  # Exit trade after 24 hours if not stopped out/taken profit
     )
+    max_history_5min: int = 2016  # Bars of 5min history retained (one week)
+    max_history_1h: int = 168  # Bars of 1h history retained (one week)
+    use_stored_bars: bool = False  # Subscribe to 5min/1h bars stored in the catalog
 
 
 class VWAPMultiTimeframeStrategy(Strategy):
@@ -57,11 +62,14 @@ class VWAPMultiTimeframeStrategy(Strategy):
         self.bar_type_1min = BarType.from_str(
             f"{config.instrument_id}-1-MINUTE-LAST-EXTERNAL"
         )
+        # Stored bars are materialized from 1-minute bars ahead of time and
+        # published as external bars, otherwise they are aggregated live
+        source = "EXTERNAL" if config.use_stored_bars else "INTERNAL"
         self.bar_type_5min = BarType.from_str(
-            f"{config.instrument_id}-5-MINUTE-LAST-INTERNAL"
+            f"{config.instrument_id}-5-MINUTE-LAST-{source}"
         )
         self.bar_type_1h = BarType.from_str(
-            f"{config.instrument_id}-1-HOUR-LAST-INTERNAL"
+            f"{config.instrument_id}-1-HOUR-LAST-{source}"
         )
 
         # VWAP indicators
@@ -69,9 +77,11 @@ class VWAPMultiTimeframeStrategy(Strategy):
         self.vwap_1h = VolumeWeightedAveragePrice()
 
         # Data storage for calculations
-        self.bars_5min = []
-        self.bars_1h = []
-        self.volumes_5min = deque(maxlen=20)  # For volume average calculation
+        self.bars_5min = BarHistory(config.max_history_5min)
+        self.bars_1h = BarHistory(config.max_history_1h)
+        self.volumes_5min = RollingWindow(20)  # For volume average calculation
+        # Typical prices (HLC/3) for the VWAP band standard deviation
+        self.typical_prices_5min = RollingWindow(config.vwap_period_5min)
 
         # Track last VWAP values for crossover detection
         self.last_5min_price = 0.0
@@ -100,30 +110,36 @@ class VWAPMultiTimeframeStrategy(Strategy):
         self.instrument = self.cache.instrument(
             InstrumentId.from_str(self.config.instrument_id)
         )
-        # Subscribe to 5-minute bars
-        self.subscribe_bars(self.bar_type_1min)
-
-        # Subscribe to 1-hour bars (using bar aggregation if needed)
-        try:
-            # If 1-hour bars need to be created through aggregation from 15-min bars
-            bar_type_5min = f"{self.bar_type_5min}@1-MINUTE-EXTERNAL"
-            self.subscribe_bars(BarType.from_str(bar_type_5min))
-            self.log.info(
-                "5-minute bars are not available directly, aggregating from 1-minute bars."
-            )
-            bar_type_1h = f"{self.bar_type_1h}@1-MINUTE-EXTERNAL"
-            self.subscribe_bars(BarType.from_str(bar_type_1h))
-            self.log.info(
-                "1-hour bars are not available directly, aggregating from 1-minute bars."
-            )
-        except Exception:
-            # If 1-hour bars are available directly
+        if self.config.use_stored_bars:
+            # Stored bars come straight from the catalog, no 1-minute stream needed
             self.subscribe_bars(self.bar_type_5min)
-            self.log.info(
-                "5-minute bars are available directly, no aggregation needed."
-            )
             self.subscribe_bars(self.bar_type_1h)
-            self.log.info("1-hour bars are available directly, no aggregation needed.")
+            self.log.info("Using 5-minute and 1-hour bars stored in the catalog.")
+        else:
+            # Subscribe to 1-minute bars
+            self.subscribe_bars(self.bar_type_1min)
+
+            # Subscribe to 1-hour bars (using bar aggregation if needed)
+            try:
+                # If 1-hour bars need to be created through aggregation from 15-min bars
+                bar_type_5min = f"{self.bar_type_5min}@1-MINUTE-EXTERNAL"
+                self.subscribe_bars(BarType.from_str(bar_type_5min))
+                self.log.info(
+                    "5-minute bars are not available directly, aggregating from 1-minute bars."
+                )
+                bar_type_1h = f"{self.bar_type_1h}@1-MINUTE-EXTERNAL"
+                self.subscribe_bars(BarType.from_str(bar_type_1h))
+                self.log.info(
+                    "1-hour bars are not available directly, aggregating from 1-minute bars."
+                )
+            except Exception:
+                # If 1-hour bars are available directly
+                self.subscribe_bars(self.bar_type_5min)
+                self.log.info(
+                    "5-minute bars are available directly, no aggregation needed."
+                )
+                self.subscribe_bars(self.bar_type_1h)
+                self.log.info("1-hour bars are available directly, no aggregation needed.")
         self.log.info(f"Subscribed to 5-minute bars: {self.bar_type_5min}")
         self.log.info(f"Subscribed to 1-hour bars: {self.bar_type_1h}")
 
@@ -156,6 +172,10 @@ class VWAPMultiTimeframeStrategy(Strategy):
 
         # Current price and VWAP values
         current_price = float(bar.close.as_double())
+        self.typical_prices_5min.append(
+            (float(bar.high.as_double()) + float(bar.low.as_double()) + current_price)
+            / 3.0
+        )
         self.last_5min_price = current_price
 
         # Wait until both indicators are initialized
@@ -170,21 +190,8 @@ class VWAPMultiTimeframeStrategy(Strategy):
         current_1h_vwap = self.vwap_1h.value
 
         # Calculate VWAP standard deviation bands for 15-min timeframe
-        if len(self.bars_5min) >= self.config.vwap_period_5min:
-            # Calculate standard deviation
-            recent_bars = self.bars_5min[-self.config.vwap_period_5min :]
-            prices = [
-                np.divide(
-                    (
-                        float(b.high.as_double())
-                        + float(b.low.as_double())
-                        + float(b.close.as_double())
-                    ),
-                    3.0,
-                )
-                for b in recent_bars
-            ]
-            std_dev = np.std(prices)
+        if self.typical_prices_5min.is_full:
+            std_dev = self.typical_prices_5min.std()
 
             # Set bands
             self.upper_band_5min = current_5min_vwap + (
@@ -205,11 +212,7 @@ class VWAPMultiTimeframeStrategy(Strategy):
         # Detect 15-min VWAP crossover (if we have previous values)
         if np.not_equal(self.last_5min_vwap, 0.0):
             # Calculate average volume
-            avg_volume = (
-                np.divide(sum(self.volumes_5min), len(self.volumes_5min))
-                if self.volumes_5min
-                else 0.0
-            )
+            avg_volume = self.volumes_5min.mean()
             current_volume = float(bar.volume.as_double())
             volume_ratio = (
                 np.divide(current_volume, avg_volume)
@@ -537,3 +540,20 @@ class VWAPMultiTimeframeStrategy(Strategy):
             (self.trades_won / self.trades_total) * 100 if self.trades_total > 0 else 0
         )
         self.log.info(f"Win rate: {win_rate:.2f}%")
+
+        # Log resident state size so memory growth is visible in long runs
+        self.log.info(
+            f"Resident state: {len(self.bars_5min)} 5min bars, "
+            f"{len(self.bars_1h)} 1h bars, {self._state_nbytes() / 1024:.1f} KiB"
+        )
+
+    def _state_nbytes(self) -> int:
+        """
+        Return the number of bytes held by the bar history and rolling windows.
+        """
+        return (
+            self.bars_5min.nbytes
+            + self.bars_1h.nbytes
+            + self.volumes_5min.nbytes
+            + self.typical_prices_5min.nbytes
+        )
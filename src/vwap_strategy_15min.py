@@ -3,7 +3,6 @@
 #  使用VWAP在4小時和15分鐘時間框架上進行交易
 # -------------------------------------------------------------------------------------------------
 
-from collections import deque
 from decimal import Decimal
 from typing import Optional
 
@@ -18,6 +17,9 @@ from nautilus_trader.model.events import PositionClosed, PositionOpened
 from nautilus_trader.model.identifiers import InstrumentId, Venue
 from nautilus_trader.trading.strategy import Strategy
 
+from src.bar_history import BarHistory
+from src.rolling import RollingWindow
+
 
 class VWAPStrategy15MConfig(StrategyConfig, frozen=True):
     """
@@ -34,6 +36,9 @@ class VWAPStrategy15MConfig(StrategyConfig, frozen=True):
     time_exit_hours: int = (
         24 * 7  # Exit trade after 24 hours * 7 if not stopped out/taken profit
     )
+    max_history_15min: int = 672  # Bars of 15min history retained (one week)
+    max_history_4h: int = 180  # Bars of 4h history retained (30 days)
+    use_stored_bars: bool = False  # Subscribe to 15min/4h bars stored in the catalog
 
 
 class VWAPMultiTimeframeStrategy15M(Strategy):
@@ -56,11 +61,14 @@ class VWAPMultiTimeframeStrategy15M(Strategy):
 
         # Configuration
         self.bar_type_1min = BarType.from_str(config.bar_type_1min)
+        # Stored bars are materialized from 1-minute bars ahead of time and
+        # published as external bars, otherwise they are aggregated live
+        source = "EXTERNAL" if config.use_stored_bars else "INTERNAL"
         self.bar_type_15min = BarType.from_str(
-            f"{config.instrument_id}-15-MINUTE-LAST-INTERNAL"
+            f"{config.instrument_id}-15-MINUTE-LAST-{source}"
         )
         self.bar_type_4h = BarType.from_str(
-            f"{config.instrument_id}-4-HOUR-LAST-INTERNAL"
+            f"{config.instrument_id}-4-HOUR-LAST-{source}"
         )
 
         # VWAP indicators
@@ -68,9 +76,11 @@ class VWAPMultiTimeframeStrategy15M(Strategy):
         self.vwap_4h = VolumeWeightedAveragePrice()
 
         # Data storage for calculations
-        self.bars_15min = []
-        self.bars_4h = []
-        self.volumes_15min = deque(maxlen=20)  # For volume average calculation
+        self.bars_15min = BarHistory(config.max_history_15min)
+        self.bars_4h = BarHistory(config.max_history_4h)
+        self.volumes_15min = RollingWindow(20)  # For volume average calculation
+        # Typical prices (HLC/3) for the VWAP band standard deviation
+        self.typical_prices_15min = RollingWindow(config.vwap_period_15min)
 
         # Track last VWAP values for crossover detection
         self.last_15min_price = 0.0
@@ -99,30 +109,36 @@ class VWAPMultiTimeframeStrategy15M(Strategy):
         self.instrument = self.cache.instrument(
             InstrumentId.from_str(self.config.instrument_id)
         )
-        # Subscribe to 15-minute bars
-        self.subscribe_bars(self.bar_type_1min)
-
-        # Subscribe to 4-hour bars (using bar aggregation if needed)
-        try:
-            # If 4-hour bars need to be created through aggregation from 15-min bars
-            bar_type_15min = f"{self.bar_type_15min}@1-MINUTE-EXTERNAL"
-            self.subscribe_bars(BarType.from_str(bar_type_15min))
-            self.log.info(
-                "15-minute bars are not available directly, aggregating from 1-minute bars."
-            )
-            bar_type_4h = f"{self.bar_type_4h}@1-MINUTE-EXTERNAL"
-            self.subscribe_bars(BarType.from_str(bar_type_4h))
-            self.log.info(
-                "4-hour bars are not available directly, aggregating from 1-minute bars."
-            )
-        except Exception:
-            # If 4-hour bars are available directly
+        if self.config.use_stored_bars:
+            # Stored bars come straight from the catalog, no 1-minute stream needed
             self.subscribe_bars(self.bar_type_15min)
-            self.log.info(
-                "15-minute bars are available directly, no aggregation needed."
-            )
             self.subscribe_bars(self.bar_type_4h)
-            self.log.info("4-hour bars are available directly, no aggregation needed.")
+            self.log.info("Using 15-minute and 4-hour bars stored in the catalog.")
+        else:
+            # Subscribe to 1-minute bars
+            self.subscribe_bars(self.bar_type_1min)
+
+            # Subscribe to 4-hour bars (using bar aggregation if needed)
+            try:
+                # If 4-hour bars need to be created through aggregation from 15-min bars
+                bar_type_15min = f"{self.bar_type_15min}@1-MINUTE-EXTERNAL"
+                self.subscribe_bars(BarType.from_str(bar_type_15min))
+                self.log.info(
+                    "15-minute bars are not available directly, aggregating from 1-minute bars."
+                )
+                bar_type_4h = f"{self.bar_type_4h}@1-MINUTE-EXTERNAL"
+                self.subscribe_bars(BarType.from_str(bar_type_4h))
+                self.log.info(
+                    "4-hour bars are not available directly, aggregating from 1-minute bars."
+                )
+            except Exception:
+                # If 4-hour bars are available directly
+                self.subscribe_bars(self.bar_type_15min)
+                self.log.info(
+                    "15-minute bars are available directly, no aggregation needed."
+                )
+                self.subscribe_bars(self.bar_type_4h)
+                self.log.info("4-hour bars are available directly, no aggregation needed.")
         self.log.info(f"Subscribed to 15-minute bars: {self.bar_type_15min}")
         self.log.info(f"Subscribed to 4-hour bars: {self.bar_type_4h}")
 
@@ -155,6 +171,10 @@ class VWAPMultiTimeframeStrategy15M(Strategy):
 
         # Current price and VWAP values
         current_price = float(bar.close.as_double())
+        self.typical_prices_15min.append(
+            (float(bar.high.as_double()) + float(bar.low.as_double()) + current_price)
+            / 3.0
+        )
         self.last_15min_price = current_price
 
         # Wait until both indicators are initialized
@@ -169,21 +189,8 @@ class VWAPMultiTimeframeStrategy15M(Strategy):
         current_4h_vwap = self.vwap_4h.value
 
         # Calculate VWAP standard deviation bands for 15-min timeframe
-        if len(self.bars_15min) >= self.config.vwap_period_15min:
-            # Calculate standard deviation
-            recent_bars = self.bars_15min[-self.config.vwap_period_15min :]
-            prices = [
-                np.divide(
-                    (
-                        float(b.high.as_double())
-                        + float(b.low.as_double())
-                        + float(b.close.as_double())
-                    ),
-                    3.0,
-                )
-                for b in recent_bars
-            ]
-            std_dev = np.std(prices)
+        if self.typical_prices_15min.is_full:
+            std_dev = self.typical_prices_15min.std()
 
             # Set bands
             self.upper_band_15min = current_15min_vwap + (
@@ -204,11 +211,7 @@ class VWAPMultiTimeframeStrategy15M(Strategy):
         # Detect 15-min VWAP crossover (if we have previous values)
         if np.not_equal(self.last_15min_vwap, 0.0):
             # Calculate average volume
-            avg_volume = (
-                np.divide(sum(self.volumes_15min), len(self.volumes_15min))
-                if self.volumes_15min
-                else 0.0
-            )
+            avg_volume = self.volumes_15min.mean()
             current_volume = float(bar.volume.as_double())
             volume_ratio = (
                 np.divide(current_volume, avg_volume)
@@ -536,3 +539,20 @@ class VWAPMultiTimeframeStrategy15M(Strategy):
             (self.trades_won / self.trades_total) * 100 if self.trades_total > 0 else 0
         )
         self.log.info(f"Win rate: {win_rate:.2f}%")
+
+        # Log resident state size so memory growth is visible in long runs
+        self.log.info(
+            f"Resident state: {len(self.bars_15min)} 15min bars, "
+            f"{len(self.bars_4h)} 4h bars, {self._state_nbytes() / 1024:.1f} KiB"
+        )
+
+    def _state_nbytes(self) -> int:
+        """
+        Return the number of bytes held by the bar history and rolling windows.
+        """
+        return (
+            self.bars_15min.nbytes
+            + self.bars_4h.nbytes
+            + self.volumes_15min.nbytes
+            + self.typical_prices_15min.nbytes
+        )
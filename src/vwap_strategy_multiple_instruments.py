@@ -3,7 +3,6 @@
 #  使用VWAP在4小時和15分鐘時間框架上進行交易
 # -------------------------------------------------------------------------------------------------
 
-from collections import deque
 from decimal import Decimal
 from typing import Optional
 
@@ -18,6 +17,9 @@ from nautilus_trader.model.events import PositionClosed, PositionOpened
 from nautilus_trader.model.identifiers import InstrumentId, Venue
 from nautilus_trader.trading.strategy import Strategy
 
+from src.bar_history import BarHistory
+from src.rolling import RollingWindow
+
 
 class VWAPStrategyConfig(StrategyConfig, frozen=True):
     """
@@ -33,6 +35,107 @@ class VWAPStrategyConfig(StrategyConfig, frozen=True):
     time_exit_hours: int = (
         24 * 7  # Exit trade after 24 hours * 7 if not stopped out/taken profit
     )
+    max_history_15min: int = 672  # Bars of 15min history retained per instrument (one week)
+    max_history_4h: int = 180  # Bars of 4h history retained per instrument (30 days)
+    use_stored_bars: bool = False  # Subscribe to 15min/4h bars stored in the catalog
+
+
+class InstrumentState:
+    """
+    The per-instrument state of the strategy.
+
+    One object holds the bar types, indicators, rolling windows, bands and
+    position tracking of a single instrument, so the strategy keeps one
+    compact object per instrument instead of parallel dicts.
+
+    Parameters
+    ----------
+    instrument_id : InstrumentId
+        The instrument.
+    config : VWAPStrategyConfig
+        The strategy config.
+    """
+
+    __slots__ = (
+        "instrument_id",
+        "instrument",
+        "bar_type_1min",
+        "bar_type_15min",
+        "bar_type_4h",
+        "vwap_15min",
+        "vwap_4h",
+        "bars_15min",
+        "bars_4h",
+        "volumes_15min",
+        "typical_prices_15min",
+        "last_15min_price",
+        "last_15min_vwap",
+        "upper_band_15min",
+        "lower_band_15min",
+        "in_position",
+        "position_side",
+        "entry_time",
+        "current_position_id",
+    )
+
+    def __init__(self, instrument_id: InstrumentId, config: VWAPStrategyConfig):
+        self.instrument_id = instrument_id
+        self.instrument = None  # Loaded from the cache on start
+
+        # Stored bars are materialized from 1-minute bars ahead of time and
+        # published as external bars, otherwise they are aggregated live
+        source = "EXTERNAL" if config.use_stored_bars else "INTERNAL"
+        self.bar_type_1min = BarType.from_str(f"{instrument_id}-1-MINUTE-LAST-EXTERNAL")
+        self.bar_type_15min = BarType.from_str(
+            f"{instrument_id}-15-MINUTE-LAST-{source}"
+        )
+        self.bar_type_4h = BarType.from_str(f"{instrument_id}-4-HOUR-LAST-{source}")
+
+        # VWAP indicators
+        self.vwap_15min = VolumeWeightedAveragePrice()
+        self.vwap_4h = VolumeWeightedAveragePrice()
+
+        # Data storage for calculations
+        self.bars_15min = BarHistory(config.max_history_15min)
+        self.bars_4h = BarHistory(config.max_history_4h)
+        self.volumes_15min = RollingWindow(20)  # For volume average calculation
+        # Typical prices (HLC/3) for the VWAP band standard deviation
+        self.typical_prices_15min = RollingWindow(config.vwap_period_15min)
+
+        # Track last VWAP values for crossover detection
+        self.last_15min_price = 0.0
+        self.last_15min_vwap = 0.0
+
+        # Standard deviation bands for the 15-min timeframe
+        self.upper_band_15min = 0.0
+        self.lower_band_15min = 0.0
+
+        # Tracking flags
+        self.in_position = False
+        self.position_side = None
+        self.entry_time = None
+        self.current_position_id = None
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return the number of bytes held by the bar histories and rolling windows.
+        """
+        return (
+            self.bars_15min.nbytes
+            + self.bars_4h.nbytes
+            + self.volumes_15min.nbytes
+            + self.typical_prices_15min.nbytes
+        )
+
+    def reset_position(self) -> None:
+        """
+        Clear the position tracking.
+        """
+        self.in_position = False
+        self.position_side = None
+        self.entry_time = None
+        self.current_position_id = None
 
 
 class VWAPMultiTimeframeStrategy(Strategy):
@@ -45,6 +148,10 @@ class VWAPMultiTimeframeStrategy(Strategy):
     3. Uses VWAP standard deviation bands for profit targets and stop losses
     4. Implements volume filters for signal confirmation
     5. Includes risk management with fixed percentage risk per trade
+
+    Each instrument trades independently with its own `InstrumentState`.
+    Bars are dispatched through a dict from bar type to (handler, state), so
+    the per-bar cost does not grow with the number of instruments.
     """
 
     def __init__(self, config: VWAPStrategyConfig):
@@ -53,73 +160,20 @@ class VWAPMultiTimeframeStrategy(Strategy):
         """
         super().__init__(config=config)
 
-        # 解析交易對字符串為InstrumentId, BarType
-        self.instruments = []
-        self.instrument_ids = []
-        self.bar_types_1mins = []
-        self.bar_types_15mins = []
-        self.bar_types_4hs = []
-        # Data storage for calculations
-        self.bar_1mins = {}
-        self.bars_15min = {}
-        self.bars_4h = {}
-        self.volumes_1min = {}
-        self.volumes_15min = {}
-        self.volumes_4h = {}
-        # VWAP indicators
-        self.vwap_1min = {}
-        self.vwap_15min = {}
-        self.vwap_4h = {}
-        # Track last VWAP values for crossover detection
-        self.last_15min_price = {}
-        self.last_15min_vwap = {}
-
-        # Standard deviation bands for the 15-min timeframe
-        self.upper_band_15min = {}
-        self.lower_band_15min = {}
-
+        # 解析交易對字符串為InstrumentId, 每個交易對一個狀態對象
+        self.states: dict[InstrumentId, InstrumentState] = {}
         for instrument_id_str in self.config.instrument_ids:
             try:
-                self.instrument_ids.append(InstrumentId.from_str(instrument_id_str))
-                bar_type_1m = BarType.from_str(
-                    f"{instrument_id_str}-1-MINUTE-LAST-EXTERNAL"
-                )
-                self.bar_types_1mins.append(bar_type_1m)
-
-                self.bar_1mins[bar_type_1m] = deque(maxlen=100)
-                self.volumes_1min[bar_type_1m] = deque(maxlen=20)
-                self.vwap_1min[bar_type_1m] = {VolumeWeightedAveragePrice()}
-                bar_type_15m = BarType.from_str(
-                    f"{instrument_id_str}-15-MINUTE-LAST-INTERNAL"
-                )
-                self.bar_type_15mins.append(bar_type_15m)
-
-                self.bars_15min[bar_type_15m] = deque(maxlen=100)
-                self.volumes_15min[bar_type_15m] = deque(maxlen=20)
-                self.vwap_15min[bar_type_15m] = {VolumeWeightedAveragePrice()}
-                # Track last VWAP values for crossover detection
-                self.last_15min_price[bar_type_15m] = 0.0
-                self.last_15min_vwap[bar_type_15m] = 0.0
-
-                # Standard deviation bands for the 15-min timeframe
-                self.upper_band_15min[bar_type_15m] = 0.0
-                self.lower_band_15min[bar_type_15m] = 0.0
-                bar_type_4h = BarType.from_str(
-                    f"{instrument_id_str}-4-HOUR-LAST-INTERNAL"
-                )
-                self.bar_type_4hs.append(bar_type_4h)
-
-                self.bars_4h[bar_type_4h] = deque(maxlen=100)
-                self.volumes_4h[bar_type_4h] = deque(maxlen=20)
-                self.vwap_4h[bar_type_4h] = {VolumeWeightedAveragePrice()}
+                instrument_id = InstrumentId.from_str(instrument_id_str)
+                self.states[instrument_id] = InstrumentState(instrument_id, config)
             except Exception as e:
                 self.log.error(f"解析交易對 {instrument_id_str} 時出錯: {e}")
 
-        # Tracking flags
-        self.in_position = False
-        self.position_side = None
-        self.entry_time = None
-        self.current_position_id = None
+        # Bar type -> (handler, state) for O(1) dispatch in on_bar
+        self._dispatch = {}
+        for state in self.states.values():
+            self._dispatch[state.bar_type_15min] = (self._process_15min_bar, state)
+            self._dispatch[state.bar_type_4h] = (self._process_4h_bar, state)
 
         # Statistics
         self.trades_total = 0
@@ -131,46 +185,38 @@ class VWAPMultiTimeframeStrategy(Strategy):
         Actions to perform when the strategy starts.
         """
         self.log.info("VWAP Multi-Timeframe Strategy starting...")
-        for instrument_id in self.instrument_ids:
-            instrument = self.cache.instrument(InstrumentId.from_str(instrument_id))
-            self.instruments.append(instrument)
-        # Subscribe to 15-minute bars
-        for bar_type in self.bar_types_1mins:
-            self.subscribe_bars(self.bar_type_1min)
-
-        # Subscribe to 4-hour bars (using bar aggregation if needed)
-        try:
-            # If 4-hour bars need to be created through aggregation from 15-min bars
-            for bar_type in self.bar_types_15mins:
-                self.subscribe_bars(f"{bar_type}@1-MINUTE-EXTERNAL")
-            self.log.info(
-                "15-minute bars are not available directly, aggregating from 1-minute bars."
-            )
-            for bar_type in self.bar_types_4hs:
-                self.subscribe_bars(f"{bar_type}@1-MINUTE-EXTERNAL")
-            self.log.info(
-                "4-hour bars are not available directly, aggregating from 1-minute bars."
-            )
-        except Exception:
-            # If 4-hour bars are available directly
-            for bar_type in self.bar_types_15mins:
-                self.subscribe_bars(bar_type)
-            self.log.info(
-                "15-minute bars are available directly, no aggregation needed."
-            )
-            for bar_type in self.bar_types_4hs:
-                self.subscribe_bars(bar_type)
-            self.log.info("4-hour bars are available directly, no aggregation needed.")
-        self.log.info("Subscribed to 15-minute bars")
-        self.log.info("Subscribed to 4-hour bars")
-
-        # Register the VWAP indicators to receive bar data
-        for bar_type in self.bar_types_1mins:
-            self.register_indicator_for_bars(bar_type, self.vwap_1min)
-        for bar_type in self.bar_types_15mins:
-            self.register_indicator_for_bars(bar_type, self.vwap_15min)
-        for bar_type in self.bar_types_4hs:
-            self.register_indicator_for_bars(bar_type, self.vwap_4h)
+        for state in list(self.states.values()):
+            state.instrument = self.cache.instrument(state.instrument_id)
+            if state.instrument is None:
+                self.log.error(f"Could not find instrument {state.instrument_id}")
+                del self.states[state.instrument_id]
+                del self._dispatch[state.bar_type_15min]
+                del self._dispatch[state.bar_type_4h]
+                continue
+
+            if self.config.use_stored_bars:
+                # Stored bars come straight from the catalog, no 1-minute stream needed
+                self.subscribe_bars(state.bar_type_15min)
+                self.subscribe_bars(state.bar_type_4h)
+            else:
+                # Aggregate 15-minute and 4-hour bars from 1-minute bars
+                self.subscribe_bars(state.bar_type_1min)
+                self.subscribe_bars(
+                    BarType.from_str(f"{state.bar_type_15min}@1-MINUTE-EXTERNAL")
+                )
+                self.subscribe_bars(
+                    BarType.from_str(f"{state.bar_type_4h}@1-MINUTE-EXTERNAL")
+                )
+
+            # Register the VWAP indicators to receive bar data
+            self.register_indicator_for_bars(state.bar_type_15min, state.vwap_15min)
+            self.register_indicator_for_bars(state.bar_type_4h, state.vwap_4h)
+
+        source = "stored" if self.config.use_stored_bars else "aggregated"
+        self.log.info(
+            f"Subscribed to {source} 15-minute and 4-hour bars for "
+            f"{len(self.states)} instruments"
+        )
 
     def on_bar(self, bar: Bar) -> None:
         """
@@ -181,84 +227,63 @@ class VWAPMultiTimeframeStrategy(Strategy):
         bar : Bar
             The update bar.
         """
-        # Process bar based on timeframe
-        if bar.bar_type in self.bar_type_15mins:
-            self._process_15min_bar(bar)
-        elif bar.bar_type in self.bar_type_4hs:
-            self._process_4h_bar(bar)
+        # Process bar based on instrument and timeframe
+        handler = self._dispatch.get(bar.bar_type)
+        if handler is not None:
+            handler[0](handler[1], bar)
 
-    def _process_15min_bar(self, bar: Bar) -> None:
+    def _process_15min_bar(self, state: InstrumentState, bar: Bar) -> None:
         """
         Process a 15-minute bar update.
         """
         # Store the bar and update volume history
-        self.bars_15min[bar.bar_type].append(bar)
-        self.volumes_15min[bar.bar_type].append(float(bar.volume.as_double()))
+        state.bars_15min.append(bar)
+        state.volumes_15min.append(float(bar.volume.as_double()))
 
         # Current price and VWAP values
         current_price = float(bar.close.as_double())
-        self.last_15min_price[bar.bar_type] = current_price
+        state.typical_prices_15min.append(
+            (float(bar.high.as_double()) + float(bar.low.as_double()) + current_price)
+            / 3.0
+        )
+        state.last_15min_price = current_price
 
         # Wait until both indicators are initialized
-        if (
-            not self.vwap_15min[bar.bar_type].initialized
-            or not self.vwap_4h[bar.bar_type].initialized
-        ):
+        if not state.vwap_15min.initialized or not state.vwap_4h.initialized:
             self.log.info(
-                "Waiting for VWAP indicators to initialize...", color=LogColor.BLUE
+                f"{state.instrument_id}: waiting for VWAP indicators to initialize...",
+                color=LogColor.BLUE,
             )
             return
 
         # Store current VWAP values
-        current_15min_vwap = self.vwap_15min[bar.bar_type].value
-        current_4h_vwap = self.vwap_4h[bar.bar_type].value
+        current_15min_vwap = state.vwap_15min.value
+        current_4h_vwap = state.vwap_4h.value
 
         # Calculate VWAP standard deviation bands for 15-min timeframe
-        if len(self.bars_15min[bar.bar_type]) >= self.config.vwap_period_15min:
-            # Calculate standard deviation
-            recent_bars = self.bars_15min[bar.bar_type][
-                -self.config.vwap_period_15min :
-            ]
-            prices = [
-                np.divide(
-                    (
-                        float(b.high.as_double())
-                        + float(b.low.as_double())
-                        + float(b.close.as_double())
-                    ),
-                    3.0,
-                )
-                for b in recent_bars
-            ]
-            std_dev = np.std(prices)
+        if state.typical_prices_15min.is_full:
+            std_dev = state.typical_prices_15min.std()
 
             # Set bands
-            self.upper_band_15min = current_15min_vwap + (
+            state.upper_band_15min = current_15min_vwap + (
                 std_dev * self.config.std_dev_multiplier
             )
-            self.lower_band_15min = current_15min_vwap - (
+            state.lower_band_15min = current_15min_vwap - (
                 std_dev * self.config.std_dev_multiplier
             )
 
             # Log VWAP and bands
             self.log.info(
-                f"15min VWAP: {current_15min_vwap:.5f}, "
-                f"Upper band: {self.upper_band_15min:.5f}, "
-                f"Lower band: {self.lower_band_15min:.5f}",
+                f"{state.instrument_id} 15min VWAP: {current_15min_vwap:.5f}, "
+                f"Upper band: {state.upper_band_15min:.5f}, "
+                f"Lower band: {state.lower_band_15min:.5f}",
                 color=LogColor.CYAN,
             )
 
         # Detect 15-min VWAP crossover (if we have previous values)
-        if np.not_equal(self.last_15min_vwap[bar.bar_type], 0.0):
+        if np.not_equal(state.last_15min_vwap, 0.0):
             # Calculate average volume
-            avg_volume = (
-                np.divide(
-                    sum(self.volumes_15min[bar.bar_type]),
-                    len(self.volumes_15min[bar.bar_type]),
-                )
-                if self.volumes_15min[bar.bar_type]
-                else 0.0
-            )
+            avg_volume = state.volumes_15min.mean()
             current_volume = float(bar.volume.as_double())
             volume_ratio = (
                 np.divide(current_volume, avg_volume)
@@ -268,61 +293,67 @@ class VWAPMultiTimeframeStrategy(Strategy):
 
             # Log volume analysis
             self.log.info(
-                f"Volume: {current_volume:.2f}, Avg Volume: {avg_volume:.2f}, "
-                f"Ratio: {volume_ratio:.2f}, Threshold: {self.config.entry_volume_threshold:.2f}",
+                f"{state.instrument_id} Volume: {current_volume:.2f}, "
+                f"Avg Volume: {avg_volume:.2f}, Ratio: {volume_ratio:.2f}, "
+                f"Threshold: {self.config.entry_volume_threshold:.2f}",
                 color=LogColor.YELLOW,
             )
 
             # See if we need to exit based on time
-            if self.in_position and self.entry_time:
+            if state.in_position and state.entry_time:
                 bar_time = unix_nanos_to_dt(bar.ts_event)
                 # Check if position has been open for more than time_exit_hours
-                elapsed_time = bar_time - self.entry_time
+                elapsed_time = bar_time - state.entry_time
                 if elapsed_time.total_seconds() > (self.config.time_exit_hours * 3600):
                     self.log.info(
-                        f"Time-based exit triggered after {elapsed_time.total_seconds()/3600:.1f} hours",
+                        f"{state.instrument_id}: time-based exit triggered after "
+                        f"{elapsed_time.total_seconds()/3600:.1f} hours",
                         color=LogColor.MAGENTA,
                     )
-                    self._exit_position()
+                    self._exit_position(state)
 
             # Check if we're in a position for exit signals
-            if self.in_position:
+            if state.in_position:
                 # Exit long position
-                if self.position_side == OrderSide.BUY:
+                if state.position_side == OrderSide.BUY:
                     # If price rises above upper band, take profit
-                    if current_price >= self.upper_band_15min:
+                    if current_price >= state.upper_band_15min:
                         self.log.info(
-                            f"Take profit triggered: Price {current_price:.5f} >= Upper band {self.upper_band_15min:.5f}",
+                            f"{state.instrument_id}: take profit triggered: Price "
+                            f"{current_price:.5f} >= Upper band {state.upper_band_15min:.5f}",
                             color=LogColor.GREEN,
                         )
-                        self._exit_position()
+                        self._exit_position(state)
                     # If price falls below VWAP, stop loss
                     elif current_price < current_15min_vwap:
                         self.log.info(
-                            f"Stop loss triggered: Price {current_price:.5f} < VWAP {current_15min_vwap:.5f}",
+                            f"{state.instrument_id}: stop loss triggered: Price "
+                            f"{current_price:.5f} < VWAP {current_15min_vwap:.5f}",
                             color=LogColor.RED,
                         )
-                        self._exit_position()
+                        self._exit_position(state)
 
                 # Exit short position
-                elif self.position_side == OrderSide.SELL:
+                elif state.position_side == OrderSide.SELL:
                     # If price falls below lower band, take profit
-                    if current_price <= self.lower_band_15min:
+                    if current_price <= state.lower_band_15min:
                         self.log.info(
-                            f"Take profit triggered: Price {current_price:.5f} <= Lower band {self.lower_band_15min:.5f}",
+                            f"{state.instrument_id}: take profit triggered: Price "
+                            f"{current_price:.5f} <= Lower band {state.lower_band_15min:.5f}",
                             color=LogColor.GREEN,
                         )
-                        self._exit_position()
+                        self._exit_position(state)
                     # If price rises above VWAP, stop loss
                     elif current_price > current_15min_vwap:
                         self.log.info(
-                            f"Stop loss triggered: Price {current_price:.5f} > VWAP {current_15min_vwap:.5f}",
+                            f"{state.instrument_id}: stop loss triggered: Price "
+                            f"{current_price:.5f} > VWAP {current_15min_vwap:.5f}",
                             color=LogColor.RED,
                         )
-                        self._exit_position()
+                        self._exit_position(state)
 
             # Check for entry signals if we're not in a position
-            elif not self.in_position:
+            elif not state.in_position:
                 # Uptrend in 4-hour timeframe: current price above 4h VWAP
                 uptrend_4h = current_price > current_4h_vwap
                 # Downtrend in 4-hour timeframe: current price below 4h VWAP
@@ -330,17 +361,13 @@ class VWAPMultiTimeframeStrategy(Strategy):
 
                 # 15-min price crossing above VWAP
                 cross_above = (
-                    self.last_15min_price[bar.bar_type]
-                    > current_15min_vwap[bar.bar_type]
-                    and self.last_15min_price[bar.bar_type]
-                    <= self.last_15min_vwap[bar.bar_type]
+                    state.last_15min_price > current_15min_vwap
+                    and state.last_15min_price <= state.last_15min_vwap
                 )
                 # 15-min price crossing below VWAP
                 cross_below = (
-                    self.last_15min_price[bar.bar_type]
-                    < current_15min_vwap[bar.bar_type]
-                    and self.last_15min_price[bar.bar_type]
-                    >= self.last_15min_vwap[bar.bar_type]
+                    state.last_15min_price < current_15min_vwap
+                    and state.last_15min_price >= state.last_15min_vwap
                 )
 
                 # Volume is above threshold
@@ -349,53 +376,62 @@ class VWAPMultiTimeframeStrategy(Strategy):
                 # Long signal: 4h uptrend + 15min cross above VWAP + high volume
                 if uptrend_4h and cross_above and volume_check:
                     self.log.info(
-                        "LONG SIGNAL: 4h uptrend + 15min cross above VWAP + high volume",
+                        f"{state.instrument_id} LONG SIGNAL: 4h uptrend + "
+                        "15min cross above VWAP + high volume",
                         color=LogColor.GREEN,
                     )
-                    self._enter_position(OrderSide.BUY, bar)
+                    self._enter_position(state, OrderSide.BUY, bar)
 
                 # Short signal: 4h downtrend + 15min cross below VWAP + high volume
                 elif downtrend_4h and cross_below and volume_check:
                     self.log.info(
-                        "SHORT SIGNAL: 4h downtrend + 15min cross below VWAP + high volume",
+                        f"{state.instrument_id} SHORT SIGNAL: 4h downtrend + "
+                        "15min cross below VWAP + high volume",
                         color=LogColor.RED,
                     )
-                    self._enter_position(OrderSide.SELL, bar)
+                    self._enter_position(state, OrderSide.SELL, bar)
 
         # Update last VWAP value for next comparison
-        self.last_15min_vwap[bar.bar_type] = current_15min_vwap
+        state.last_15min_vwap = current_15min_vwap
 
-    def _process_4h_bar(self, bar: Bar) -> None:
+    def _process_4h_bar(self, state: InstrumentState, bar: Bar) -> None:
         """
         Process a 4-hour bar update.
         """
         # Store the bar
-        self.bars_4h[bar.bar_type].append(bar)
+        state.bars_4h.append(bar)
 
         # Log 4-hour VWAP if available
-        if self.vwap_4h[bar.bar_type].initialized:
+        if state.vwap_4h.initialized:
             self.log.info(
-                f"4h VWAP updated: {self.vwap_4h[bar.bar_type].value:.5f} at {unix_nanos_to_dt(bar.ts_event)}",
+                f"{state.instrument_id} 4h VWAP updated: {state.vwap_4h.value:.5f} "
+                f"at {unix_nanos_to_dt(bar.ts_event)}",
                 color=LogColor.MAGENTA,
             )
 
-    def _enter_position(self, side: OrderSide, bar: Bar) -> None:
+    def _enter_position(self, state: InstrumentState, side: OrderSide, bar: Bar) -> None:
         """
         Enter a new position.
 
         Parameters
         ----------
+        state : InstrumentState
+            The state of the instrument to trade.
         side : OrderSide
             The order side (BUY or SELL).
         bar : Bar
             The current bar.
         """
-        if self.in_position:
-            self.log.warning("Already in position, cannot enter new position.")
+        if state.in_position:
+            self.log.warning(
+                f"{state.instrument_id}: already in position, cannot enter new position."
+            )
             return
 
+        instrument = state.instrument
+
         # Calculate position size based on risk percentage
-        account_balance = self.get_account_balance(self.instrument[0].quote_currency)
+        account_balance = self.get_account_balance(instrument.quote_currency)
         if account_balance is None:
             self.log.error("Unable to determine account balance.")
             return
@@ -404,9 +440,9 @@ class VWAPMultiTimeframeStrategy(Strategy):
 
         # Calculate stop loss price
         if side == OrderSide.BUY:
-            stop_price = self.lower_band_15min
+            stop_price = state.lower_band_15min
         else:  # SELL
-            stop_price = self.upper_band_15min
+            stop_price = state.upper_band_15min
 
         # Calculate risk per trade in currency
         risk_amount = float(account_balance) * self.config.risk_per_trade
@@ -418,10 +454,10 @@ class VWAPMultiTimeframeStrategy(Strategy):
             return
 
         position_size = np.divide(risk_amount, price_distance)
-        position_qty = self.instrument.make_qty(Decimal(str(position_size)))
+        position_qty = instrument.make_qty(Decimal(str(position_size)))
 
         # Adjust position size if it's below the minimum lot size
-        min_qty = self.instrument.min_quantity
+        min_qty = instrument.min_quantity
         if position_qty < min_qty:
             position_qty = min_qty
             self.log.warning(
@@ -430,9 +466,9 @@ class VWAPMultiTimeframeStrategy(Strategy):
 
         # Create market order for entry
         order = self.order_factory.market(
-            instrument_id=self.instrument.id,
+            instrument_id=instrument.id,
             order_side=side,
-            quantity=self.instrument.calculate_base_quantity(position_qty, bar.close),
+            quantity=instrument.calculate_base_quantity(position_qty, bar.close),
             time_in_force=TimeInForce.GTC,  # Immediate or Cancel
             reduce_only=False,
         )
@@ -445,41 +481,38 @@ class VWAPMultiTimeframeStrategy(Strategy):
         )
 
         # Update tracking variables
-        self.in_position = True
-        self.position_side = side
-        self.entry_time = unix_nanos_to_dt(bar.ts_event)
+        state.in_position = True
+        state.position_side = side
+        state.entry_time = unix_nanos_to_dt(bar.ts_event)
         self.trades_total += 1
 
-    def _exit_position(self) -> None:
+    def _exit_position(self, state: InstrumentState) -> None:
         """
-        Exit the current position.
+        Exit the current position of an instrument.
         """
-        if not self.in_position or self.position_side is None:
-            self.log.warning("No position to exit.")
+        if not state.in_position or state.position_side is None:
+            self.log.warning(f"{state.instrument_id}: no position to exit.")
             return
 
         # Create opposing market order to close the position
         exit_side = (
-            OrderSide.SELL if self.position_side == OrderSide.BUY else OrderSide.BUY
+            OrderSide.SELL if state.position_side == OrderSide.BUY else OrderSide.BUY
         )
 
         # Get the current position size
-        position = self.portfolio.net_position(self.instrument.id)
+        position = self.portfolio.net_position(state.instrument_id)
         if position == Decimal("0"):
-            self.log.warning("No position to exit.")
+            self.log.warning(f"{state.instrument_id}: no position to exit.")
             # Reset tracking variables anyway
-            self.in_position = False
-            self.position_side = None
-            self.entry_time = None
-            self.current_position_id = None
+            state.reset_position()
             return
         if exit_side == OrderSide.BUY:
             position = -position
         # Create market order for exit
         order = self.order_factory.market(
-            instrument_id=self.instrument.id,
+            instrument_id=state.instrument_id,
             order_side=exit_side,
-            quantity=self.instrument.make_qty(position),
+            quantity=state.instrument.make_qty(position),
             time_in_force=TimeInForce.GTC,  # Immediate or Cancel
             reduce_only=False,  # Ensure we only reduce position, not open new one
         )
@@ -501,11 +534,12 @@ class VWAPMultiTimeframeStrategy(Strategy):
         event : PositionOpened
             The position opened event.
         """
-        if event.instrument_id != self.instrument.id:
+        state = self.states.get(event.instrument_id)
+        if state is None:
             return  # Not our instrument
 
         self.log.info(f"Position opened: {event}")
-        self.current_position_id = event.position_id
+        state.current_position_id = event.position_id
 
     def on_position_closed(self, event: PositionClosed) -> None:
         """
@@ -516,13 +550,14 @@ class VWAPMultiTimeframeStrategy(Strategy):
         event : PositionClosed
             The position closed event.
         """
-        if event.instrument_id != self.instrument.id:
+        state = self.states.get(event.instrument_id)
+        if state is None:
             return  # Not our instrument
 
         self.log.info(f"Position closed: {event}")
 
         # Check if this is our current position
-        if self.current_position_id == event.position_id:
+        if state.current_position_id == event.position_id:
             # Update trade statistics
             if float(event.realized_pnl) >= 0:
                 self.trades_won += 1
@@ -538,10 +573,7 @@ class VWAPMultiTimeframeStrategy(Strategy):
                 )
 
             # Reset tracking variables
-            self.in_position = False
-            self.position_side = None
-            self.entry_time = None
-            self.current_position_id = None
+            state.reset_position()
 
             # Log trade statistics
             win_rate = (
@@ -590,3 +622,16 @@ class VWAPMultiTimeframeStrategy(Strategy):
             (self.trades_won / self.trades_total) * 100 if self.trades_total > 0 else 0
         )
         self.log.info(f"Win rate: {win_rate:.2f}%")
+
+        # Log resident state size so memory growth is visible in long runs
+        self.log.info(
+            f"Resident state: {len(self.states)} instruments, "
+            f"{self._state_nbytes() / 1024:.1f} KiB"
+        )
+
+    def _state_nbytes(self) -> int:
+        """
+        Return the number of bytes held by the per-instrument bar histories and
+        rolling windows.
+        """
+        return sum(state.nbytes for state in self.states.values())
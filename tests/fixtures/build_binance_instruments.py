@@ -0,0 +1,63 @@
+# 生成測試用的Binance交易對快照 tests/fixtures/binance_instruments
+#
+# 在專案根目錄執行: python -m tests.fixtures.build_binance_instruments
+# 快照格式與`refresh_snapshot`相同, 交易對參數取自Binance期貨的交易規則,
+# 升級Nautilus後如快照無法讀取, 重新執行以生成
+import json
+import shutil
+from decimal import Decimal
+from pathlib import Path
+
+from nautilus_trader.model.currencies import ADA, DOGE, USDT
+from nautilus_trader.model.identifiers import InstrumentId, Symbol
+from nautilus_trader.model.instruments import CryptoPerpetual
+from nautilus_trader.model.objects import Money, Price, Quantity
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+
+
+FIXTURE_PATH = Path(__file__).parent / "binance_instruments"
+FETCHED_AT = "2025-05-25T00:00:00+00:00"
+
+
+def _perpetual(base, price_increment: str, size_increment: str) -> CryptoPerpetual:
+    price = Price.from_str(price_increment)
+    size = Quantity.from_str(size_increment)
+    return CryptoPerpetual(
+        instrument_id=InstrumentId.from_str(f"{base.code}USDT-PERP.BINANCE"),
+        raw_symbol=Symbol(f"{base.code}USDT"),
+        base_currency=base,
+        quote_currency=USDT,
+        settlement_currency=USDT,
+        is_inverse=False,
+        price_precision=price.precision,
+        size_precision=size.precision,
+        price_increment=price,
+        size_increment=size,
+        min_quantity=size,
+        min_notional=Money(5.00, USDT),
+        margin_init=Decimal("0.0500"),
+        margin_maint=Decimal("0.0250"),
+        maker_fee=Decimal("0.000200"),
+        taker_fee=Decimal("0.000500"),
+        ts_event=0,
+        ts_init=0,
+    )
+
+
+def build_fixture(path: Path = FIXTURE_PATH) -> None:
+    """生成只包含ADAUSDT-PERP及DOGEUSDT-PERP的快照"""
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+    instruments = [
+        _perpetual(ADA, "0.00001", "1"),
+        _perpetual(DOGE, "0.000001", "1"),
+    ]
+    ParquetDataCatalog(path).write_data(instruments)
+    metadata = {"fetched_at": FETCHED_AT, "instruments": len(instruments)}
+    (path / "snapshot.json").write_text(json.dumps(metadata, indent=2))
+
+
+if __name__ == "__main__":
+    build_fixture()
+    print(f"已生成測試快照 {FIXTURE_PATH}")
@@ -0,0 +1,191 @@
+# 以保存的交易對快照測試Binance原始數據導入, 不需要網絡
+#
+# 在專案根目錄執行: python -m unittest discover -s tests -t .
+import tempfile
+import threading
+import unittest
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+from nautilus_trader.model.identifiers import InstrumentId
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+
+from data.utils.binance.instrument_snapshot import InstrumentSnapshot
+from data.utils.binance.raw_to_catalog_batch import process_raw_data
+from data.utils.binance.stream_ingest import is_sorted_by_time, stream_bars_to_catalog
+from src.catalog_bars import WRITE_LOCK_FILE, catalog_write_lock
+from src.catalog_manifest import CatalogManifest
+
+
+SNAPSHOT_PATH = Path(__file__).parent / "fixtures" / "binance_instruments"
+RAW_DATA_PATH = Path(__file__).parents[1] / "data" / "binance" / "futures"
+RAW_FILES = ("ADA_USDT_USDT-1h-futures.parquet", "ADA_USDT_USDT-4h-futures.parquet")
+ROWS = 200
+
+
+class InstrumentSnapshotTest(unittest.TestCase):
+    def test_load_finds_saved_instruments(self):
+        snapshot = InstrumentSnapshot.load(SNAPSHOT_PATH, max_age=None)
+
+        self.assertEqual(len(snapshot), 2)
+        ada = snapshot.find(InstrumentId.from_str("ADAUSDT-PERP.BINANCE"))
+        self.assertIsNotNone(ada)
+        self.assertEqual(ada.price_precision, 5)
+        self.assertIsNone(snapshot.find(InstrumentId.from_str("BTCUSDT-PERP.BINANCE")))
+
+    def test_fixture_is_stale(self):
+        snapshot = InstrumentSnapshot.load(SNAPSHOT_PATH, max_age=None)
+
+        self.assertTrue(snapshot.is_stale(timedelta(days=7)))
+
+    def test_missing_snapshot_raises(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(FileNotFoundError):
+                InstrumentSnapshot.load(Path(tmp) / "instruments")
+
+
+class ProcessRawDataTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.raw_path = Path(tmp.name) / "raw"
+        self.raw_path.mkdir()
+        self.catalog_path = Path(tmp.name) / "catalog"
+        # 只取每個原始文件的前幾百行, 另加一個快照中沒有的交易對
+        for name in RAW_FILES:
+            raw = pd.read_parquet(RAW_DATA_PATH / name).head(ROWS)
+            raw.to_parquet(self.raw_path / name)
+        raw.to_parquet(self.raw_path / "XYZ_USDT_USDT-4h-futures.parquet")
+
+    def _ingest(self, streaming: bool, rebuild: bool = False) -> list[dict]:
+        return process_raw_data(
+            self.raw_path,
+            None,
+            self.catalog_path,
+            workers=1,
+            snapshot_path=SNAPSHOT_PATH,
+            streaming=streaming,
+            rebuild=rebuild,
+        )
+
+    def _assert_ingested(self, results: list[dict]):
+        self.assertEqual(sorted(stats["file"] for stats in results), list(RAW_FILES))
+        self.assertTrue(all("error" not in stats for stats in results), results)
+        self.assertEqual([stats["bars"] for stats in results], [ROWS, ROWS])
+
+        catalog = ParquetDataCatalog(self.catalog_path)
+        self.assertEqual(
+            [str(instrument.id) for instrument in catalog.instruments()],
+            ["ADAUSDT-PERP.BINANCE"],
+        )
+        bar_type = "ADAUSDT-PERP.BINANCE-1-HOUR-LAST-EXTERNAL"
+        self.assertEqual(len(catalog.bars([bar_type])), ROWS)
+        self.assertEqual(CatalogManifest.load(self.catalog_path).bars[bar_type].rows, ROWS)
+
+    def test_streaming_ingest(self):
+        self._assert_ingested(self._ingest(streaming=True))
+
+    def test_dataframe_ingest(self):
+        self._assert_ingested(self._ingest(streaming=False))
+
+    def test_rerun_appends_nothing(self):
+        self._ingest(streaming=True)
+        results = self._ingest(streaming=True)
+
+        self.assertEqual([stats["bars"] for stats in results], [0, 0])
+
+    def test_rebuild_waits_for_lock_and_keeps_it(self):
+        self._ingest(streaming=True)
+        lock_file = self.catalog_path / WRITE_LOCK_FILE
+        inode = lock_file.stat().st_ino
+        results = []
+
+        # 其他運行持有鎖時, 重建須等待, 不能刪除其鎖文件
+        with catalog_write_lock(self.catalog_path):
+            rebuild = threading.Thread(
+                target=lambda: results.extend(self._ingest(streaming=True, rebuild=True))
+            )
+            rebuild.start()
+            rebuild.join(timeout=1.0)
+            self.assertTrue(rebuild.is_alive())
+            self.assertEqual(lock_file.stat().st_ino, inode)
+        rebuild.join()
+
+        self.assertEqual(lock_file.stat().st_ino, inode)
+        self._assert_ingested(results)
+
+
+class DuplicateRowsTest(unittest.TestCase):
+    bar_type = "ADAUSDT-PERP.BINANCE-1-HOUR-LAST-EXTERNAL"
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp_path = Path(tmp.name)
+        (self.tmp_path / "raw").mkdir()
+        self.raw_file = self.tmp_path / "raw" / RAW_FILES[0]
+        snapshot = InstrumentSnapshot.load(SNAPSHOT_PATH, max_age=None)
+        self.instrument = snapshot.find(InstrumentId.from_str("ADAUSDT-PERP.BINANCE"))
+
+        # 每個時間戳出現兩次, 文件中較後的一行成交量不同
+        self.raw = pd.read_parquet(RAW_DATA_PATH / RAW_FILES[0]).head(ROWS)
+        self.revised = self.raw.assign(volume=self.raw["volume"] + 1)
+        self.duplicated = pd.concat([self.raw, self.revised]).sort_values(
+            "date", kind="stable"
+        )
+
+    def _volumes(self, catalog_path: Path) -> list[float]:
+        bars = ParquetDataCatalog(catalog_path).bars([self.bar_type])
+        return [round(bar.volume.as_double(), self.instrument.size_precision) for bar in bars]
+
+    def _expected(self) -> list[float]:
+        return list(self.revised["volume"].round(self.instrument.size_precision))
+
+    def test_streaming_keeps_last_row_across_chunks(self):
+        self.duplicated.to_parquet(self.raw_file)
+        catalog_path = self.tmp_path / "catalog"
+
+        # 奇數塊大小使部分重複時間戳跨越兩塊
+        written = stream_bars_to_catalog(
+            self.raw_file, catalog_path, self.bar_type, self.instrument, chunk_rows=7
+        )
+
+        self.assertEqual(written, ROWS)
+        self.assertEqual(self._volumes(catalog_path), self._expected())
+
+    def test_dataframe_ingest_keeps_last_row(self):
+        self.duplicated.to_parquet(self.raw_file)
+        catalog_path = self.tmp_path / "catalog"
+
+        process_raw_data(
+            self.raw_file.parent,
+            None,
+            catalog_path,
+            workers=1,
+            snapshot_path=SNAPSHOT_PATH,
+            streaming=False,
+        )
+
+        self.assertEqual(self._volumes(catalog_path), self._expected())
+
+    def test_unsorted_file_falls_back_to_dataframe_ingest(self):
+        self.revised.iloc[::-1].to_parquet(self.raw_file)
+        catalog_path = self.tmp_path / "catalog"
+        self.assertFalse(is_sorted_by_time(self.raw_file))
+
+        results = process_raw_data(
+            self.raw_file.parent,
+            None,
+            catalog_path,
+            workers=1,
+            snapshot_path=SNAPSHOT_PATH,
+            streaming=True,
+        )
+
+        self.assertNotIn("error", results[0])
+        self.assertEqual(self._volumes(catalog_path), self._expected())
+
+
+if __name__ == "__main__":
+    unittest.main()
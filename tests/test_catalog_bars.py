@@ -0,0 +1,53 @@
+# 測試定點數編碼: 與解碼往返一致, 超出範圍時報錯而非溢出
+#
+# 在專案根目錄執行: python -m unittest discover -s tests -t .
+import unittest
+
+import numpy as np
+import pyarrow as pa
+
+from src.catalog_bars import decode_fixed, encode_fixed
+
+
+# 標準精度 (int64/uint64) 及高精度 (16字節) 的列類型
+PRICE_TYPES = (pa.int64(), pa.binary(16))
+SIZE_TYPES = (pa.uint64(), pa.binary(16))
+
+
+class EncodeFixedTest(unittest.TestCase):
+    def test_round_trip(self):
+        values = np.array([0.0, 0.12344, 1.5, 98_765.4321])
+        for type in PRICE_TYPES + SIZE_TYPES:
+            with self.subTest(type=type):
+                decoded = decode_fixed(encode_fixed(values, 4, type))
+                np.testing.assert_allclose(decoded, np.round(values, 4))
+
+    def test_negative_prices(self):
+        for type in PRICE_TYPES:
+            with self.subTest(type=type):
+                decoded = decode_fixed(encode_fixed(np.array([-5.25]), 2, type))
+                np.testing.assert_allclose(decoded, [-5.25])
+
+    def test_large_sizes_fit_unsigned_columns(self):
+        # 超過int64/1e9但在uint64/1e9以內
+        decoded = decode_fixed(encode_fixed(np.array([1.5e10]), 0, pa.uint64()))
+        np.testing.assert_allclose(decoded, [1.5e10])
+
+    def test_overflow_raises(self):
+        cases = [
+            (np.array([1.0, 4.07e11]), pa.uint64()),
+            (np.array([9.3e9]), pa.int64()),
+            (np.array([1e20]), pa.binary(16)),
+        ]
+        for values, type in cases:
+            with self.subTest(type=type), self.assertRaises(ValueError):
+                encode_fixed(values, 0, type)
+
+    def test_invalid_values_raise(self):
+        for values, type in ((np.array([np.nan]), pa.int64()), (np.array([-1.0]), pa.uint64())):
+            with self.subTest(values=values, type=type), self.assertRaises(ValueError):
+                encode_fixed(values, 2, type)
+
+
+if __name__ == "__main__":
+    unittest.main()
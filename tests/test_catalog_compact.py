@@ -0,0 +1,75 @@
+# 測試catalog壓縮: 重複時間戳保留最後寫入的文件中的行
+#
+# 在專案根目錄執行: python -m unittest discover -s tests -t .
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from nautilus_trader.model.data import BarType
+from nautilus_trader.model.identifiers import InstrumentId
+from nautilus_trader.persistence.catalog import ParquetDataCatalog
+from nautilus_trader.persistence.wranglers import BarDataWrangler
+
+from data.utils.binance.instrument_snapshot import InstrumentSnapshot
+from src.catalog_bars import bar_files, bar_type_dir
+from src.catalog_compact import compact_catalog
+from tests.test_binance_ingest import RAW_DATA_PATH, RAW_FILES, SNAPSHOT_PATH
+
+
+BAR_TYPE = "ADAUSDT-PERP.BINANCE-1-HOUR-LAST-EXTERNAL"
+ROWS = 20
+
+
+class CompactDuplicatesTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.catalog_path = Path(tmp.name)
+
+        snapshot = InstrumentSnapshot.load(SNAPSHOT_PATH, max_age=None)
+        instrument = snapshot.find(InstrumentId.from_str("ADAUSDT-PERP.BINANCE"))
+        raw = pd.read_parquet(RAW_DATA_PATH / RAW_FILES[0]).head(ROWS)
+        frame = raw.set_index(pd.to_datetime(raw["date"], utc=True))[
+            ["open", "high", "low", "close", "volume"]
+        ]
+        wrangler = BarDataWrangler(BarType.from_str(BAR_TYPE), instrument)
+        ParquetDataCatalog(self.catalog_path).write_data(wrangler.process(frame))
+        (written,) = bar_files(self.catalog_path, BAR_TYPE)
+        self.table = pq.read_table(written)
+        written.unlink()
+
+    def test_newer_file_wins_over_legacy_name(self):
+        directory = bar_type_dir(self.catalog_path, BAR_TYPE)
+        # 舊式文件名按名稱排在所有`<bar_type>-<ts>-<ts>.parquet`之後
+        legacy = directory / f"{BAR_TYPE}.parquet"
+        pq.write_table(self.table.slice(0, ROWS // 2 + 1), legacy)
+        os.utime(legacy, ns=(0, 0))
+
+        # 之後寫入的文件與舊文件重疊一個時間戳, 以ts_event標記其行
+        appended = self.table.slice(ROWS // 2)
+        ts_event = pa.array(appended.column("ts_event").to_numpy() + 1)
+        appended = appended.set_column(
+            appended.schema.get_field_index("ts_event"), "ts_event", ts_event
+        )
+        ts = appended.column("ts_init").to_numpy()
+        pq.write_table(appended, directory / f"{BAR_TYPE}-{ts[0]}-{ts[-1]}.parquet")
+
+        (result,) = compact_catalog(self.catalog_path, [BAR_TYPE], workers=1)
+
+        self.assertTrue(result["compacted"])
+        self.assertEqual(result["rows_after"], ROWS)
+        (compacted,) = bar_files(self.catalog_path, BAR_TYPE)
+        table = pq.read_table(compacted)
+        self.assertEqual(
+            table.column("ts_event").to_pylist(),
+            self.table.column("ts_event").to_pylist()[: ROWS // 2]
+            + ts_event.to_pylist(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,348 @@
+# 以本地替代客戶端測試Databento下載器的緩存, 續傳及解碼, 不需要網絡及API密鑰
+#
+# 在專案根目錄執行: python -m unittest discover -s tests -t .
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+import databento_dbn as dbn
+import numpy as np
+import pandas as pd
+import zstandard
+from databento_dbn import FIXED_PRICE_SCALE, UNDEF_PRICE, UNDEF_TIMESTAMP, RType
+
+from data.utils.databento.downloader import (
+    RawCache,
+    download_chunks,
+    download_symbols,
+    ingest_symbol,
+    monthly_chunks,
+)
+from data.utils.databento.ohlcv import OHLCV_DTYPE, read_ohlcv_dbn, write_dbn
+from src.catalog_bars import read_bars
+from src.catalog_manifest import CatalogManifest, manifest_path
+
+
+NANOS_PER_MINUTE = 60_000_000_000
+# 每個交易日的bar: 14:30 UTC開盤後的前幾分鐘
+BARS_PER_DAY = 5
+
+
+def fake_ohlcv_records(symbol: str, start: pd.Timestamp, end: pd.Timestamp) -> np.ndarray:
+    """
+    返回`start`至`end` (不包含) 每個工作日的1分鐘OHLCV記錄, 收盤價以分鐘編號遞增
+    """
+    sessions = pd.bdate_range(start, end, inclusive="left") + pd.Timedelta(hours=14, minutes=30)
+    minutes = np.arange(BARS_PER_DAY) * NANOS_PER_MINUTE
+    ts = (sessions.as_unit("ns").asi8[:, None] + minutes[None, :]).ravel()
+    close = 100.0 + np.arange(len(ts)) * 0.01
+
+    records = np.zeros(len(ts), dtype=OHLCV_DTYPE)
+    records["length"] = OHLCV_DTYPE.itemsize // 4
+    records["rtype"] = int(RType.OHLCV_1M)
+    records["publisher_id"] = 1
+    records["instrument_id"] = len(symbol)
+    records["ts_event"] = ts
+    for name, values in (("open", close), ("high", close + 0.05), ("low", close - 0.05)):
+        records[name] = np.round(values * 100) * (FIXED_PRICE_SCALE // 100)
+    records["close"] = np.round(close * 100) * (FIXED_PRICE_SCALE // 100)
+    records["volume"] = 1_000
+    return records
+
+
+def write_fake_definition(path: Path, symbol: str, ts: pd.Timestamp) -> None:
+    """
+    將股票的交易對定義寫為zstd壓縮的DBN文件
+
+    以DBN版本1寫入, nautilus-trader 1.216無法解碼更新版本的定義記錄.
+    """
+    ts = ts.value
+    record = dbn.InstrumentDefMsgV1(
+        publisher_id=2,  # XNAS.ITCH
+        instrument_id=len(symbol),
+        ts_event=ts,
+        ts_recv=ts,
+        min_price_increment=FIXED_PRICE_SCALE // 100,
+        display_factor=FIXED_PRICE_SCALE,
+        expiration=UNDEF_TIMESTAMP,
+        activation=UNDEF_TIMESTAMP,
+        high_limit_price=UNDEF_PRICE,
+        low_limit_price=UNDEF_PRICE,
+        max_price_variation=UNDEF_PRICE,
+        trading_reference_price=UNDEF_PRICE,
+        unit_of_measure_qty=UNDEF_PRICE,
+        min_price_increment_amount=UNDEF_PRICE,
+        price_ratio=UNDEF_PRICE,
+        inst_attrib_value=0,
+        underlying_id=0,
+        raw_instrument_id=len(symbol),
+        market_depth_implied=0,
+        market_depth=0,
+        market_segment_id=0,
+        max_trade_vol=0,
+        min_lot_size=0,
+        min_lot_size_block=0,
+        min_lot_size_round_lot=100,
+        min_trade_vol=0,
+        contract_multiplier=0,
+        decay_quantity=0,
+        original_contract_size=0,
+        trading_reference_date=0,
+        appl_id=0,
+        maturity_year=0,
+        decay_start_date=0,
+        channel_id=0,
+        currency="USD",
+        settl_currency="",
+        secsubtype="",
+        raw_symbol=symbol,
+        group="",
+        exchange="XNAS",
+        asset=symbol,
+        cfi="",
+        security_type="",
+        unit_of_measure="",
+        underlying="",
+        strike_price_currency="",
+        instrument_class=dbn.InstrumentClass.STOCK,
+        strike_price=UNDEF_PRICE,
+        match_algorithm=dbn.MatchAlgorithm.UNDEFINED,
+        md_security_trading_status=0,
+        main_fraction=0,
+        price_display_format=0,
+        settl_price_type=0,
+        sub_fraction=0,
+        underlying_product=0,
+        security_update_action=dbn.SecurityUpdateAction.ADD,
+        maturity_month=0,
+        maturity_day=0,
+        maturity_week=0,
+        user_defined_instrument=dbn.UserDefinedInstrument.NO,
+        contract_multiplier_unit=0,
+        flow_schedule_type=0,
+        tick_rule=0,
+    )
+    metadata = dbn.Metadata(
+        dataset="XNAS.ITCH",
+        start=ts,
+        end=ts + 1,
+        stype_in=dbn.SType.RAW_SYMBOL,
+        stype_out=dbn.SType.INSTRUMENT_ID,
+        schema=dbn.Schema.DEFINITION,
+        symbols=[symbol],
+        version=1,
+    )
+    payload = bytes(metadata.encode()) + bytes(record)
+    path.write_bytes(zstandard.ZstdCompressor().compress(payload))
+
+
+class FakeHistorical:
+    """
+    `databento.Historical`的本地替代: 按請求的範圍生成OHLCV記錄或交易對定義並寫入`path`
+
+    只實現下載器使用的`timeseries.get_range`, 並記錄每次請求.
+
+    Parameters
+    ----------
+    fail : dict[tuple[str, str], int], optional
+        (股票, 開始日期) -> 該塊前幾次請求失敗的次數, -1表示總是失敗
+    """
+
+    def __init__(self, fail: dict[tuple[str, str], int] | None = None):
+        self.timeseries = self
+        self.requests = []
+        self._fail = dict(fail or {})
+        self._lock = threading.Lock()
+
+    def get_range(self, dataset, symbols, schema, start, end, path):
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        key = (symbols[0], f"{start:%Y-%m-%d}")
+        with self._lock:
+            self.requests.append(key)
+            remaining = self._fail.get(key, 0)
+            if remaining:
+                self._fail[key] = remaining - 1
+        if remaining:
+            # 模擬寫入一半時連接中斷
+            Path(path).write_bytes(b"partial")
+            raise ConnectionError(f"simulated failure for {key}")
+        if schema == "definition":
+            write_fake_definition(Path(path), symbols[0], start)
+        else:
+            write_dbn(Path(path), fake_ohlcv_records(symbols[0], start, end), symbols[0])
+
+
+class DownloadChunksTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = RawCache(tmp.name)
+        self.chunks = monthly_chunks(["AAA", "BBB"], "ohlcv-1m", "2024-01-01", "2024-03-31")
+
+    def _download(self, client) -> list[Path]:
+        return download_chunks(
+            client, "XNAS.ITCH", self.chunks, self.cache, requests_per_second=1_000
+        )
+
+    def _partial_files(self) -> list[Path]:
+        return list(self.cache.directory.rglob("*.part"))
+
+    def test_downloads_every_missing_chunk(self):
+        client = FakeHistorical()
+
+        paths = self._download(client)
+
+        self.assertEqual(len(client.requests), 6)
+        self.assertEqual(paths, [self.cache.path(chunk) for chunk in self.chunks])
+        self.assertTrue(all(path.exists() for path in paths))
+        self.assertEqual(
+            [path.name for path in paths[:3]],
+            [
+                "AAA_ohlcv-1m_2024-01.dbn.zst",
+                "AAA_ohlcv-1m_2024-02.dbn.zst",
+                "AAA_ohlcv-1m_2024-03.dbn.zst",
+            ],
+        )
+
+    def test_chunks_cover_whole_months(self):
+        chunks = monthly_chunks(["AAA"], "ohlcv-1m", "2024-01-15", "2024-02-10")
+
+        self.assertEqual(
+            [(chunk.start, chunk.end) for chunk in chunks],
+            [
+                (pd.Timestamp("2024-01-01", tz="UTC"), pd.Timestamp("2024-02-01", tz="UTC")),
+                (pd.Timestamp("2024-02-01", tz="UTC"), pd.Timestamp("2024-03-01", tz="UTC")),
+            ],
+        )
+        # 緩存文件名與請求的起止日期無關
+        self.assertEqual(self.cache.path(chunks[0]), self.cache.path(self.chunks[0]))
+
+    def test_rerun_uses_cache(self):
+        self._download(FakeHistorical())
+        client = FakeHistorical()
+
+        self._download(client)
+
+        self.assertEqual(client.requests, [])
+
+    def test_unfinished_months_are_fetched_again(self):
+        now = pd.Timestamp.now(tz="UTC")
+        end = now + pd.Timedelta(days=40)
+        self.chunks = monthly_chunks(["AAA"], "ohlcv-1m", f"{now:%Y-%m}-01", f"{end:%Y-%m-%d}")
+        self._download(FakeHistorical())
+        client = FakeHistorical()
+
+        self._download(client)
+
+        # 只有尚未結束的月份 (包括當前月份) 重新下載
+        unfinished = [chunk for chunk in self.chunks if chunk.end > now]
+        self.assertGreaterEqual(len(unfinished), 1)
+        self.assertEqual(len(client.requests), len(unfinished))
+        # 重新下載覆蓋同一文件
+        self.assertEqual(
+            sorted(self.cache.directory.rglob("*.dbn.zst")),
+            sorted(self.cache.path(chunk) for chunk in self.chunks),
+        )
+
+    def test_interrupted_download_resumes_missing_chunks(self):
+        with self.assertRaises(RuntimeError):
+            self._download(FakeHistorical(fail={("BBB", "2024-02-01"): -1}))
+        self.assertFalse(self.cache.has(self.chunks[4]))
+        self.assertEqual(self._partial_files(), [])
+
+        client = FakeHistorical()
+        self._download(client)
+
+        self.assertEqual(client.requests, [("BBB", "2024-02-01")])
+        self.assertTrue(all(self.cache.has(chunk) for chunk in self.chunks))
+
+    def test_transient_failure_is_retried(self):
+        client = FakeHistorical(fail={("AAA", "2024-01-01"): 1})
+
+        self._download(client)
+
+        self.assertEqual(client.requests.count(("AAA", "2024-01-01")), 2)
+        self.assertTrue(self.cache.has(self.chunks[0]))
+        self.assertEqual(self._partial_files(), [])
+
+
+class IngestTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name) / "raw"
+        self.catalog_path = Path(tmp.name) / "catalog"
+
+    def _download_symbols(self, client) -> dict[str, int]:
+        return download_symbols(
+            ["AAA"],
+            "XNAS",
+            "2024-01-15",
+            "2024-02-09",
+            client=client,
+            cache_dir=self.cache_dir,
+            catalog_path=self.catalog_path,
+            requests_per_second=1_000,
+        )
+
+    def test_ingest_symbol_writes_cached_bars(self):
+        cache = RawCache(self.cache_dir)
+        chunks = monthly_chunks(["AAA"], "ohlcv-1m", "2024-01-01", "2024-02-29")
+        definition = chunks[0]._replace(schema="definition")
+        download_chunks(FakeHistorical(), "XNAS.ITCH", [*chunks, definition], cache)
+
+        written = ingest_symbol(
+            [cache.path(chunk) for chunk in chunks],
+            cache.path(definition),
+            "AAA",
+            "XNAS",
+            "1m",
+            self.catalog_path,
+        )
+
+        self.assertEqual(written, len(pd.bdate_range("2024-01-01", "2024-02-29")) * BARS_PER_DAY)
+        bars = read_bars(self.catalog_path, "AAA.XNAS-1-MINUTE-LAST-EXTERNAL")
+        self.assertEqual(len(bars), written)
+
+    def test_rerun_appends_nothing_and_updates_manifest(self):
+        bar_type = "AAA.XNAS-1-MINUTE-LAST-EXTERNAL"
+        # 只寫入請求範圍內的工作日: 1月15日至2月9日
+        expected = len(pd.bdate_range("2024-01-15", "2024-02-09")) * BARS_PER_DAY
+
+        self.assertEqual(self._download_symbols(FakeHistorical()), {"AAA": expected})
+        manifest = manifest_path(self.catalog_path)
+        os.utime(manifest, ns=(0, 0))
+        client = FakeHistorical()
+
+        self.assertEqual(self._download_symbols(client), {"AAA": 0})
+
+        self.assertEqual(client.requests, [])
+        self.assertNotEqual(manifest.stat().st_mtime_ns, 0)
+        self.assertEqual(CatalogManifest.load(self.catalog_path).bars[bar_type].rows, expected)
+
+
+class DecodeCachedFilesTest(unittest.TestCase):
+    def test_cached_file_decodes_to_close_stamped_frame(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = RawCache(tmp)
+            chunks = monthly_chunks(["AAA"], "ohlcv-1m", "2024-01-01", "2024-01-31")
+            download_chunks(FakeHistorical(), "XNAS.ITCH", chunks, cache)
+            records = fake_ohlcv_records("AAA", chunks[0].start, chunks[0].end)
+
+            frame = read_ohlcv_dbn(cache.path(chunks[0]))
+
+        self.assertEqual(len(frame), len(records))
+        self.assertEqual(list(frame.columns), ["open", "high", "low", "close", "volume"])
+        # Bar以收盤時間為時間戳: 2024-01-01為工作日, 第一根bar於14:30開盤
+        self.assertEqual(frame.index[0], pd.Timestamp("2024-01-01 14:31"))
+        np.testing.assert_array_equal(
+            frame.index.asi8, records["ts_event"].astype(np.int64) + NANOS_PER_MINUTE
+        )
+        np.testing.assert_allclose(frame["close"], records["close"] / FIXED_PRICE_SCALE)
+        np.testing.assert_allclose(frame["volume"], 1_000.0)
+
+
+if __name__ == "__main__":
+    unittest.main()